@@ -0,0 +1,58 @@
+# Each achievement declares the context fields it depends on, so a change
+# only re-checks the rules watching the changed fields. Unlocked
+# achievements are stored as a bitset in context['achievement_bits'],
+# bit N being ACHIEVEMENT_RULES[N]. Append new rules; never reorder.
+ACHIEVEMENT_RULES = [
+    ('first_chat', ' First Chat', (), lambda c: True),
+    ('budget_set', ' Budget Planner', ('budget',), lambda c: bool(c.get('budget'))),
+    ('first_sale', ' First Sale', ('sales_count',), lambda c: c.get('sales_count', 0) >= 1),
+    ('quick_response', ' Speed Demon', ('avg_response_time',), lambda c: c.get('avg_response_time', 3600) < 1800),
+    ('bulk_buyer', ' Bulk Master', ('bulk_purchases',), lambda c: c.get('bulk_purchases', 0) >= 5),
+    ('profit_maker', ' Profit Pro', ('total_profit',), lambda c: c.get('total_profit', 0) >= 500),
+    ('feedback_king', ' Feedback King', ('positive_feedback',), lambda c: c.get('positive_feedback', 0) >= 10)
+]
+
+class AchievementEngine:
+    """Field-indexed achievement rules with bitset storage."""
+
+    def __init__(self, rules=ACHIEVEMENT_RULES):
+        self.rules = rules
+        self.bit_by_name = {name: 1 << i for i, (_, name, _, _) in enumerate(rules)}
+        self.by_field = {}
+        for i, (_, _, fields, _) in enumerate(rules):
+            for field in fields:
+                self.by_field.setdefault(field, []).append(i)
+        self.all_rules = list(range(len(rules)))
+
+    def bits_for(self, context: dict) -> int:
+        """Unlocked bitset, migrating older contexts that only stored names."""
+        if 'achievement_bits' in context:
+            return context['achievement_bits']
+        bits = 0
+        for name in context.get('achievements', []):
+            bits |= self.bit_by_name.get(name, 0)
+        return bits
+
+    def evaluate(self, context: dict, changed_fields=None):
+        """Return (bits, newly unlocked names) after checking affected rules.
+
+        With changed_fields=None every rule is checked, including the ones
+        that watch no fields (like First Chat).
+        """
+        bits = self.bits_for(context)
+        if changed_fields is None:
+            candidates = self.all_rules
+        else:
+            candidates = sorted({i for field in changed_fields for i in self.by_field.get(field, ())})
+
+        unlocked = []
+        for i in candidates:
+            if not bits & (1 << i) and self.rules[i][3](context):
+                bits |= 1 << i
+                unlocked.append(self.rules[i][1])
+        return bits, unlocked
+
+    def names_for(self, bits: int) -> list:
+        return [name for i, (_, name, _, _) in enumerate(self.rules) if bits & (1 << i)]
+
+achievement_engine = AchievementEngine()
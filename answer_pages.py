@@ -0,0 +1,133 @@
+import logging
+import re
+import secrets
+import time
+import zlib
+
+logger = logging.getLogger('InvexBot')
+
+PAGE_EXPIRY_SECONDS = 900  # Page buttons stop working after this long
+MAX_PAGED_ANSWERS = 1000  # Oldest answers are dropped beyond this
+COMPRESS_MIN_CHARS = 1024  # Shorter answers aren't worth compressing
+PAGE_PREFIX = 'answer_page'  # Button custom_id: answer_page:<token>:<page>
+# A sentence ends at . ! ? or … (plus closing quotes, brackets or markdown) followed by
+# whitespace, but not the "1." or "12." that numbers a list item at the start of a line
+SENTENCE_END_RE = re.compile(r"(?<!^\d)(?<!^\d\d)[.!?…][\"')\]*_]*\s+", re.MULTILINE)
+
+def page_end(text: str, start: int, limit: int) -> int:
+    """Offset where the page starting at start should end.
+
+    Prefers a paragraph break, then a sentence end, then a space, and only
+    cuts mid-word when a single word is longer than the page.
+    """
+    if len(text) - start <= limit:
+        return len(text)
+    window = text[start:start + limit]
+    cut = window.rfind('\n\n')
+    if cut >= limit // 2:
+        return start + cut + 2
+    ends = [match.end() for match in SENTENCE_END_RE.finditer(window)]
+    if ends and ends[-1] >= limit // 4:
+        return start + ends[-1]
+    cut = window.rfind(' ')
+    return start + (cut + 1 if cut > 0 else limit)
+
+def trim_to_sentence(text: str) -> str:
+    """Drop a trailing unfinished sentence, e.g. from an answer cut off by max_tokens."""
+    ends = [match.end() for match in SENTENCE_END_RE.finditer(text + ' ')]
+    return text[:ends[-1]].rstrip() if ends else text
+
+class PagedAnswer:
+    """One long answer: its text (compressed when long) and the page breaks found so far.
+
+    Breaks are found a page at a time, so pages nobody asks for are never split.
+    """
+
+    __slots__ = ('data', 'compressed', 'breaks', 'limit', 'owner', 'kind', 'meta', 'expires')
+
+    def __init__(self, text: str, owner: str, limit: int, kind: str, meta: dict = None):
+        self.compressed = len(text) >= COMPRESS_MIN_CHARS
+        self.data = zlib.compress(text.encode()) if self.compressed else text
+        self.breaks = [0]
+        self.limit = limit
+        self.owner = owner
+        self.kind = kind
+        self.meta = meta or {}
+        self.expires = 0.0
+
+    @property
+    def text(self) -> str:
+        return zlib.decompress(self.data).decode() if self.compressed else self.data
+
+    def page(self, number: int):
+        """(text, has_next) for a 0-based page; text is None past the last page."""
+        text = self.text
+        while len(self.breaks) <= number + 1 and self.breaks[-1] < len(text):
+            self.breaks.append(page_end(text, self.breaks[-1], self.limit))
+        if number < 0 or number + 1 >= len(self.breaks):
+            return None, False
+        start, end = self.breaks[number], self.breaks[number + 1]
+        return text[start:end].strip(), end < len(text)
+
+    def nbytes(self) -> int:
+        return len(self.data) + 8 * len(self.breaks)
+
+class AnswerPageStore:
+    """Long answers whose later pages are rendered when a page button is pressed."""
+
+    def __init__(self, expiry: float = PAGE_EXPIRY_SECONDS, max_answers: int = MAX_PAGED_ANSWERS):
+        self.expiry = expiry
+        self.max_answers = max_answers
+        self.answers = {}  # token -> PagedAnswer, oldest first
+
+    def __len__(self):
+        return len(self.answers)
+
+    def add(self, answer: PagedAnswer) -> str:
+        self.purge_expired()
+        while len(self.answers) >= self.max_answers:
+            self.answers.pop(next(iter(self.answers)))
+        token = secrets.token_urlsafe(6)
+        answer.expires = time.monotonic() + self.expiry
+        self.answers[token] = answer
+        return token
+
+    def get(self, token: str):
+        answer = self.answers.get(token)
+        if answer is not None and answer.expires < time.monotonic():
+            del self.answers[token]
+            return None
+        return answer
+
+    def purge_expired(self) -> int:
+        """Drop expired answers; they expire in insertion order."""
+        now = time.monotonic()
+        expired = []
+        for token, answer in self.answers.items():
+            if answer.expires >= now:
+                break
+            expired.append(token)
+        for token in expired:
+            del self.answers[token]
+        return len(expired)
+
+    def clear(self) -> int:
+        count = len(self.answers)
+        self.answers.clear()
+        return count
+
+    def nbytes(self) -> int:
+        return sum(answer.nbytes() for answer in self.answers.values())
+
+def page_button_id(token: str, page: int) -> str:
+    return f"{PAGE_PREFIX}:{token}:{page}"
+
+def parse_page_button(custom_id: str):
+    """(token, page) from a page button's custom_id, or None if it isn't one."""
+    prefix, _, rest = custom_id.partition(':')
+    token, _, page = rest.rpartition(':')
+    if prefix != PAGE_PREFIX or not token or not page.isdigit():
+        return None
+    return token, int(page)
+
+answer_pages = AnswerPageStore()
@@ -0,0 +1,217 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime, timedelta
+
+from stage_engine import STAGES, budget_tier
+
+logger = logging.getLogger('InvexBot')
+
+CANNED_MATCH_THRESHOLD = 0.8  # Minimum word overlap (Jaccard) to serve a canned answer
+NO_BUDGET = 'none'
+# Budget used in the generated prompt for each bucket; must land in the same budget_tier
+BUDGET_BUCKETS = {NO_BUDGET: None, 'low': 15, 'medium': 100, 'high': 500}
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+def normalize(question: str) -> tuple:
+    """Lowercase word tuple used to compare questions."""
+    return tuple(WORD_RE.findall(question.lower().replace("'", '').replace('\u2019', '')))
+
+def budget_bucket(budget) -> str:
+    return budget_tier(budget) if budget else NO_BUDGET
+
+class CannedAnswers:
+    """Pre-generated answers keyed by (question, conversation stage, budget bucket).
+
+    The file stores each answer text once; rows point into it so the same
+    answer shared by several stages or buckets isn't repeated.
+    """
+
+    def __init__(self, questions=None, texts=None, rows=None, meta=None):
+        self.questions = list(questions or [])
+        self.texts = list(texts or [])
+        self.meta = meta or {}
+        self.answers = {(qi, stage, bucket): ti for qi, stage, bucket, ti in rows or []}
+        self.exact = {}
+        self.words = []
+        self.postings = {}  # word -> question indexes
+        for qi, question in enumerate(self.questions):
+            self._index(qi, question)
+
+    def __len__(self):
+        return len(self.answers)
+
+    def _index(self, qi: int, question: str):
+        key = normalize(question)
+        words = frozenset(key)
+        self.exact.setdefault(key, qi)
+        self.words.append(words)
+        for word in words:
+            self.postings.setdefault(word, []).append(qi)
+
+    @classmethod
+    def load(cls, path: str) -> 'CannedAnswers':
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return cls(data['questions'], data['texts'], data['answers'], data.get('meta'))
+
+    def save(self, path: str):
+        """Write the compact lookup file atomically."""
+        texts, text_ids, rows = [], {}, []
+        for (qi, stage, bucket), ti in sorted(self.answers.items()):
+            text = self.texts[ti]
+            if text not in text_ids:
+                text_ids[text] = len(texts)
+                texts.append(text)
+            rows.append([qi, stage, bucket, text_ids[text]])
+        data = {'meta': self.meta, 'questions': self.questions, 'texts': texts, 'answers': rows}
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, separators=(',', ':'), ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def match(self, query: str):
+        """Index of the closest stored question, or None if none is close enough."""
+        key = normalize(query)
+        if key in self.exact:
+            return self.exact[key]
+        words = frozenset(key)
+        if not words:
+            return None
+        overlaps = {}
+        for word in words:
+            for qi in self.postings.get(word, ()):
+                overlaps[qi] = overlaps.get(qi, 0) + 1
+        best, best_score = None, CANNED_MATCH_THRESHOLD
+        for qi, overlap in overlaps.items():
+            score = overlap / (len(words) + len(self.words[qi]) - overlap)
+            if score >= best_score:
+                best, best_score = qi, score
+        return best
+
+    def lookup(self, query: str, stage: str, budget=None):
+        """Canned answer for a query in the user's stage and budget bucket, or None."""
+        qi = self.match(query)
+        if qi is None:
+            return None
+        ti = self.answers.get((qi, stage, budget_bucket(budget)))
+        return self.texts[ti] if ti is not None else None
+
+    def add(self, question: str, stage: str, bucket: str, answer: str):
+        qi = self.exact.get(normalize(question))
+        if qi is None:
+            qi = len(self.questions)
+            self.questions.append(question)
+            self._index(qi, question)
+        self.answers[(qi, stage, bucket)] = len(self.texts)
+        self.texts.append(answer)
+
+async def generate(canned: CannedAnswers, questions: list, answer_fn, concurrency: int = 4,
+                   stages=None, buckets=None) -> int:
+    """Fill in every missing (question, stage, bucket) answer using answer_fn.
+
+    answer_fn(question, context) -> answer text; entries already in the file
+    are kept, so an interrupted run can be resumed.
+    """
+    stages = stages or list(STAGES)
+    buckets = buckets or list(BUDGET_BUCKETS)
+    semaphore = asyncio.Semaphore(concurrency)
+    done = 0
+
+    async def one(question, stage, bucket):
+        nonlocal done
+        context = {'conversation_stage': stage, 'budget': BUDGET_BUCKETS[bucket]}
+        async with semaphore:
+            try:
+                answer = await answer_fn(question, context)
+            except Exception as e:
+                logger.error(f"Error generating canned answer for {question!r} ({stage}/{bucket}): {str(e)}")
+                return
+        if answer:
+            canned.add(question, stage, bucket, answer)
+            done += 1
+
+    jobs = []
+    for question in questions:
+        qi = canned.exact.get(normalize(question))
+        for stage in stages:
+            for bucket in buckets:
+                if qi is None or (qi, stage, bucket) not in canned.answers:
+                    jobs.append(one(question, stage, bucket))
+    logger.info(f"Generating {len(jobs)} canned answers for {len(questions)} questions")
+    await asyncio.gather(*jobs)
+    return done
+
+def read_questions(path: str) -> list:
+    """One question per line; blank lines and duplicates are skipped."""
+    questions, seen = [], set()
+    with open(path, 'r') as f:
+        for line in f:
+            question = line.strip()
+            key = normalize(question)
+            if key and key not in seen:
+                seen.add(key)
+                questions.append(question)
+    return questions
+
+async def wait_until(start_at: str):
+    """Sleep until the next HH:MM local time, for off-peak runs."""
+    hour, minute = map(int, start_at.split(':'))
+    now = datetime.now()
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    logger.info(f"Waiting until {target.isoformat()} to start generating")
+    await asyncio.sleep((target - now).total_seconds())
+
+async def run(args):
+    if args.base_url:
+        os.environ['ANTHROPIC_BASE_URL'] = args.base_url
+    import main as bot_main  # Prompt building and the KB live with the bot
+
+    bot_main.init_knowledge_base()
+    bot_main.init_kb_index()
+    questions = read_questions(args.questions)
+    canned = CannedAnswers.load(args.out) if os.path.exists(args.out) else CannedAnswers()
+
+    if args.stub:
+        # Offline stand-in for the model: answer with the best KB entries
+        async def answer_fn(question, context):
+            return "\n\n".join(bot_main.search_knowledge_base(question)) or f"(stub answer) {question}"
+    else:
+        bot_main.init_claude_client()
+
+        async def answer_fn(question, context):
+            signals = bot_main.parse_message(question)
+            system_message, messages = bot_main.build_prompt(question, context, signals)
+            return await bot_main.create_answer(system_message, messages)
+
+    if args.start_at:
+        await wait_until(args.start_at)
+    start = time.perf_counter()
+    done = await generate(canned, questions, answer_fn, concurrency=args.concurrency)
+    canned.meta = {
+        'generated_at': datetime.now().isoformat(),
+        'model': 'stub' if args.stub else bot_main.model_router.tiers['large']['model']
+    }
+    canned.save(args.out)
+    logger.info(
+        f"Generated {done} answers in {time.perf_counter() - start:.1f}s; "
+        f"{len(canned)} answers for {len(canned.questions)} questions saved to {args.out}"
+    )
+    if bot_main.model_transport:
+        await bot_main.model_transport.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Pre-generate /ai answers for frequent questions")
+    parser.add_argument('questions', help="Text file with one frequent question per line")
+    parser.add_argument('--out', default=os.getenv('CANNED_ANSWERS_PATH', 'canned_answers.json'))
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--start-at', help="Wait until this HH:MM local time before generating")
+    parser.add_argument('--base-url', help="Send model calls to a local stand-in API")
+    parser.add_argument('--stub', action='store_true', help="Answer from the knowledge base without calling a model")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,173 @@
+import re
+
+# Shorthand members type for catalog words, expanded before matching
+ITEM_ALIASES = {
+    'ap': 'airpods',
+    'airpod': 'airpods',
+    'pods': 'airpods',
+    'app': 'airpods pro',
+    'apm': 'airpods max',
+    'tf': 'tom ford',
+    'ysl': 'yves saint laurent',
+    'js': 'jordan'
+}
+MATCH_THRESHOLD = 0.6  # Minimum score for an item to count as a catalog product
+AMBIGUITY_MARGIN = 0.1  # Two products this close are a guess, e.g. plain "lv" or "dyson"
+MIN_PREFIX = 2  # Shortest word prefix that is indexed
+NUMBER_MISMATCH_PENALTY = 0.5  # "AirPods 3" must not match "AirPods 2"
+UNNUMBERED_PENALTY = 0.9  # "Stanley Cup 40" is only a weak match for "Stanley Cup"
+# Words that tell variants of one product apart; "AirPods Pro" is neither
+# "AirPods Pro (ANC)" nor "AirPods Pro (No ANC)"
+QUALIFIER_WORDS = {'no', 'anc', 'pro', 'max', 'mini', 'plus', 'lite', 'ultra'}
+QUALIFIER_MISMATCH_PENALTY = 0.5
+CATALOG_EXCLUDE = {'business_tools'}  # Our own app, not something members resell
+MATCH_CACHE_SIZE = 2048
+WORD_RE = re.compile(r"[a-z]+|\d+")
+
+def normalize_item(text: str) -> str:
+    """Lowercase words with digits split off and aliases expanded: 'AP2' -> 'airpods 2'."""
+    words = WORD_RE.findall(text.lower().replace("'", ''))
+    return ' '.join(ITEM_ALIASES.get(word, word) for word in words)
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def catalog_products(knowledge_base: dict) -> list:
+    """(name, section, product dict or None) for every catalog product, first mention wins.
+
+    Covers each section's products list and the top_selling_products
+    entries, which read "Name - why it sells".
+    """
+    found = []
+    seen = set()
+
+    def add(name, section, product=None):
+        key = normalize_item(name)
+        if key and key not in seen:
+            seen.add(key)
+            found.append((name, section, product))
+
+    for section, value in knowledge_base.items():
+        if section in CATALOG_EXCLUDE:
+            continue
+        if isinstance(value, dict) and isinstance(value.get('products'), list):
+            for product in value['products']:
+                if isinstance(product, dict) and product.get('name'):
+                    add(product['name'], section, product)
+    for category, entries in (knowledge_base.get('top_selling_products') or {}).items():
+        for entry in entries if isinstance(entries, list) else []:
+            if isinstance(entry, str):
+                add(entry.split(' - ', 1)[0].strip(), category)
+    return found
+
+class CatalogMatcher:
+    """Trigram and word-prefix index over catalog product names.
+
+    A logged item is scored against every product sharing a trigram: the
+    Dice overlap of their trigrams averaged with the share of item words that
+    prefix a product word, with penalties when model numbers or variant
+    qualifiers disagree.
+    """
+
+    def __init__(self, products: list):
+        self.names = []
+        self.keys = []
+        self.sections = []
+        self.products = []
+        self.grams = []
+        self.numbers = []
+        self.qualifiers = []
+        self.bases = []  # Name without numbers and qualifiers, e.g. 'airpods'
+        self.postings = {}  # trigram -> product ids
+        self.prefixes = {}  # word prefix -> product ids
+        self.cache = {}  # normalized item -> (product id, score) or None
+        for pid, (name, section, product) in enumerate(products):
+            key = normalize_item(name)
+            self.names.append(name)
+            self.keys.append(key)
+            self.sections.append(section)
+            self.products.append(product)
+            grams = trigrams(key)
+            self.grams.append(len(grams))
+            self.numbers.append(frozenset(word for word in key.split() if word.isdigit()))
+            self.qualifiers.append(frozenset(word for word in key.split() if word in QUALIFIER_WORDS))
+            self.bases.append(' '.join(
+                word for word in key.split() if not word.isdigit() and word not in QUALIFIER_WORDS
+            ))
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(pid)
+            for word in key.split():
+                for end in range(min(MIN_PREFIX, len(word)), len(word) + 1):
+                    ids = self.prefixes.setdefault(word[:end], set())
+                    ids.add(pid)
+        # Product lines where the model number matters, like AirPods 2 / 3 / Pro 2
+        self.numbered_bases = {base for base, numbers in zip(self.bases, self.numbers) if numbers}
+
+    @classmethod
+    def from_kb(cls, knowledge_base: dict) -> 'CatalogMatcher':
+        return cls(catalog_products(knowledge_base))
+
+    def __len__(self):
+        return len(self.names)
+
+    def _best(self, key: str):
+        grams = trigrams(key)
+        shared = {}
+        for gram in grams:
+            for pid in self.postings.get(gram, ()):
+                shared[pid] = shared.get(pid, 0) + 1
+        if not shared:
+            return None
+        words = key.split()
+        numbers = frozenset(word for word in words if word.isdigit())
+        qualifiers = frozenset(word for word in words if word in QUALIFIER_WORDS)
+        scores = []
+        whole = set()  # Products every item word prefixes
+        for pid, count in shared.items():
+            dice = 2 * count / (len(grams) + self.grams[pid])
+            covered = sum(1 for word in words if pid in self.prefixes.get(word, ()))
+            if covered == len(words):
+                whole.add(pid)
+            score = (dice + covered / len(words)) / 2
+            if numbers != self.numbers[pid]:
+                if numbers and (self.numbers[pid] or self.bases[pid] in self.numbered_bases):
+                    score *= NUMBER_MISMATCH_PENALTY
+                else:
+                    score *= UNNUMBERED_PENALTY
+            if qualifiers != self.qualifiers[pid]:
+                score *= QUALIFIER_MISMATCH_PENALTY
+            scores.append((score, pid))
+        scores.sort(reverse=True)
+        score, pid = scores[0]
+        if score < MATCH_THRESHOLD:
+            return None
+        if len(scores) > 1:
+            runner_score, runner = scores[1]
+            if score - runner_score < AMBIGUITY_MARGIN:
+                return None
+            # An item that only names what two products share, like "dyson", is a guess
+            # unless it is the top product's full name
+            if runner_score >= MATCH_THRESHOLD and {pid, runner} <= whole and key != self.keys[pid]:
+                return None
+        return pid, score
+
+    def match(self, item: str):
+        """(canonical name, section, product dict or None, score) for a logged item, or None."""
+        key = normalize_item(item)
+        if not key:
+            return None
+        if key not in self.cache:
+            if len(self.cache) >= MATCH_CACHE_SIZE:
+                self.cache.pop(next(iter(self.cache)))
+            self.cache[key] = self._best(key)
+        found = self.cache[key]
+        if found is None:
+            return None
+        pid, score = found
+        return self.names[pid], self.sections[pid], self.products[pid], score
+
+    def canonical(self, item: str):
+        """Catalog name for a logged item, or None when nothing matches well enough."""
+        found = self.match(item)
+        return found[0] if found else None
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+
+logger = logging.getLogger('InvexBot')
+
+# Never allow more in-flight calls than pooled connections
+MODEL_MAX_CONCURRENCY = int(os.getenv('MODEL_MAX_CONCURRENCY', os.getenv('MODEL_POOL_SIZE', '10')))
+MODEL_INITIAL_CONCURRENCY = int(os.getenv('MODEL_INITIAL_CONCURRENCY', '4'))
+DECREASE_FACTOR = 0.7  # Multiplicative decrease on overload
+LATENCY_TOLERANCE = 3.0  # A call this many times slower than the baseline counts as congestion
+BASELINE_ALPHA = 0.05  # EWMA weight for the healthy-latency baseline
+MIN_DECREASE_INTERVAL = 1.0  # Seconds; at most one decrease per round trip
+
+OVERLOAD_STATUS = {429, 503, 529}
+OVERLOAD_ERRORS = {'APITimeoutError', 'TimeoutError', 'ReadTimeout'}
+
+def is_overload(error: Exception) -> bool:
+    if getattr(error, 'status_code', None) in OVERLOAD_STATUS:
+        return True
+    return any(cls.__name__ in OVERLOAD_ERRORS for cls in type(error).__mro__)
+
+class AdaptiveLimiter:
+    """AIMD limit on in-flight model calls, driven by latency and overload errors.
+
+    Each healthy call made while the limit is full adds 1/limit (about +1
+    per round trip at full load); an overload error or a call far slower
+    than the baseline multiplies the limit by DECREASE_FACTOR. Calls over the limit wait in FIFO order.
+    Baselines are kept per key (the model tier), since a large-tier answer
+    is normally several times slower than a fast-tier one.
+    """
+
+    def __init__(self, initial=MODEL_INITIAL_CONCURRENCY, min_limit=1, max_limit=MODEL_MAX_CONCURRENCY):
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit, min_limit)
+        self.limit = float(min(max(initial, min_limit), self.max_limit))
+        self.inflight = 0
+        self.waiters = deque()
+        self.baselines = {}  # key -> seconds, EWMA of healthy call latency
+        self.last_decrease = 0.0
+        self.queue_delays = deque(maxlen=500)
+        self.increases = 0
+        self.decreases = 0
+
+    async def run(self, make_call, key: str = 'default'):
+        """Await make_call() once a slot is free, then adjust the limit from the outcome.
+
+        key picks the latency baseline the call is judged against.
+        """
+        await self._acquire()
+        started = time.perf_counter()
+        outcome = None
+        try:
+            result = await make_call()
+            outcome = 'ok'
+            return result
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            outcome = 'overload' if is_overload(e) else None
+            raise
+        finally:
+            self.inflight -= 1
+            self._adjust(outcome, time.perf_counter() - started, key)
+            self._wake()
+
+    async def _acquire(self):
+        enqueued = time.perf_counter()
+        if self.inflight < int(self.limit) and not self.waiters:
+            self.inflight += 1
+            self.queue_delays.append(0.0)
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted a slot just as we were cancelled; hand it on
+                self.inflight -= 1
+                self._wake()
+            else:
+                self.waiters.remove(waiter)
+            raise
+        self.queue_delays.append(time.perf_counter() - enqueued)
+
+    def _wake(self):
+        while self.waiters and self.inflight < int(self.limit):
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                self.inflight += 1
+                waiter.set_result(None)
+
+    def _adjust(self, outcome, latency: float, key: str = 'default'):
+        baseline = self.baselines.get(key)
+        if outcome == 'ok':
+            congested = baseline is not None and latency > baseline * LATENCY_TOLERANCE
+            self.baselines[key] = latency if baseline is None else (
+                baseline + BASELINE_ALPHA * (latency - baseline)
+            )
+            if not congested:
+                # Only grow a limit that is actually in use (this call has
+                # already left inflight), or a quiet spell would ratchet it up
+                saturated = self.inflight >= int(self.limit) - 1 or self.waiters
+                if saturated and self.limit < self.max_limit:
+                    self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                    self.increases += 1
+                return
+        elif outcome != 'overload':
+            return  # Cancelled or a client error; says nothing about capacity
+
+        now = time.monotonic()
+        if now - self.last_decrease < max(MIN_DECREASE_INTERVAL, baseline or 0):
+            return
+        self.last_decrease = now
+        old = self.limit
+        self.limit = max(self.min_limit, self.limit * DECREASE_FACTOR)
+        self.decreases += 1
+        reason = 'slow call' if outcome == 'ok' else 'overload'
+        logger.info(f"Model concurrency limit {old:.1f} -> {self.limit:.1f} ({reason})")
+
+    def stats(self) -> dict:
+        delays = sorted(self.queue_delays)
+        return {
+            'limit': round(self.limit, 2),
+            'inflight': self.inflight,
+            'queued': len(self.waiters),
+            'queue_p50_ms': round(delays[len(delays) // 2] * 1000) if delays else 0,
+            'queue_p95_ms': round(delays[min(len(delays) - 1, int(len(delays) * 0.95))] * 1000) if delays else 0,
+            'baselines_ms': {key: round(baseline * 1000) for key, baseline in sorted(self.baselines.items())},
+            'increases': self.increases,
+            'decreases': self.decreases
+        }
+
+model_limiter = AdaptiveLimiter()
@@ -1,22 +1,27 @@
 from datetime import datetime, timedelta
-import json
 import logging
+from message_analyzer import parse_message
+from stage_engine import stage_engine
+from achievements import achievement_engine
 
 logger = logging.getLogger('InvexBot')
 
+HISTORY_KEEP_MESSAGES = 2  # Latest turn kept verbatim; older messages are folded into the summary
+HISTORY_MAX_MESSAGES = 20  # Hard cap in case summarization falls behind
+PROFILE_SAVE_ATTEMPTS = 3  # Re-applies of a change after another worker saved the profile first
+
 class ConversationManager:
-    def __init__(self):
+    def __init__(self, store=None, namespace: int = 0, spill=None):
         self.conversations = {}
+        # Optional shared state store; profiles are cached here and reloaded
+        # when another worker process saves a newer version
+        self.store = store
+        # Optional on-disk store for profiles evicted under memory pressure
+        self.spill = spill
+        self.namespace = namespace
+        self.versions = {}
+        self.conflicts = 0  # Saves that lost the race to another worker and were re-applied
         self.expiry_time = timedelta(minutes=30)  # Conversation expires after 30 minutes
-        self.achievements = {
-            'first_chat': ' First Chat',
-            'budget_set': ' Budget Planner',
-            'first_sale': ' First Sale',
-            'quick_response': ' Speed Demon',
-            'bulk_buyer': ' Bulk Master',
-            'profit_maker': ' Profit Pro',
-            'feedback_king': ' Feedback King'
-        }
         
     def get_user_context(self, user_id: str) -> dict:
         """Get or create user context."""
@@ -25,6 +30,11 @@ class ConversationManager:
         # Clean up expired conversations
         self._cleanup_expired()
         
+        if self.store:
+            self._sync(user_id)
+        elif self.spill and user_id not in self.conversations:
+            self._restore(user_id)
+        
         # Get or create user conversation
         if user_id not in self.conversations:
             self.conversations[user_id] = {
@@ -48,27 +58,46 @@ class ConversationManager:
                 },
                 'history': []
             }
+            self.save(user_id)
         else:
             self.conversations[user_id]['last_updated'] = now
+            if self.store:
+                self.store.touch_profile(self.namespace, user_id)
             
         return self.conversations[user_id]['context']
     
+    def mutate(self, user_id: str, apply) -> bool:
+        """Run apply(conversation) on the latest copy of a profile and save it.
+        
+        With a shared store another worker may save the profile between our
+        read and our write; the save is then refused, the newer copy is
+        reloaded and apply runs again on it, so neither change is lost.
+        """
+        for _ in range(PROFILE_SAVE_ATTEMPTS):
+            self.get_user_context(user_id)
+            apply(self.conversations[user_id])
+            self.conversations[user_id]['last_updated'] = datetime.now()
+            if self.save(user_id):
+                return True
+        logger.warning(f"Gave up saving profile for user {user_id} after {PROFILE_SAVE_ATTEMPTS} conflicts")
+        return False
+    
     def update_context(self, user_id: str, updates: dict):
         """Update user context with new information."""
         if user_id in self.conversations:
-            self.conversations[user_id]['context'].update(updates)
-            self.conversations[user_id]['last_updated'] = datetime.now()
+            self.mutate(user_id, lambda conversation: conversation['context'].update(updates))
             logger.info(f"Updated context for user {user_id}: {updates}")
     
     def add_to_history(self, user_id: str, message: str, is_bot: bool = False):
         """Add a message to the conversation history."""
         if user_id in self.conversations:
-            self.conversations[user_id]['history'].append({
-                'timestamp': datetime.now(),
-                'message': message,
-                'is_bot': is_bot
-            })
-            self.conversations[user_id]['last_updated'] = datetime.now()
+            entry = {'timestamp': datetime.now(), 'message': message, 'is_bot': is_bot}
+            
+            def append(conversation):
+                conversation['history'].append(entry)
+                del conversation['history'][:-HISTORY_MAX_MESSAGES]
+            
+            self.mutate(user_id, append)
     
     def get_conversation_history(self, user_id: str, limit: int = 5) -> list:
         """Get recent conversation history."""
@@ -76,6 +105,31 @@ class ConversationManager:
             return self.conversations[user_id]['history'][-limit:]
         return []
     
+    def get_summary(self, user_id: str) -> str:
+        """Get the rolling summary of everything before the latest turn."""
+        if user_id in self.conversations:
+            return self.conversations[user_id].get('summary', '')
+        return ''
+    
+    def pending_summary(self, user_id: str) -> list:
+        """Messages older than the latest turn that haven't been summarized yet."""
+        if user_id in self.conversations:
+            return self.conversations[user_id]['history'][:-HISTORY_KEEP_MESSAGES]
+        return []
+    
+    def apply_summary(self, user_id: str, summary: str, folded: list):
+        """Store a new summary and drop the history messages it covers."""
+        if user_id not in self.conversations:
+            return
+        # Messages may have been added or capped while the summary was generated
+        last = folded[-1]['timestamp']
+        
+        def fold(conversation):
+            conversation['history'][:] = [entry for entry in conversation['history'] if entry['timestamp'] > last]
+            conversation['summary'] = summary
+        
+        self.mutate(user_id, fold)
+    
     def _cleanup_expired(self):
         """Remove expired conversations."""
         now = datetime.now()
@@ -85,180 +139,136 @@ class ConversationManager:
         ]
         for user_id in expired:
             del self.conversations[user_id]
+            self.versions.pop(user_id, None)
+            if self.store:
+                self.store.delete_idle_profile(self.namespace, user_id, self.expiry_time.total_seconds())
             logger.info(f"Cleaned up expired conversation for user {user_id}")
     
+    def _sync(self, user_id: str):
+        """Reload a user's profile if another process saved a newer version."""
+        version = self.store.profile_version(self.namespace, user_id)
+        if version is None:
+            self.conversations.pop(user_id, None)
+            self.versions.pop(user_id, None)
+        elif version != self.versions.get(user_id):
+            loaded = self.store.load_profile(self.namespace, user_id)
+            if loaded:
+                self.versions[user_id], self.conversations[user_id] = loaded
+    
+    def _restore(self, user_id: str):
+        """Bring back a profile evicted to disk, unless it has expired since."""
+        loaded = self.spill.load_profile(self.namespace, user_id)
+        if loaded:
+            self.spill.delete_profile(self.namespace, user_id)
+            profile = loaded[1]
+            if datetime.now() - profile['last_updated'] <= self.expiry_time:
+                self.conversations[user_id] = profile
+    
+    def evict_idle(self, idle_seconds: float) -> int:
+        """Move profiles idle for idle_seconds out of memory; returns how many.
+        
+        With a shared store the profile is already persisted and is reloaded
+        on next use; otherwise it is written to the spill store first.
+        """
+        cutoff = datetime.now() - timedelta(seconds=idle_seconds)
+        cold = [user_id for user_id, data in self.conversations.items() if data['last_updated'] < cutoff]
+        for user_id in cold:
+            profile = self.conversations.pop(user_id)
+            self.versions.pop(user_id, None)
+            if not self.store and self.spill:
+                self.spill.save_profile(self.namespace, user_id, profile)
+        return len(cold)
+    
+    def users_pending_summary(self) -> list:
+        """Users with messages older than the latest turn that the summary doesn't cover yet."""
+        return [user_id for user_id, data in self.conversations.items() if len(data['history']) > HISTORY_KEEP_MESSAGES]
+    
+    def history_size(self) -> int:
+        return sum(len(data['history']) for data in self.conversations.values())
+    
+    def save(self, user_id: str) -> bool:
+        """Write a user's profile through to the shared store, if any.
+        
+        Returns False when another worker saved a newer version first; the
+        newer copy is reloaded in place of ours.
+        """
+        if not self.store or user_id not in self.conversations:
+            return True
+        version = self.store.replace_profile(
+            self.namespace, user_id, self.conversations[user_id], self.versions.get(user_id)
+        )
+        if version is None:
+            self.conflicts += 1
+            self._sync(user_id)
+            return False
+        self.versions[user_id] = version
+        return True
+    
     def get_next_question(self, user_id: str) -> str:
         """Get the next question to ask based on conversation stage."""
-        context = self.get_user_context(user_id)
-        stage = context.get('conversation_stage', 'initial')
-        
-        # Simple, focused questions for each stage
-        questions = {
-            'initial': "Hey! What's your budget for starting out? ",
-            
-            'budget_set': {
-                'low': "Perfect! With ${budget}, I recommend starting with AirPods - they're only $10.90 to buy and you can sell them for $60-80! Want me to explain how? ",
-                'medium': "Nice! ${budget} is a good start. Are you interested in electronics like AirPods, or fashion items like designer clothes? ",
-                'high': "Awesome! ${budget} gives you lots of options. What catches your interest more: electronics, fashion, or luxury items? "
-            },
-            
-            'interests_set': "Have you sold anything like this before? ",
-            
-            'experience_set': {
-                'beginner': "No worries! Everyone starts somewhere. Want some tips on how to get your first sale? ",
-                'intermediate': "Great experience! Ready to learn some pro strategies to boost your profits? ",
-                'advanced': "Impressive! Would you like to explore some advanced scaling techniques? "
-            },
-            
-            'follow_up': {
-                'default': "What specific part would you like to know more about? ",
-                'product': "Want to see the current best-selling items in this category? ",
-                'pricing': "Would you like some pricing strategies for maximum profit? ",
-                'supplier': "Should I tell you about our exclusive supplier network? "
-            }
-        }
-        
-        # Get appropriate question based on stage and context
-        if stage == 'budget_set':
-            budget = context.get('budget', 0)
-            if budget <= 20:  # More specific low budget handling
-                question = questions['budget_set']['low']
-            elif budget < 200:
-                question = questions['budget_set']['medium']
-            else:
-                question = questions['budget_set']['high']
-            question = question.replace('${budget}', f'${budget}')
-            
-        elif stage == 'experience_set':
-            exp_level = context.get('experience_level', 'beginner')
-            question = questions['experience_set'].get(exp_level, questions['experience_set']['beginner'])
-            
-        elif stage == 'follow_up':
-            last_topic = context.get('last_topic', 'default')
-            question = questions['follow_up'].get(last_topic, questions['follow_up']['default'])
-            
-        else:
-            question = questions.get(stage, questions['follow_up']['default'])
-        
-        # Add InvexPro promotion if appropriate
-        if context.get('should_promote_invexpro'):
-            promotion_context = context.get('promotion_context', '')
-            if stage in ['experience_set', 'follow_up']:
-                # Make promotion more casual and integrated
-                promotions = {
-                    'track your inventory': "BTW, our InvexPro app makes tracking inventory super easy! Want to check it out? ",
-                    'track packages': "Quick tip: our InvexPro app can handle all your tracking needs! Interested? ",
-                    'access exclusive suppliers': "Hey, want access to our exclusive supplier network through InvexPro? ",
-                    'scale your business': "Ready to scale up? Our InvexPro app can help with that! Want to learn more? ",
-                    'calculate profits': "BTW, InvexPro can auto-calculate all your profits! Interested? ",
-                    'manage customer': "Pro tip: InvexPro makes customer management a breeze! Want to see how? "
-                }
-                
-                for key, promo in promotions.items():
-                    if key in promotion_context:
-                        return promo
-        
-        return question
+        return stage_engine.next_question(self.get_user_context(user_id))
 
-    def analyze_message(self, user_id: str, message: str) -> dict:
+    def analyze_message(self, user_id: str, message: str, signals: dict = None) -> dict:
         """Analyze user message for context updates and promotion opportunities."""
-        message_lower = message.lower()
+        if signals is None:
+            signals = parse_message(message)
         updates = {}
         
         # Check for InvexPro promotion triggers
-        promotion_triggers = {
-            'inventory': 'track your inventory and manage stock levels',
-            'tracking': 'track packages, sales, and customer data',
-            'supplier': 'access exclusive suppliers with 2-day delivery',
-            'scaling': 'scale your business with automated tools',
-            'profit': 'calculate profits and track expenses',
-            'customer': 'manage customer relationships',
-            'shipping': 'track shipments and manage deliveries'
-        }
-        
-        for trigger, context in promotion_triggers.items():
-            if trigger in message_lower:
-                updates['should_promote_invexpro'] = True
-                updates['promotion_context'] = context
+        if signals['promotion_context']:
+            updates['should_promote_invexpro'] = True
+            updates['promotion_context'] = signals['promotion_context']
         
         # Budget detection
-        if any(word in message_lower for word in ['budget', 'spend', 'invest', '$']):
-            import re
-            amounts = re.findall(r'\$?(\d+(?:\.\d{2})?)', message)
-            if amounts:
-                updates['budget'] = float(amounts[0])
-                updates['conversation_stage'] = 'budget_set'
-                
-                # If budget indicates serious business, suggest InvexPro
-                if float(amounts[0]) > 100:
-                    updates['should_promote_invexpro'] = True
-                    updates['promotion_context'] = 'scale your business efficiently'
+        budget = signals['budget']
+        if budget is not None:
+            updates['budget'] = budget
+            
+            # If budget indicates serious business, suggest InvexPro
+            if budget > 100:
+                updates['should_promote_invexpro'] = True
+                updates['promotion_context'] = 'scale your business efficiently'
         
         # Interest detection
-        product_keywords = {
-            'electronics': ['electronics', 'airpods', 'phones', 'gadgets', 'tech'],
-            'fashion': ['clothes', 'fashion', 'shoes', 'apparel', 'wear'],
-            'accessories': ['accessories', 'watches', 'jewelry', 'bags']
-        }
-        
-        for category, keywords in product_keywords.items():
-            if any(word in message_lower for word in keywords):
-                context = self.get_user_context(user_id)
-                interests = context.get('interests', [])
-                if category not in interests:
-                    interests.append(category)
-                    updates['interests'] = interests
-                    updates['conversation_stage'] = 'interests_set'
+        if signals['interests']:
+            interests = list(self.get_user_context(user_id).get('interests', []))
+            new_interests = [c for c in signals['interests'] if c not in interests]
+            if new_interests:
+                updates['interests'] = interests + new_interests
         
         # Experience level detection with InvexPro promotion opportunities
-        experience_keywords = {
-            'beginner': ['new', 'beginner', 'starting', 'never', 'first time'],
-            'intermediate': ['some', 'few months', 'year'],
-            'advanced': ['experienced', 'professional', 'years']
-        }
+        level = signals['experience_level']
+        if level:
+            updates['experience_level'] = level
+            
+            # Suggest InvexPro for intermediate and advanced users
+            if level in ['intermediate', 'advanced']:
+                updates['should_promote_invexpro'] = True
+                updates['promotion_context'] = 'take your business to the next level'
         
-        for level, keywords in experience_keywords.items():
-            if any(word in message_lower for word in keywords):
-                updates['experience_level'] = level
-                updates['conversation_stage'] = 'experience_set'
-                
-                # Suggest InvexPro for intermediate and advanced users
-                if level in ['intermediate', 'advanced']:
-                    updates['should_promote_invexpro'] = True
-                    updates['promotion_context'] = 'take your business to the next level'
+        # Advance the conversation stage from whatever this message set
+        stage = stage_engine.transition(updates)
+        if stage:
+            updates['conversation_stage'] = stage
         
         return updates
 
-    def update_achievements(self, user_id: str, context: dict) -> list:
-        """Update and return new achievements for the user."""
-        user_achievements = context.get('achievements', [])
-        new_achievements = []
-        
-        # Check for new achievements
-        if not user_achievements:
-            new_achievements.append(self.achievements['first_chat'])
-        
-        if context.get('budget') and 'budget_set' not in user_achievements:
-            new_achievements.append(self.achievements['budget_set'])
+    def update_achievements(self, user_id: str, context: dict, changed_fields=None) -> list:
+        """Update and return new achievements for the user.
         
-        if context.get('sales_count', 0) >= 1 and 'first_sale' not in user_achievements:
-            new_achievements.append(self.achievements['first_sale'])
-        
-        if context.get('avg_response_time', 3600) < 1800 and 'quick_response' not in user_achievements:
-            new_achievements.append(self.achievements['quick_response'])
-        
-        if context.get('bulk_purchases', 0) >= 5 and 'bulk_buyer' not in user_achievements:
-            new_achievements.append(self.achievements['bulk_buyer'])
-        
-        if context.get('total_profit', 0) >= 500 and 'profit_maker' not in user_achievements:
-            new_achievements.append(self.achievements['profit_maker'])
-        
-        if context.get('positive_feedback', 0) >= 10 and 'feedback_king' not in user_achievements:
-            new_achievements.append(self.achievements['feedback_king'])
+        Pass the context fields that just changed to only check the rules
+        watching them; None checks every rule.
+        """
+        if 'achievement_bits' not in context:
+            changed_fields = None  # First check for this user
+        bits, new_achievements = achievement_engine.evaluate(context, changed_fields)
         
         # Update user's achievements
-        context['achievements'] = list(set(user_achievements + new_achievements))
-        self.update_context(user_id, context)
+        if new_achievements or 'achievement_bits' not in context:
+            self.update_context(user_id, {
+                'achievement_bits': bits,
+                'achievements': achievement_engine.names_for(bits)
+            })
         
         return new_achievements
     
@@ -314,7 +324,7 @@ class ConversationManager:
 
     def reset_user_context(self, user_id: str):
         """Reset a user's context to initial state."""
-        self.conversations[user_id] = {
+        fresh = {
             'last_updated': datetime.now(),
             'context': {
                 'budget': None,
@@ -337,3 +347,9 @@ class ConversationManager:
             },
             'history': []
         }
+        
+        def reset(conversation):
+            conversation.clear()
+            conversation.update(fresh)
+        
+        self.mutate(user_id, reset)
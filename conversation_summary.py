@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import os
+
+from concurrency_limit import model_limiter
+from model_resilience import CircuitBreaker, ResilientCaller
+from model_router import model_router
+
+logger = logging.getLogger('InvexBot')
+
+SUMMARY_MODEL = os.getenv('SUMMARY_MODEL', 'claude-3-5-haiku-20241022')
+SUMMARY_TIER = 'fast'  # Tier whose prices apply to summaries in the token ledger
+SUMMARY_MAX_TOKENS = 200
+SUMMARY_MESSAGE_CHARS = 600  # Older bot answers are clipped before being summarized
+SUMMARY_SYSTEM = (
+    "You maintain a running summary of a chat between a reselling advisor bot and a member. "
+    "Merge the new messages into the existing summary. Keep facts about the member (budget, "
+    "interests, experience, products and platforms discussed, advice already given, open "
+    "questions). Write at most 80 words of plain text, no preamble."
+)
+
+def clip(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit] + "..."
+
+class ConversationSummarizer:
+    """Folds older conversation turns into a per-user summary in the background."""
+
+    def __init__(self, model: str = SUMMARY_MODEL):
+        self.model = model
+        # Own retries and breaker: failing summaries must not open the breaker /ai answers use
+        self.caller = ResilientCaller(breaker=CircuitBreaker(name='Summary'))
+        self.running = set()  # (guild_id, user_id) with a summary in progress
+        self.tasks = set()
+        self.runs = 0
+        self.failures = 0
+
+    def schedule(self, client, state, user_id: str) -> bool:
+        """Start summarizing a user's older turns unless it's already running; True if started."""
+        key = (state.guild_id, user_id)
+        if client is None or key in self.running or self.caller.breaker.is_open:
+            return False
+        if not state.conversation_manager.pending_summary(user_id):
+            return False
+        self.running.add(key)
+        task = asyncio.create_task(self._run(client, state, user_id, key))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return True
+
+    async def _run(self, client, state, user_id: str, key):
+        conversation_manager = state.conversation_manager
+        try:
+            # Keep folding while new exchanges arrive during the model call
+            while True:
+                folded = conversation_manager.pending_summary(user_id)
+                if not folded:
+                    break
+                summary, usage = await self.summarize(client, conversation_manager.get_summary(user_id), folded)
+                self.runs += 1
+                if usage is not None:
+                    state.tokens.record(
+                        user_id, usage.input_tokens, usage.output_tokens, model_router.cost(SUMMARY_TIER, usage)
+                    )
+                conversation_manager.apply_summary(user_id, summary, folded)
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Error summarizing conversation for user {user_id}: {str(e)}")
+        finally:
+            self.running.discard(key)
+
+    async def summarize(self, client, summary: str, messages: list) -> tuple:
+        """Ask the model to merge messages into the existing summary; returns (summary, usage)."""
+        transcript = "\n".join(
+            f"{'Bot' if msg['is_bot'] else 'User'}: {clip(msg['message'], SUMMARY_MESSAGE_CHARS)}"
+            for msg in messages
+        )
+        # Shares the concurrency limit with the answers it competes with
+        response = await self.caller.call(lambda: model_limiter.run(lambda: client.messages.create(
+            model=self.model,
+            max_tokens=SUMMARY_MAX_TOKENS,
+            temperature=0,
+            system=SUMMARY_SYSTEM,
+            messages=[{
+                "role": "user",
+                "content": f"Existing summary:\n{summary or '(none)'}\n\nNew messages:\n{transcript}"
+            }]
+        ), key='summary'), key='summary')
+        if not response.content:
+            raise ValueError("empty summary response")
+        return response.content[0].text.strip(), getattr(response, 'usage', None)
+
+    def stats(self) -> dict:
+        return {'runs': self.runs, 'failures': self.failures, 'running': len(self.running), 'breaker': self.caller.breaker.state}
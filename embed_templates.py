@@ -0,0 +1,159 @@
+import discord
+
+# Static embeds are built once as payload dicts. Sending one only copies the
+# payload and patches the few dynamic values (mention, summary, timestamp).
+
+def _field(name, value, inline=False):
+    return {'name': name, 'value': value, 'inline': inline}
+
+VERIFY_COLOR = discord.Color.from_rgb(87, 242, 135).value  # Nice green color
+
+TIPS_FIELDS = {
+    'new': _field(
+        "🌟 Getting Started",
+        "• Start with AirPods - only $10.90 to buy\n"
+        "• Take clear, well-lit photos\n"
+        "• Price slightly below retail\n"
+        "• List on Facebook Marketplace first\n"
+        "• Respond quickly to messages"
+    ),
+    'growing': _field(
+        "📈 Growing Your Business",
+        "• Try listing on multiple platforms\n"
+        "• Build a positive feedback score\n"
+        "• Track your profits carefully\n"
+        "• Consider buying in bulk\n"
+        "• Maintain quick shipping times"
+    ),
+    'scaling': _field(
+        "🚀 Scaling Up",
+        "• Diversify your product range\n"
+        "• Build supplier relationships\n"
+        "• Consider using InvexPro for tracking\n"
+        "• Optimize your pricing strategy\n"
+        "• Focus on customer retention"
+    )
+}
+
+PROGRESS_FIELDS = {
+    'new': _field("💡 Quick Tip", "Start with AirPods - they're perfect for beginners with high profit margins!"),
+    'growing': _field("💡 Pro Tip", "Try listing on multiple platforms to increase your sales!"),
+    'scaling': _field("📱 Level Up Your Business", "Ready to scale? Try InvexPro to manage your growing inventory!")
+}
+
+EMBED_TEMPLATES = {
+    'verify': {
+        'title': "🔐 Verification Process",
+        'description': (
+            "Hey {mention}! Let's get you verified and unlock access to our community!\n"
+            "Follow these simple steps:"
+        ),
+        'color': VERIFY_COLOR,
+        'fields': [
+            _field("Step 1️⃣", "Type `/verify` in this channel"),
+            _field(
+                "Step 2️⃣",
+                "Fill out the quick verification form with:\n"
+                "• Your preferred name 📝\n"
+                "• What brings you to Invex Resell 🎯\n"
+                "• A fun fact about yourself ✨"
+            ),
+            _field("Step 3️⃣", "Get instant access to our community! 🚀")
+        ],
+        'footer': {'text': "We can't wait to meet you! 🤝"}
+    },
+    'help': {
+        'title': "📚 InvexBot Commands Guide",
+        'description': "Here are all the commands you can use:",
+        'color': discord.Color.blue().value,
+        'fields': [
+            _field(
+                "🤝 Getting Started",
+                "`/start` - Begin your reselling journey with personalized advice\n"
+                "Example: `/start`"
+            ),
+            _field(
+                "📊 Track Your Progress",
+                "`/update` - Update your reselling progress\n"
+                "Options:\n"
+                "• Add Sale 📈\n"
+                "• Add Feedback ⭐\n"
+                "• Update Stats 📊\n"
+                "• Reset Progress 🔄\n"
+                "Example: `/update`\n\n"
+                "`/progress` - View your achievements and stats\n"
+                "Example: `/progress`\n\n"
+                "`/stats` - Weekly, monthly, platform and item breakdown\n"
+                "Example: `/stats`\n\n"
+                "`/leaderboard` - See the top resellers in the server\n"
+                "Example: `/leaderboard`"
+            ),
+            _field(
+                "❓ Help & Information",
+                "`/commands` - Show this help message\n"
+                "Example: `/commands`\n\n"
+                "`/tips` - Get reselling tips based on your progress\n"
+                "Example: `/tips`"
+            )
+        ],
+        'footer': {'text': "💡 Tip: Use /start to begin your reselling journey!"}
+    },
+    'thinking': {
+        'title': "🤔 Thinking...",
+        'description': "Let me search my knowledge base and consult with Claude...",
+        'color': discord.Color.blue().value
+    },
+    'ai_response': {
+        'title': "🎯 Reselling Advice",
+        'description': "Here's what I found for: *{question}*\n\n{response}",
+        'color': discord.Color.green().value,
+        'footer': {'text': "Source: {source}{page} | Powered by Invex AI"}
+    }
+}
+
+for _tier, _tip in TIPS_FIELDS.items():
+    EMBED_TEMPLATES[f'tips_{_tier}'] = {
+        'title': "💡 Personalized Reselling Tips",
+        'color': discord.Color.green().value,
+        'fields': [_tip]
+    }
+
+for _tier, _tip in PROGRESS_FIELDS.items():
+    EMBED_TEMPLATES[f'progress_{_tier}'] = {
+        'title': "🏆 Your Reselling Journey",
+        'color': discord.Color.gold().value,
+        'fields': [_tip]
+    }
+EMBED_TEMPLATES['progress'] = {
+    'title': "🏆 Your Reselling Journey",
+    'color': discord.Color.gold().value
+}
+
+def sales_tier(sales_count: int) -> str:
+    """Bucket a sales count into the tiers used by tips and progress."""
+    if sales_count == 0:
+        return 'new'
+    if sales_count < 5:
+        return 'growing'
+    return 'scaling'
+
+def progress_template(context: dict) -> str:
+    """Pick the progress embed template for a user's context."""
+    tier = sales_tier(context.get('sales_count', 0))
+    if tier == 'scaling' and context.get('uses_invexpro'):
+        return 'progress'
+    return f'progress_{tier}'
+
+def render_embed(name: str, values: dict = None, timestamp=False, **patches) -> discord.Embed:
+    """Build an embed from a prebuilt template, patching only dynamic fields."""
+    payload = dict(EMBED_TEMPLATES[name])
+    if 'fields' in payload:
+        payload['fields'] = list(payload['fields'])
+    if values:
+        payload['description'] = payload['description'].format(**values)
+        if 'footer' in payload:
+            payload['footer'] = {'text': payload['footer']['text'].format(**values)}
+    if timestamp:
+        payload['timestamp'] = discord.utils.utcnow().isoformat()
+    payload.update(patches)
+    return discord.Embed.from_dict(payload)
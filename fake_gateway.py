@@ -0,0 +1,222 @@
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import random
+
+from aiohttp import WSMsgType, web
+
+logger = logging.getLogger('InvexBot')
+
+API_PREFIX = '/api/v10'
+HEARTBEAT_INTERVAL_MS = 41250
+APPLICATION_ID = '1000'
+BOT_USER = {'id': APPLICATION_ID, 'username': 'InvexBot', 'discriminator': '0', 'global_name': None,
+            'avatar': None, 'bot': True}
+MEMBER_JOINED_AT = '2024-01-01T00:00:00+00:00'
+
+def json_response(data) -> web.Response:
+    # discord.py only parses bodies whose content type is exactly application/json
+    return web.Response(body=json.dumps(data).encode(), headers={'Content-Type': 'application/json'})
+
+def shard_for(guild_id: int, shard_count: int) -> int:
+    """Discord's shard formula."""
+    return (guild_id >> 22) % shard_count
+
+def fake_guild(guild_id: int) -> dict:
+    """GUILD_CREATE payload: the bot as the only member, @everyone and one text channel."""
+    return {
+        'id': str(guild_id),
+        'name': f"Fake Guild {guild_id >> 22}",
+        'icon': None,
+        'owner_id': '1',
+        'unavailable': False,
+        'large': False,
+        'member_count': 1,
+        'features': [],
+        'emojis': [],
+        'stickers': [],
+        'roles': [{'id': str(guild_id), 'name': '@everyone', 'permissions': '0', 'position': 0,
+                   'color': 0, 'hoist': False, 'managed': False, 'mentionable': False}],
+        'channels': [{'id': str(guild_id + 1), 'type': 0, 'name': 'general', 'position': 0,
+                      'permission_overwrites': []}],
+        'members': [{'user': BOT_USER, 'roles': [], 'joined_at': MEMBER_JOINED_AT, 'deaf': False, 'mute': False, 'flags': 0}],
+        'threads': [],
+        'voice_states': [],
+        'presences': []
+    }
+
+class FakeSession:
+    """One shard's gateway connection."""
+
+    def __init__(self, ws, url: str):
+        self.ws = ws
+        self.url = url
+        self.seq = 0
+        self.shard = (0, 1)
+
+    async def dispatch(self, event: str, data: dict):
+        self.seq += 1
+        await self.ws.send_json({'op': 0, 't': event, 's': self.seq, 'd': data})
+
+class FakeDiscord:
+    """Stand-in for Discord's REST API and gateway, enough to log in, shard and sync commands.
+
+    Guilds are spread over shards with Discord's own formula, so a sharded
+    bot only receives its shards' guilds. Point the bot at it with
+    DISCORD_API_BASE=http://host:port/api/v10 and
+    DISCORD_GATEWAY_URL=ws://host:port/gateway.
+    """
+
+    def __init__(self, guilds: int = 4, shard_count: int = 1):
+        self.shard_count = shard_count
+        self.guild_ids = [(n + 1) << 22 for n in range(guilds)]
+        self.sessions = {}  # shard_id -> FakeSession
+        self.commands = {}  # None for global or guild ID -> synced command payloads
+        self.ids = itertools.count(10 ** 17)
+        self.app = web.Application()
+        self.app.router.add_get('/gateway', self.gateway)
+        self.app.router.add_get(f'{API_PREFIX}/users/@me', self.current_user)
+        self.app.router.add_get(f'{API_PREFIX}/oauth2/applications/@me', self.application)
+        self.app.router.add_get(f'{API_PREFIX}/gateway', self.gateway_url)
+        self.app.router.add_get(f'{API_PREFIX}/gateway/bot', self.gateway_bot)
+        self.app.router.add_put(f'{API_PREFIX}/applications/{{app}}/commands', self.sync_commands)
+        self.app.router.add_put(f'{API_PREFIX}/applications/{{app}}/guilds/{{guild}}/commands', self.sync_commands)
+        self.app.router.add_route('*', f'{API_PREFIX}/{{tail:.*}}', self.anything_else)
+
+    def _ws_url(self, request) -> str:
+        return f"ws://{request.host}/gateway"
+
+    async def current_user(self, request):
+        return json_response(BOT_USER)
+
+    async def application(self, request):
+        return json_response({
+            'id': APPLICATION_ID, 'name': BOT_USER['username'], 'description': '', 'icon': None,
+            'bot_public': False, 'bot_require_code_grant': False, 'verify_key': '', 'flags': 0,
+            'owner': {'id': '1', 'username': 'owner', 'discriminator': '0', 'avatar': None}
+        })
+
+    async def gateway_url(self, request):
+        return json_response({'url': self._ws_url(request)})
+
+    async def gateway_bot(self, request):
+        return json_response({
+            'url': self._ws_url(request),
+            'shards': self.shard_count,
+            'session_start_limit': {'total': 1000, 'remaining': 1000, 'reset_after': 0, 'max_concurrency': 1}
+        })
+
+    async def sync_commands(self, request):
+        guild = request.match_info.get('guild')
+        synced = []
+        for command in await request.json():
+            command = dict(command, id=str(next(self.ids)), application_id=APPLICATION_ID, version='1')
+            if guild:
+                command['guild_id'] = guild
+            synced.append(command)
+        self.commands[int(guild) if guild else None] = synced
+        return json_response(synced)
+
+    async def anything_else(self, request):
+        logger.info(f"Fake Discord: {request.method} {request.path}")
+        return json_response({})
+
+    async def gateway(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        session = FakeSession(ws, self._ws_url(request))
+        await ws.send_json({'op': 10, 'd': {'heartbeat_interval': HEARTBEAT_INTERVAL_MS}, 's': None, 't': None})
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+            payload = json.loads(msg.data)
+            op = payload.get('op')
+            if op == 1:
+                await ws.send_json({'op': 11, 'd': None, 's': None, 't': None})
+            elif op == 2:
+                await self._identify(session, payload['d'])
+            elif op == 6:
+                # No sessions to resume; the client identifies again
+                await ws.send_json({'op': 9, 'd': False, 's': None, 't': None})
+            elif op == 8:
+                await session.dispatch('GUILD_MEMBERS_CHUNK', {
+                    'guild_id': payload['d']['guild_id'], 'members': [], 'chunk_index': 0, 'chunk_count': 1,
+                    'nonce': payload['d'].get('nonce')
+                })
+        if self.sessions.get(session.shard[0]) is session:
+            del self.sessions[session.shard[0]]
+        return ws
+
+    async def _identify(self, session: FakeSession, data: dict):
+        shard_id, shard_count = data.get('shard') or (0, 1)
+        session.shard = (shard_id, shard_count)
+        self.sessions[shard_id] = session
+        guild_ids = [g for g in self.guild_ids if shard_for(g, shard_count) == shard_id]
+        logger.info(f"Fake Discord: shard {shard_id}/{shard_count} identified with {len(guild_ids)} guilds")
+        await session.dispatch('READY', {
+            'v': 10,
+            'user': BOT_USER,
+            'guilds': [{'id': str(g), 'unavailable': True} for g in guild_ids],
+            'session_id': f"fake-{shard_id}",
+            'resume_gateway_url': session.url,
+            'shard': [shard_id, shard_count],
+            'application': {'id': APPLICATION_ID, 'flags': 0},
+            'private_channels': [],
+            'relationships': []
+        })
+        for guild_id in guild_ids:
+            await session.dispatch('GUILD_CREATE', fake_guild(guild_id))
+
+    async def send_message(self, guild_id: int, content: str, author_id: int = 2):
+        """Dispatch a MESSAGE_CREATE to the shard that owns guild_id; False if it isn't connected."""
+        session = self.sessions.get(shard_for(guild_id, self.shard_count))
+        if session is None:
+            return False
+        await session.dispatch('MESSAGE_CREATE', {
+            'id': str(next(self.ids)),
+            'channel_id': str(guild_id + 1),
+            'guild_id': str(guild_id),
+            'author': {'id': str(author_id), 'username': f"member{author_id}", 'discriminator': '0', 'avatar': None},
+            'member': {'roles': [], 'joined_at': MEMBER_JOINED_AT, 'deaf': False, 'mute': False, 'flags': 0},
+            'content': content,
+            'timestamp': MEMBER_JOINED_AT,
+            'tts': False,
+            'mention_everyone': False,
+            'mentions': [],
+            'mention_roles': [],
+            'attachments': [],
+            'embeds': [],
+            'pinned': False,
+            'type': 0
+        })
+        return True
+
+async def run(args):
+    fake = FakeDiscord(args.guilds, args.shards)
+    runner = web.AppRunner(fake.app)
+    await runner.setup()
+    await web.TCPSite(runner, args.host, args.port).start()
+    print(f"Fake Discord on http://{args.host}:{args.port}: "
+          f"DISCORD_API_BASE=http://{args.host}:{args.port}{API_PREFIX} "
+          f"DISCORD_GATEWAY_URL=ws://{args.host}:{args.port}/gateway")
+    try:
+        while True:
+            if args.rate > 0:
+                await asyncio.sleep(1 / args.rate)
+                await fake.send_message(random.choice(fake.guild_ids), "hello")
+            else:
+                await asyncio.sleep(3600)
+    finally:
+        await runner.cleanup()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local fake Discord REST API and gateway for sharding tests")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--guilds', type=int, default=4, help="Number of fake guilds")
+    parser.add_argument('--shards', type=int, default=2, help="Shard count reported by /gateway/bot")
+    parser.add_argument('--rate', type=float, default=0.0, help="MESSAGE_CREATE events per second across all guilds")
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(parser.parse_args()))
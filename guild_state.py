@@ -0,0 +1,124 @@
+import logging
+import time
+from collections import deque
+
+from conversation_manager import ConversationManager
+from state_store import MemoryStateStore
+from leaderboard import Leaderboard
+from rollups import GuildRollups
+from token_ledger import TokenLedger
+
+logger = logging.getLogger('InvexBot')
+
+DM_PARTITION = 0  # Interactions outside a guild share one partition
+
+class GuildState:
+    """Per-guild partition of the bot's in-memory state."""
+
+    def __init__(self, guild_id: int, shard_id: int = 0, store=None, spill=None):
+        self.guild_id = guild_id
+        self.shard_id = shard_id
+        # Rate limits and verification attempts go through the store so they
+        # hold across worker processes when it is shared
+        self.store = store or MemoryStateStore()
+        self.conversation_manager = ConversationManager(
+            store=self.store if self.store.shared else None,
+            namespace=guild_id,
+            spill=spill
+        )
+        self.leaderboard = Leaderboard(self.store.get_value(self.leaderboard_key))
+        self.rollups = GuildRollups(self.store.get_value(self.rollup_key))
+        self.tokens = TokenLedger(self.store.get_value(self.ledger_key))
+
+    @property
+    def rollup_key(self) -> str:
+        return f"rollups:{self.guild_id}"
+
+    @property
+    def ledger_key(self) -> str:
+        return f"tokens:{self.guild_id}"
+
+    @property
+    def leaderboard_key(self) -> str:
+        return f"leaderboard:{self.guild_id}"
+
+    def snapshot_rollups(self):
+        """Persist the guild rollups, token ledger and leaderboard so they survive restarts on a shared store."""
+        self.store.set_value(self.rollup_key, self.rollups.snapshot())
+        self.store.set_value(self.ledger_key, self.tokens.snapshot())
+        self.store.set_value(self.leaderboard_key, self.leaderboard.snapshot())
+
+    def key(self, kind: str, user_id: str) -> str:
+        return f"{kind}:{self.guild_id}:{user_id}"
+
+    def hit_rate_limit(self, kind: str, user_id: str, limit: int, window: float):
+        """Count a request; returns (allowed, seconds until the window resets)."""
+        return self.store.hit_window(self.key(kind, user_id), limit, window)
+
+class GuildStateRegistry:
+    """Lazily creates one GuildState per guild, grouped by shard."""
+
+    def __init__(self, store=None, spill=None):
+        self.guilds = {}
+        self.store = store
+        self.spill = spill
+
+    def get(self, guild_id, shard_id: int = 0) -> GuildState:
+        guild_id = guild_id or DM_PARTITION
+        state = self.guilds.get(guild_id)
+        if state is None:
+            state = self.guilds[guild_id] = GuildState(guild_id, shard_id, self.store, self.spill)
+        return state
+
+    def for_interaction(self, interaction) -> GuildState:
+        guild = interaction.guild
+        return self.get(interaction.guild_id, guild.shard_id if guild else 0)
+
+    def for_shard(self, shard_id: int) -> list:
+        return [state for state in self.guilds.values() if state.shard_id == shard_id]
+
+    def drop(self, guild_id):
+        """Forget a guild's partition, e.g. when the bot is removed from it."""
+        if self.guilds.pop(guild_id, None) is not None:
+            logger.info(f"Dropped state partition for guild {guild_id}")
+
+class ShardMetrics:
+    """Per-shard event rate over a sliding window."""
+
+    def __init__(self, window: float = 60.0):
+        self.window = window
+        self.events = {}
+        self.totals = {}
+
+    def record(self, shard_id):
+        shard_id = shard_id or 0
+        now = time.monotonic()
+        events = self.events.setdefault(shard_id, deque(maxlen=10000))
+        events.append(now)
+        self.totals[shard_id] = self.totals.get(shard_id, 0) + 1
+
+    def event_rate(self, shard_id) -> float:
+        """Events per second over the last window."""
+        events = self.events.get(shard_id)
+        if not events:
+            return 0.0
+        cutoff = time.monotonic() - self.window
+        while events and events[0] < cutoff:
+            events.popleft()
+        return len(events) / self.window
+
+    def snapshot(self, latencies, registry: GuildStateRegistry) -> list:
+        """Latency, event rate and partition size for each shard."""
+        rows = []
+        for shard_id, latency in latencies:
+            partitions = registry.for_shard(shard_id)
+            rows.append({
+                'shard_id': shard_id,
+                'latency_ms': round(latency * 1000, 1) if latency == latency else None,  # NaN before first heartbeat
+                'events_per_sec': round(self.event_rate(shard_id), 2),
+                'total_events': self.totals.get(shard_id, 0),
+                'guilds': len(partitions),
+                'tracked_users': sum(len(s.conversation_manager.conversations) for s in partitions),
+                'save_conflicts': sum(s.conversation_manager.conflicts for s in partitions)
+            })
+        return rows
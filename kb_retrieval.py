@@ -0,0 +1,129 @@
+import math
+import re
+
+import numpy as np
+
+MIN_ENTRY_TERMS = 3
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'but', 'by', 'can', 'do', 'for', 'from', 'how',
+    'i', 'if', 'in', 'is', 'it', 'me', 'my', 'of', 'on', 'or', 'so', 'that', 'the', 'their',
+    'them', 'they', 'this', 'to', 'was', 'what', 'when', 'where', 'which', 'who', 'why', 'will',
+    'with', 'you', 'your', 'should', 'would', 'could', 'get', 'any', 'some', 'best'
+}
+
+def tokenize(text: str) -> list:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+def _label(path: str) -> str:
+    """Searchable words from an entry path, e.g. 'best reselling platforms ebay tips'."""
+    return re.sub(r"\[\d+\]", "", path).replace('.', ' ').replace('_', ' ')
+
+def flatten_entries(knowledge_base: dict) -> list:
+    """Turn the KB into retrievable entries: one per advice string or product."""
+    entries = []
+
+    def walk(section, path, value):
+        if isinstance(value, str):
+            # Skip list headers ("At this budget, you can get:") and bare names
+            if not value.rstrip().endswith(':') and len(tokenize(value)) >= MIN_ENTRY_TERMS:
+                entries.append({'section': section, 'path': path, 'text': value})
+        elif isinstance(value, list):
+            for i, item in enumerate(value):
+                walk(section, f"{path}[{i}]", item)
+        elif isinstance(value, dict):
+            if 'name' in value and ('description' in value or 'selling_points' in value):
+                parts = [value['name'], value.get('description', ''), value.get('target_market', '')]
+                parts.extend(p for p in value.get('selling_points', []) if isinstance(p, str))
+                entries.append({
+                    'section': section,
+                    'path': path,
+                    'text': f"{value['name']} - {value.get('description', '')}",
+                    'search_text': ' '.join(p for p in parts if isinstance(p, str)),
+                    'product': value
+                })
+                return
+            for key, sub in value.items():
+                if key == 'name':
+                    continue
+                if isinstance(sub, str):
+                    # Keyed strings like common_questions.storage_tips read fine on their own
+                    terms = tokenize(sub)
+                    if len(terms) >= MIN_ENTRY_TERMS - 1 and any(t.isalpha() for t in terms):
+                        entries.append({'section': section, 'path': f"{path}.{key}", 'text': sub})
+                else:
+                    walk(section, f"{path}.{key}", sub)
+
+    for section, value in knowledge_base.items():
+        walk(section, section, value)
+    return entries
+
+class KnowledgeIndex:
+    """TF-IDF matrix over KB entries; a query is one gather plus a dot product.
+
+    The matrix is stored term-major (vocab x entries, float32) so scoring
+    only touches the rows for terms that appear in the query.
+    """
+
+    def __init__(self, knowledge_base: dict):
+        self.entries = flatten_entries(knowledge_base)
+        docs = [
+            tokenize(f"{_label(e['path'])} {e.get('search_text', e['text'])}")
+            for e in self.entries
+        ]
+        self.vocab = {}
+        for doc in docs:
+            for term in set(doc):
+                self.vocab.setdefault(term, len(self.vocab))
+
+        n_docs = len(docs)
+        doc_freq = np.zeros(len(self.vocab), dtype=np.float32)
+        counts = []
+        for doc in docs:
+            tf = {}
+            for term in doc:
+                tf[self.vocab[term]] = tf.get(self.vocab[term], 0) + 1
+            counts.append(tf)
+            for index in tf:
+                doc_freq[index] += 1
+        self.idf = (np.log((1 + n_docs) / (1 + doc_freq)) + 1).astype(np.float32)
+
+        matrix = np.zeros((len(self.vocab), n_docs), dtype=np.float32)
+        for j, tf in enumerate(counts):
+            for index, count in tf.items():
+                matrix[index, j] = (1 + math.log(count)) * self.idf[index]
+        norms = np.linalg.norm(matrix, axis=0)
+        norms[norms == 0] = 1
+        self.matrix = matrix / norms
+
+    @classmethod
+    def from_parts(cls, entries: list, vocab: dict, idf, matrix) -> 'KnowledgeIndex':
+        """Rebuild an index from precomputed parts, e.g. a KB snapshot."""
+        index = cls.__new__(cls)
+        index.entries = entries
+        index.vocab = vocab
+        index.idf = idf
+        index.matrix = matrix
+        return index
+
+    def search(self, query: str, k: int = 5, min_score: float = 0.1) -> list:
+        """Top-k (score, entry) pairs by cosine similarity."""
+        tf = {}
+        for term in tokenize(query):
+            index = self.vocab.get(term)
+            if index is not None:
+                tf[index] = tf.get(index, 0) + 1
+        if not tf:
+            return []
+        rows = np.fromiter(tf.keys(), dtype=np.int64)
+        weights = np.array([(1 + math.log(c)) for c in tf.values()], dtype=np.float32) * self.idf[rows]
+        weights /= np.linalg.norm(weights)
+        scores = weights @ self.matrix[rows]
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), self.entries[i]) for i in top if scores[i] >= min_score]
+
+    def nbytes(self) -> int:
+        return self.matrix.nbytes + self.idf.nbytes
@@ -0,0 +1,225 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import re
+import sys
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: the atomic renames still keep each file whole
+    fcntl = None
+
+logger = logging.getLogger('InvexBot')
+
+KB_JSON_PATH = os.getenv('KB_JSON_PATH', 'knowledge_base.json')
+KB_SNAPSHOT_PATH = os.getenv('KB_SNAPSHOT_PATH', 'knowledge_base.snapshot')
+SNAPSHOT_FORMAT = 1  # Bump when the snapshot layout changes
+
+PRICE_RE = re.compile(r"\d+(?:\.\d+)?")
+# Fields a catalog product may carry, and which of them are required
+PRODUCT_FIELDS = {
+    'name': str,
+    'description': str,
+    'price_range': str,
+    'selling_price': str,
+    'profit_margin': str,
+    'target_market': (str, list),
+    'selling_points': list,
+    'key_features': list,
+    'upcoming_features': list,
+    'promotion_triggers': list
+}
+PRODUCT_REQUIRED = ('name', 'description')
+
+def parse_price_range(text: str):
+    """(low, high) from '10.90', '35-40' or '95.00-98.00'; None if unparseable."""
+    prices = PRICE_RE.findall(text or '')
+    if not prices:
+        return None
+    return float(prices[0]), float(prices[-1])
+
+def validate(knowledge_base) -> list:
+    """Schema problems in the KB as readable strings; empty when valid."""
+    errors = []
+    if not isinstance(knowledge_base, dict):
+        return ["top level must be an object of sections"]
+
+    def check(path, value):
+        if isinstance(value, dict):
+            for key, sub in value.items():
+                check(f"{path}.{key}", sub)
+            products = value.get('products')
+            if products is not None:
+                if not isinstance(products, list):
+                    errors.append(f"{path}.products must be a list")
+                    return
+                for i, product in enumerate(products):
+                    check_product(f"{path}.products[{i}]", product)
+        elif isinstance(value, list):
+            for i, item in enumerate(value):
+                check(f"{path}[{i}]", item)
+        elif not isinstance(value, (str, int, float, bool)) and value is not None:
+            errors.append(f"{path} has unsupported type {type(value).__name__}")
+
+    def check_product(path, product):
+        if not isinstance(product, dict):
+            errors.append(f"{path} must be an object")
+            return
+        for field in PRODUCT_REQUIRED:
+            if not product.get(field):
+                errors.append(f"{path} is missing {field}")
+        for field, kind in PRODUCT_FIELDS.items():
+            if field in product and not isinstance(product[field], kind):
+                names = ' or '.join(k.__name__ for k in (kind if isinstance(kind, tuple) else (kind,)))
+                errors.append(f"{path}.{field} must be a {names}")
+        if isinstance(product.get('price_range'), str) and parse_price_range(product['price_range']) is None:
+            errors.append(f"{path}.price_range {product['price_range']!r} has no price")
+
+    for section, value in knowledge_base.items():
+        check(section, value)
+    return errors
+
+def prepare(knowledge_base: dict) -> dict:
+    """Pre-parse catalog price ranges into price_min/price_max on each product."""
+    for value in knowledge_base.values():
+        if isinstance(value, dict) and isinstance(value.get('products'), list):
+            for product in value['products']:
+                prices = parse_price_range(product.get('price_range', '')) if isinstance(product, dict) else None
+                if prices:
+                    product['price_min'], product['price_max'] = prices
+    return knowledge_base
+
+def intern_strings(value):
+    """Copy of value with every string interned, so repeated text is stored once."""
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, dict):
+        return {sys.intern(key): intern_strings(sub) for key, sub in value.items()}
+    if isinstance(value, list):
+        return [intern_strings(item) for item in value]
+    return value
+
+def _source_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def _code_hash() -> str:
+    """Hash of the code that shapes a snapshot, so editing prepare() or the index invalidates it."""
+    import kb_retrieval
+
+    digest = hashlib.sha256()
+    for path in (__file__, kb_retrieval.__file__):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+@contextmanager
+def _locked(snapshot_path: str, exclusive: bool):
+    """Hold a lock on the snapshot so no worker loads one file of a half-written pair."""
+    try:
+        f = open(f"{snapshot_path}.lock", 'a') if fcntl else None
+    except OSError:  # Read-only disk: nothing can rebuild the snapshot under us either
+        f = None
+    if f is None:
+        yield
+        return
+    with f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def _write_atomic(path: str, write):
+    """Write through a temp file unique to this writer, then rename it over path."""
+    directory, name = os.path.split(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(dir=directory, prefix=f"{name}.", suffix='.tmp', delete=False) as f:
+        try:
+            write(f)
+        except BaseException:
+            f.close()
+            os.unlink(f.name)
+            raise
+    os.replace(f.name, path)
+
+def build_snapshot(json_path: str = KB_JSON_PATH, snapshot_path: str = KB_SNAPSHOT_PATH) -> dict:
+    """Validate the KB JSON and compile it, with its retrieval index, into a snapshot.
+
+    The KB and index metadata are pickled together (so products shared by
+    the index and the KB stay one object); the TF-IDF matrix is written as
+    a .npy file next to it so it can be memory-mapped on load.
+    """
+    import numpy as np
+    from kb_retrieval import KnowledgeIndex
+
+    with open(json_path, 'rb') as f:
+        data = f.read()
+    knowledge_base = json.loads(data)
+    errors = validate(knowledge_base)
+    if errors:
+        raise ValueError(f"{len(errors)} schema errors in {json_path}: " + "; ".join(errors[:10]))
+
+    knowledge_base = intern_strings(prepare(knowledge_base))
+    index = KnowledgeIndex(knowledge_base)
+    payload = {
+        'format': SNAPSHOT_FORMAT,
+        'source_sha256': _source_hash(data),
+        'code_sha256': _code_hash(),
+        'kb': knowledge_base,
+        'entries': index.entries,
+        'vocab': index.vocab,
+        'idf': index.idf
+    }
+    # Several workers may rebuild at once: each writes its own temp files,
+    # and the lock swaps the matrix and the payload in as one pair
+    with _locked(snapshot_path, exclusive=True):
+        _write_atomic(f"{snapshot_path}.npy", lambda f: np.save(f, index.matrix))
+        _write_atomic(snapshot_path, lambda f: pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL))
+    return {
+        'sections': len(knowledge_base),
+        'entries': len(index.entries),
+        'terms': len(index.vocab),
+        'source_bytes': len(data),
+        'snapshot_bytes': os.path.getsize(snapshot_path),
+        'matrix_bytes': index.matrix.nbytes
+    }
+
+def load_snapshot(json_path: str = KB_JSON_PATH, snapshot_path: str = KB_SNAPSHOT_PATH):
+    """Return (knowledge_base, KnowledgeIndex) from the snapshot, or None if it's missing or stale."""
+    if not os.path.exists(snapshot_path) or not os.path.exists(f"{snapshot_path}.npy"):
+        return None
+    with open(json_path, 'rb') as f:
+        source_hash = _source_hash(f.read())
+
+    import numpy as np
+    from kb_retrieval import KnowledgeIndex
+
+    with _locked(snapshot_path, exclusive=False):
+        with open(snapshot_path, 'rb') as f:
+            payload = pickle.load(f)
+        if (payload.get('format') != SNAPSHOT_FORMAT or payload.get('source_sha256') != source_hash
+                or payload.get('code_sha256') != _code_hash()):
+            logger.warning(f"Knowledge base snapshot {snapshot_path} is stale")
+            return None
+        # The map keeps this file's data even if a rebuild replaces it later
+        matrix = np.load(f"{snapshot_path}.npy", mmap_mode='r')
+    index = KnowledgeIndex.from_parts(payload['entries'], payload['vocab'], payload['idf'], matrix)
+    return payload['kb'], index
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    paths = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    json_path = paths[0] if paths else KB_JSON_PATH
+    if '--check' in sys.argv:
+        problems = validate(json.load(open(json_path)))
+        for problem in problems:
+            print(problem)
+        sys.exit(1 if problems else 0)
+    try:
+        print(build_snapshot(json_path))
+    except ValueError as e:
+        print(str(e))
+        sys.exit(1)
@@ -0,0 +1,131 @@
+from bisect import bisect_left, insort
+
+LEADERBOARD_METRICS = {
+    'total_profit': 'Total Profit',
+    'sales_count': 'Sales',
+    'positive_feedback': 'Positive Feedback'
+}
+PAGE_SIZE = 10
+
+CHUNK_SIZE = 256  # Chunks split in two past twice this many entries
+
+class RankedIndex:
+    """One metric kept sorted as (-value, user_id) in bisectable chunks.
+
+    An update only shifts entries within one chunk, and rank is a bisect
+    plus the lengths of the chunks before it, so large boards stay cheap.
+    """
+
+    def __init__(self, values: dict = None):
+        self.values = {user_id: value for user_id, value in (values or {}).items() if value}
+        entries = sorted((-value, user_id) for user_id, value in self.values.items())
+        self.chunks = [entries[i:i + CHUNK_SIZE] for i in range(0, len(entries), CHUNK_SIZE)]
+        self.maxes = [chunk[-1] for chunk in self.chunks]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def _insert(self, entry):
+        if not self.chunks:
+            self.chunks.append([entry])
+            self.maxes.append(entry)
+            return
+        i = min(bisect_left(self.maxes, entry), len(self.chunks) - 1)
+        chunk = self.chunks[i]
+        insort(chunk, entry)
+        self.maxes[i] = chunk[-1]
+        if len(chunk) > 2 * CHUNK_SIZE:
+            self.chunks[i:i + 1] = [chunk[:CHUNK_SIZE], chunk[CHUNK_SIZE:]]
+            self.maxes[i:i + 1] = [chunk[CHUNK_SIZE - 1], chunk[-1]]
+
+    def _remove(self, entry):
+        i = bisect_left(self.maxes, entry)
+        chunk = self.chunks[i]
+        del chunk[bisect_left(chunk, entry)]
+        if chunk:
+            self.maxes[i] = chunk[-1]
+        else:
+            del self.chunks[i]
+            del self.maxes[i]
+
+    def rank(self, user_id: str):
+        """Zero-based rank, or None if the user isn't ranked."""
+        value = self.values.get(user_id)
+        if value is None:
+            return None
+        entry = (-value, user_id)
+        i = bisect_left(self.maxes, entry)
+        return sum(len(chunk) for chunk in self.chunks[:i]) + bisect_left(self.chunks[i], entry)
+
+    def update(self, user_id: str, value):
+        """Set a user's value; returns (old rank, new rank)."""
+        old_rank = self.rank(user_id)
+        if old_rank is not None:
+            self._remove((-self.values.pop(user_id), user_id))
+        if not value:
+            return old_rank, None
+        self.values[user_id] = value
+        self._insert((-value, user_id))
+        return old_rank, self.rank(user_id)
+
+    def page(self, page: int, size: int = PAGE_SIZE) -> list:
+        start = page * size
+        rows = []
+        for chunk in self.chunks:
+            if start >= len(chunk):
+                start -= len(chunk)
+                continue
+            rows.extend(chunk[start:start + size - len(rows)])
+            start = 0
+            if len(rows) == size:
+                break
+        return [(user_id, -neg) for neg, user_id in rows]
+
+class Leaderboard:
+    """Per-guild rankings for every tracked metric, with rendered page caching."""
+
+    def __init__(self, saved: dict = None):
+        saved = saved or {}
+        self.indexes = {metric: RankedIndex(saved.get(metric)) for metric in LEADERBOARD_METRICS}
+        self.pages = {}  # (metric, page) -> rendered text
+
+    def update_user(self, user_id: str, context: dict):
+        """Refresh a user's position after their stats change."""
+        for metric, index in self.indexes.items():
+            value = context.get(metric, 0) or 0
+            if index.values.get(user_id, 0) == value:
+                continue
+            old_rank, new_rank = index.update(user_id, value)
+            self._invalidate(metric, old_rank, new_rank, len(index))
+
+    def _invalidate(self, metric: str, old_rank, new_rank, size: int):
+        """Drop cached pages whose contents the rank change could affect."""
+        if old_rank is None or new_rank is None:
+            # Someone joined or left the board, shifting every rank after them
+            first = old_rank if new_rank is None else new_rank
+            last = size
+        else:
+            first, last = min(old_rank, new_rank), max(old_rank, new_rank)
+        for page in range(first // PAGE_SIZE, last // PAGE_SIZE + 1):
+            self.pages.pop((metric, page), None)
+
+    def render_page(self, metric: str, page: int) -> str:
+        key = (metric, page)
+        if key not in self.pages:
+            rows = self.indexes[metric].page(page)
+            lines = []
+            for offset, (user_id, value) in enumerate(rows):
+                shown = f"${value:,.2f}" if metric == 'total_profit' else f"{value:,}"
+                lines.append(f"**#{page * PAGE_SIZE + offset + 1}** <@{user_id}> - {shown}")
+            self.pages[key] = "\n".join(lines)
+        return self.pages[key]
+
+    def rank_of(self, metric: str, user_id: str):
+        """One-based rank and board size; rank is None if unranked."""
+        index = self.indexes[metric]
+        rank = index.rank(user_id)
+        return (rank + 1 if rank is not None else None), len(index)
+
+    def snapshot(self) -> dict:
+        """Saveable {metric: {user_id: value}}; the indexes are rebuilt from it on load."""
+        return {metric: dict(index.values) for metric, index in self.indexes.items()}
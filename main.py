@@ -1,15 +1,36 @@
+from startup import startup
 import os
 import discord
 from discord import app_commands
 from discord.ext import commands
 from dotenv import load_dotenv
 import asyncio
-from datetime import datetime, timedelta
+import gc
+import io
+import sys
+import time
+import tracemalloc
+from datetime import datetime
 import json
-import anthropic
 import re
 import logging
-from conversation_manager import ConversationManager
+from guild_state import GuildStateRegistry, ShardMetrics
+from state_store import create_state_store, SQLiteStateStore, SPILL_DB_PATH
+from message_analyzer import parse_message
+from stage_engine import stage_engine
+from embed_templates import render_embed, sales_tier, progress_template
+from leaderboard import LEADERBOARD_METRICS
+from sales_stats import ensure_sales_stats, record_sale, recent_weeks, recent_months, top_buckets
+from conversation_manager import HISTORY_KEEP_MESSAGES
+from conversation_summary import ConversationSummarizer, clip
+from model_router import classify, model_router
+from model_resilience import ModelUnavailable, model_caller
+from concurrency_limit import model_limiter
+from memory_governor import memory_governor
+from traffic_trace import trace_recorder
+from token_ledger import estimate_tokens
+from catalog_match import CatalogMatcher
+from answer_pages import PagedAnswer, answer_pages, page_button_id, parse_page_button, trim_to_sentence
 
 # Set up logging with more detailed format
 logging.basicConfig(
@@ -30,33 +51,268 @@ print(f"Claude API key loaded: {'Key exists' if CLAUDE_API_KEY else 'No key foun
 BASIC_MEMBER_ROLE_ID = 1213449559502622721  # Role ID directly in code
 MAX_AI_REQUESTS = 5  # Maximum number of AI requests per user per minute
 AI_COOLDOWN = 60  # Cooldown period in seconds
+VERIFY_COOLDOWN = 300  # Lockout after 3 failed verification attempts
+ROLLUP_SNAPSHOT_INTERVAL = 300  # Seconds between community rollup snapshots
+MAX_RATE_WINDOW = max(AI_COOLDOWN, VERIFY_COOLDOWN)  # Older rate-limit windows can be dropped
+PROFILE_EXPIRY_SECONDS = 1800  # Matches ConversationManager.expiry_time
+COLD_PROFILE_SECONDS = 300  # Profiles idle this long are evicted under high memory pressure
+IDLE_PROFILE_SECONDS = 60  # ...and this long under critical pressure
+MESSAGE_CACHE_SIZE = int(os.getenv('MESSAGE_CACHE_SIZE', '250'))  # discord.py default is 1000
+KB_ANSWER_THRESHOLD = 0.35  # Minimum similarity for /ai to answer from the knowledge base alone
+KB_ANSWER_ENTRIES = 3  # Entries shown in a knowledge base answer
+RETRIEVAL_TOP_K = 5  # Entries added to Claude's prompt context
+SELLER_PRODUCTS = 5  # Catalog products members sell most, added to product questions
+PRODUCT_KEYWORDS = ('sell', 'product', 'recommend', 'flip', 'buy', 'start', 'best')
+LATEST_TURN_CHARS = 800  # Cap on each verbatim message from the latest turn
+DISCORD_MESSAGE_CHARS = 2000
+PAGE_LABEL_CHARS = 40  # Room for the stage emoji and the "*Page n of n*" label on plain replies
+MESSAGE_PAGE_CHARS = DISCORD_MESSAGE_CHARS - PAGE_LABEL_CHARS  # Measured after highlighting
+EMBED_PAGE_CHARS = 3800  # Page size for answer embeds (descriptions allow 4096, with the question)
+QUESTION_CHARS = 200  # Question echoed at the top of each /ai answer page
+ANSWER_CONTINUATIONS = 2  # Extra calls that finish an answer cut off by max_tokens
+DEGRADED_MIN_SCORE = 0.05  # Looser KB match accepted while Claude is unavailable
+DEGRADED_PREFIX = "⚡ My AI brain is taking a quick break, so here's what I've got in my notes:\n\n"
+DEGRADED_NO_MATCH = "⚡ My AI brain is taking a quick break! Try asking again in a minute, or check out `/tips` meanwhile 🔄"
+# Replies when a token quota would be exceeded, keyed by TokenLedger quota name
+QUOTA_MESSAGES = {
+    'user_daily': "⏳ You've used today's AI allowance! It resets tomorrow - `/tips` and `/progress` still work meanwhile.",
+    'user_monthly': "📅 You've used this month's AI allowance! It resets on the 1st - `/tips` and `/progress` still work meanwhile.",
+    'guild_daily': "⏳ This server has used today's AI allowance. Try again tomorrow!",
+    'guild_monthly': "📅 This server has used this month's AI allowance. Try again next month!"
+}
+CANNED_ANSWERS_PATH = os.getenv('CANNED_ANSWERS_PATH', 'canned_answers.json')
 
-# Initialize Claude client
-claude = anthropic.Client(api_key=CLAUDE_API_KEY)
+# Comma separated guild IDs whose slash commands are synced instantly; empty syncs them globally
+GUILD_IDS = [int(g) for g in os.getenv('GUILD_IDS', '1207605096431493140').split(',') if g.strip()]
+# Set SHARDED=1 to run an AutoShardedBot, optionally with a fixed SHARD_COUNT
+SHARDED = os.getenv('SHARDED', '0') == '1'
+SHARD_COUNT = int(os.getenv('SHARD_COUNT')) if os.getenv('SHARD_COUNT') else None
+# Shards this process runs, e.g. SHARD_IDS=0,2 (set per worker by workers.py)
+SHARD_IDS = [int(s) for s in os.getenv('SHARD_IDS', '').split(',') if s.strip()] or None
+# WORKERS>1 starts that many bot processes splitting the shards between them
+WORKERS = int(os.getenv('WORKERS', '1'))
+# Point REST calls and the gateway at a local fake Discord (see fake_gateway.py) for testing
+DISCORD_API_BASE = os.getenv('DISCORD_API_BASE')
+DISCORD_GATEWAY_URL = os.getenv('DISCORD_GATEWAY_URL')
 
-# Store AI request counts
-ai_requests = {}
+# Set DEFERRED_STARTUP=0 to finish warm-up before connecting to the gateway
+DEFERRED_STARTUP = os.getenv('DEFERRED_STARTUP', '1') != '0'
+WARMUP_MESSAGE = "⏳ I'm still warming up after a restart - try again in a few seconds!"
+UNAVAILABLE_MESSAGE = "⚠️ Part of me failed to start and is being retried - try again in a minute! 🔄"
 
-# Initialize conversation manager
-conversation_manager = ConversationManager()
+# Claude client, conversation manager and knowledge base are created by
+# warm_up() so the bot can connect to Discord without waiting on them
+claude = None
+model_transport = None
+
+# Conversations, AI rate limits and verification attempts, partitioned per guild
+guild_states = None
+shard_metrics = ShardMetrics()
+summarizer = ConversationSummarizer()
 
 # Load knowledge base
 def load_knowledge_base():
-    """Load the knowledge base from JSON file."""
+    """Load the knowledge base, preferring the compiled snapshot over the JSON file.
+    
+    A missing or stale snapshot is rebuilt first; the JSON is only read
+    directly when that fails, e.g. on schema errors or a read-only disk.
+    Returns (knowledge_base, prebuilt KnowledgeIndex or None).
+    """
+    from kb_snapshot import KB_JSON_PATH, build_snapshot, load_snapshot, prepare, validate
+    try:
+        snapshot = load_snapshot()
+        if snapshot is None:
+            logger.info(f"Built knowledge base snapshot: {build_snapshot()}")
+            snapshot = load_snapshot()
+        if snapshot:
+            logger.info("Knowledge base loaded from snapshot")
+            logger.info(f"Available sections: {list(snapshot[0].keys())}")
+            return snapshot
+    except Exception as e:
+        logger.error(f"Error loading knowledge base snapshot: {str(e)}")
     try:
-        with open('knowledge_base.json', 'r') as f:
+        with open(KB_JSON_PATH, 'r') as f:
             data = json.load(f)
+            for problem in validate(data):
+                logger.warning(f"Knowledge base schema: {problem}")
             logger.info("Knowledge base loaded successfully")
             logger.info(f"Available sections: {list(data.keys())}")
-            return data
+            return prepare(data), None
     except Exception as e:
         logger.error(f"Error loading knowledge base: {str(e)}")
-        return {}
+        return {}, None
+
+knowledge_base = {}
+kb_index = None
+catalog_matcher = None
+canned_answers = None
+
+async def snapshot_rollups_loop():
+    """Periodically snapshot every guild's rollups and leaderboard and write batched profile touches."""
+    while True:
+        await asyncio.sleep(ROLLUP_SNAPSHOT_INTERVAL)
+        for state in list(guild_states.guilds.values()):
+            try:
+                state.snapshot_rollups()
+            except Exception as e:
+                logger.error(f"Error snapshotting rollups for guild {state.guild_id}: {str(e)}")
+        if guild_states.store is not None:
+            try:
+                guild_states.store.flush_touches()
+            except Exception as e:
+                logger.error(f"Error writing profile touches: {str(e)}")
+
+def init_claude_client():
+    """Create the Claude client on the shared connection pool."""
+    global claude, model_transport
+    from model_transport import ModelTransport
+    model_transport = ModelTransport()
+    claude = model_transport.build_client(CLAUDE_API_KEY)
+
+def init_guild_states():
+    global guild_states
+    store = create_state_store()
+    if store.shared:
+        guild_states = GuildStateRegistry(store)
+    else:
+        # Profiles only live in memory, so give the governor somewhere to evict them
+        guild_states = GuildStateRegistry(spill=SQLiteStateStore(SPILL_DB_PATH))
+
+def _partitions():
+    return list(guild_states.guilds.values()) if guild_states else []
+
+def _freed(count, what):
+    return f"{count} {what}" if count else None
+
+def evict_profiles(idle_seconds):
+    return _freed(sum(s.conversation_manager.evict_idle(idle_seconds) for s in _partitions()), "profiles")
+
+def purge_state():
+    # Every partition shares the one SQLite store, so purge each store once
+    stores = {id(s.store): s.store for s in _partitions()}
+    purged = sum(store.purge_expired(MAX_RATE_WINDOW) for store in stores.values())
+    if guild_states and guild_states.spill:
+        purged += guild_states.spill.delete_stale_profiles(PROFILE_EXPIRY_SECONDS)
+    return _freed(purged, "entries")
+
+def clear_leaderboard_pages():
+    cleared = 0
+    for state in _partitions():
+        cleared += len(state.leaderboard.pages)
+        state.leaderboard.pages.clear()
+    return _freed(cleared, "pages")
+
+def fold_histories():
+    # Dropping older messages would lose turns the summary doesn't cover yet;
+    # summarize them now instead, and apply_summary frees them once folded
+    folding = 0
+    for state in _partitions():
+        conversation_manager = state.conversation_manager
+        for user_id in conversation_manager.users_pending_summary():
+            if summarizer.schedule(claude, state, user_id):
+                folding += len(conversation_manager.pending_summary(user_id))
+    return _freed(folding, "messages summarizing")
+
+def clear_message_cache():
+    messages = getattr(bot._connection, '_messages', None)
+    if not messages:
+        return None
+    count = len(messages)
+    messages.clear()
+    return _freed(count, "messages")
+
+def collect_garbage():
+    return _freed(gc.collect(), "objects")
+
+def stop_allocation_tracing():
+    # tracemalloc's own tables grow with every allocation a /memtrace session sees
+    if not tracemalloc.is_tracing():
+        return None
+    from profiling import profiler
+    profiler.trace_stop()
+    return "stopped"
+
+def init_memory_governor():
+    """Register what the governor reports on and how it relieves pressure."""
+    memory_governor.track('profiles', lambda: sum(len(s.conversation_manager.conversations) for s in _partitions()))
+    memory_governor.track('history_messages', lambda: sum(s.conversation_manager.history_size() for s in _partitions()))
+    memory_governor.track('rate_limit_windows', lambda: sum(len(getattr(s.store, 'windows', ())) for s in _partitions()))
+    memory_governor.track('stored_values', lambda: sum(len(getattr(s.store, 'values', ())) for s in _partitions()))
+    memory_governor.track('leaderboard_pages', lambda: sum(len(s.leaderboard.pages) for s in _partitions()))
+    memory_governor.track('cached_messages', lambda: len(bot.cached_messages))
+    memory_governor.track('cached_users', lambda: len(bot.users))
+    memory_governor.track('kb_index_kb', lambda: kb_index.nbytes() // 1024 if kb_index else 0)
+    memory_governor.track('canned_answers', lambda: len(canned_answers) if canned_answers else 0)
+    memory_governor.track('paged_answers', lambda: len(answer_pages))
+    memory_governor.track('token_ledger_users', lambda: sum(len(s.tokens.users) for s in _partitions()))
+    
+    memory_governor.on_pressure('elevated', 'expired state', purge_state)
+    memory_governor.on_pressure('elevated', 'leaderboard cache', clear_leaderboard_pages)
+    memory_governor.on_pressure('elevated', 'expired answer pages', lambda: _freed(answer_pages.purge_expired(), "answers"))
+    memory_governor.on_pressure('high', 'cold profiles', lambda: evict_profiles(COLD_PROFILE_SECONDS))
+    memory_governor.on_pressure('high', 'history', fold_histories)
+    memory_governor.on_pressure('high', 'allocation tracing', stop_allocation_tracing)
+    memory_governor.on_pressure('critical', 'idle profiles', lambda: evict_profiles(IDLE_PROFILE_SECONDS))
+    memory_governor.on_pressure('critical', 'message cache', clear_message_cache)
+    memory_governor.on_pressure('critical', 'answer pages', lambda: _freed(answer_pages.clear(), "answers"))
+    memory_governor.on_pressure('critical', 'gc', collect_garbage)
 
-knowledge_base = load_knowledge_base()
+def init_knowledge_base():
+    global knowledge_base, kb_index, catalog_matcher
+    knowledge_base, kb_index = load_knowledge_base()
+    catalog_matcher = CatalogMatcher.from_kb(knowledge_base)
+    logger.info(f"Catalog matcher ready: {len(catalog_matcher)} products")
 
-def get_relevant_context(query, user_context=None):
-    """Get relevant context from knowledge base based on query and user context."""
+def product_matcher():
+    """Logged item -> catalog product name function, or None before the knowledge base loads."""
+    return catalog_matcher.canonical if catalog_matcher is not None else None
+
+def init_kb_index():
+    """Vectorize the knowledge base for /ai and prompt context retrieval."""
+    global kb_index
+    if kb_index is None:
+        from kb_retrieval import KnowledgeIndex
+        kb_index = KnowledgeIndex(knowledge_base)
+    logger.info(
+        f"Knowledge index ready: {len(kb_index.entries)} entries, "
+        f"{len(kb_index.vocab)} terms, {kb_index.nbytes() / 1024:.0f} KB"
+    )
+
+def init_canned_answers():
+    """Load the pre-generated answers for frequent questions, if any."""
+    global canned_answers
+    if not os.path.exists(CANNED_ANSWERS_PATH):
+        logger.info("No canned answers file, every /ai question goes to Claude")
+        return
+    from canned_answers import CannedAnswers
+    canned_answers = CannedAnswers.load(CANNED_ANSWERS_PATH)
+    logger.info(f"Loaded {len(canned_answers)} canned answers")
+
+def startup_message(*names):
+    """Reply for a command whose phases aren't ready: failed ones are being retried."""
+    return UNAVAILABLE_MESSAGE if startup.has_failed(*names) else WARMUP_MESSAGE
+
+async def warm_up():
+    """Build the heavy resources in the background and log their timings."""
+    await startup.run_phase('guild_states', init_guild_states, retry=True)
+    await startup.run_phase('knowledge_base', init_knowledge_base, blocking=True, retry=True)
+    await startup.run_phase('kb_index', init_kb_index, blocking=True, retry=True)
+    await startup.run_phase('canned_answers', init_canned_answers, blocking=True, retry=True)
+    await startup.run_phase('claude', init_claude_client, blocking=True, retry=True)
+    if model_transport:
+        await startup.run_phase('model_pool', model_transport.warm)
+        bot.keep_alive_task = asyncio.create_task(model_transport.keep_alive_loop())
+    bot.rollup_task = asyncio.create_task(snapshot_rollups_loop())
+    await startup.run_phase('memory_governor', init_memory_governor)
+    bot.memory_task = asyncio.create_task(memory_governor.run())
+    startup.mark('warm_up_done')
+    logger.info(startup.report())
+
+def get_relevant_context(query, user_context=None, signals=None, top_products=None):
+    """Get relevant context from knowledge base based on query and user context.
+    
+    top_products are the guild's best-earning catalog products from GuildRollups.
+    """
     query = query.lower()
     relevant_sections = {}
     
@@ -66,10 +322,9 @@ def get_relevant_context(query, user_context=None):
         budget = float(user_context['budget'])
     else:
         # Try to extract budget from query
-        import re
-        amounts = re.findall(r'\$?(\d+(?:\.\d{2})?)', query)
-        if amounts:
-            budget = float(amounts[0])
+        if signals is None:
+            signals = parse_message(query)
+        budget = signals['amount']
     
     if budget is not None:
         # Always check electronics first for low budgets
@@ -78,12 +333,9 @@ def get_relevant_context(query, user_context=None):
                 electronics = knowledge_base['electronics']
                 affordable_products = []
                 for product in electronics.get('products', []):
-                    try:
-                        price = float(product['price_range'].split('-')[0])
-                        if price <= budget:
-                            affordable_products.append(product)
-                    except (ValueError, KeyError):
-                        continue
+                    price = product.get('price_min')  # Parsed from price_range at load
+                    if price is not None and price <= budget:
+                        affordable_products.append(product)
                 
                 if affordable_products:
                     relevant_sections['electronics'] = {
@@ -114,98 +366,66 @@ def get_relevant_context(query, user_context=None):
         if 'budget_recommendations' in knowledge_base:
             relevant_sections['budget_recommendations'] = knowledge_base['budget_recommendations']
     
+    # Ground product recommendations in what members actually sell
+    if budget is not None or any(keyword in query for keyword in PRODUCT_KEYWORDS):
+        selling = seller_lines(top_products or [], budget)
+        if selling:
+            relevant_sections['what_members_sell'] = selling
+        own = (user_context or {}).get('sales_stats', {}).get('products')
+        if own:
+            relevant_sections['products_you_sell'] = seller_lines(top_buckets(own, SELLER_PRODUCTS), None)
+    
+    # Add the closest individual entries the keywords above don't cover
+    if kb_index is not None:
+        hits = kb_index.search(query, k=RETRIEVAL_TOP_K)
+        related = [entry['text'] for score, entry in hits if entry['section'] not in relevant_sections]
+        if related:
+            relevant_sections['related_advice'] = related
+    
     return relevant_sections
 
+def seller_lines(products, budget):
+    """Prompt lines for (product, count, profit) rows, skipping products above the budget."""
+    lines = []
+    for name, count, profit in products[:SELLER_PRODUCTS]:
+        found = catalog_matcher.match(name) if catalog_matcher is not None else None
+        price = found[2].get('price_min') if found and found[2] else None
+        if budget is not None and price is not None and price > budget:
+            continue
+        lines.append(f"{name}: {count} sales, ${profit / count:,.2f} average profit"
+                     + (f", buy from ${price:,.2f}" if price is not None else ""))
+    return lines
+
 def search_knowledge_base(query):
-    """Search the knowledge base for relevant information."""
-    query = query.lower()
-    matches = []
-    
-    # Define keyword mappings
-    keyword_mappings = {
-        "platform": ["best_reselling_platforms"],
-        "sell": ["best_reselling_platforms", "pricing_strategies", "general_advice"],
-        "price": ["pricing_strategies", "budget_recommendations"],
-        "customer": ["customer_management"],
-        "storage": ["common_questions"],
-        "product": ["top_selling_products"],
-        "cologne": ["general_advice_colognes"],
-        "budget": ["budget_recommendations"],
-        "advice": ["general_advice", "buying_premium_advice"],
-    }
+    """Knowledge base entries that answer the query well enough to skip Claude."""
+    if kb_index is None:
+        return []
+    hits = kb_index.search(query, k=KB_ANSWER_ENTRIES)
+    if not hits or hits[0][0] < KB_ANSWER_THRESHOLD:
+        return []
+    return [entry['text'] for score, entry in hits if score >= KB_ANSWER_THRESHOLD]
+
+def build_prompt(query, context, signals, history=None, summary=None, top_products=None):
+    """Build the system message and messages array sent to Claude."""
+    # Get relevant context from knowledge base
+    context_data = get_relevant_context(query, context, signals, top_products)
+    logger.info(f"Found relevant sections: {list(context_data.keys())}")
     
-    # Find relevant sections based on keywords
-    relevant_sections = set()
-    for keyword, sections in keyword_mappings.items():
-        if keyword in query:
-            relevant_sections.update(sections)
+    # Format context string
+    context_str = format_context(context_data, context)
     
-    # If no specific keywords found, include all possible sections
-    if not relevant_sections:
-        for sections in keyword_mappings.values():
-            relevant_sections.update(sections)
+    logger.info("Final context being sent to Claude:")
+    logger.info(context_str)
     
-    # Search through relevant sections
-    for section in knowledge_base:
-        if section in relevant_sections:
-            data = knowledge_base[section]
-            
-            # Handle nested dictionaries
-            if isinstance(data, dict):
-                for key, value in data.items():
-                    if isinstance(value, list):
-                        matches.extend(value)
-                    elif isinstance(value, dict):
-                        for subkey, subvalue in value.items():
-                            if isinstance(subvalue, list):
-                                matches.extend(subvalue)
-            # Handle direct lists
-            elif isinstance(data, list):
-                matches.extend(data)
-            # Handle strings
-            elif isinstance(data, str):
-                matches.append(data)
+    # Create system message based on conversation stage
+    stage = context.get('conversation_stage', 'initial')
+    system_message = stage_engine.system_prompt(stage)
     
-    return matches
-
-async def get_claude_response(query, user_id=None):
-    """Get a response from Claude API."""
-    try:
-        # Get user context if available
-        context = {}
-        if user_id:
-            context = conversation_manager.get_user_context(user_id)
-            logger.info(f"Using context for user {user_id}: {context}")
-        
-        # Get relevant context from knowledge base
-        context_data = get_relevant_context(query, context)
-        logger.info(f"Found relevant sections: {list(context_data.keys())}")
-        
-        # Format context string
-        context_str = format_context(context_data, context)
-        
-        logger.info("Final context being sent to Claude:")
-        logger.info(context_str)
-        
-        # Create system message based on conversation stage
-        stage = context.get('conversation_stage', 'initial')
-        base_message = "You are a friendly reselling advisor. Keep responses short, casual, and focused on one topic at a time. Use emojis naturally. Avoid overwhelming the user with too much information at once."
-        
-        stage_messages = {
-            'initial': base_message + " Focus on understanding their budget in a friendly way.",
-            'budget_set': base_message + " Suggest specific products they can start with.",
-            'interests_set': base_message + " Share quick tips about their chosen products.",
-            'experience_set': base_message + " Offer relevant advice for their experience level.",
-            'follow_up': base_message + " Answer their specific question clearly and concisely."
-        }
-        
-        system_message = stage_messages.get(stage, base_message)
-        
-        # Create messages array
-        messages = [
-            {
-                "role": "user",
-                "content": f"""Context:
+    # Create messages array
+    messages = [
+        {
+            "role": "user",
+            "content": f"""Context:
 {context_str}
 
 User Query: {query}
@@ -216,68 +436,177 @@ Remember:
 3. Use emojis naturally
 4. Short, clear responses
 5. Ask one follow-up question if needed"""
-            }
-        ]
-        
-        # Add conversation history if available
-        if user_id:
-            history = conversation_manager.get_conversation_history(user_id)
-            if history:
-                messages.insert(0, {
-                    "role": "user",
-                    "content": "Previous messages:\n" + "\n".join([
-                        f"{'Bot' if msg['is_bot'] else 'User'}: {msg['message']}"
-                        for msg in history[-3:]  # Only last 3 messages for focus
-                    ])
-                })
-        
-        logger.info("Sending request to Claude API")
-        
-        # Get response from Claude
-        response = claude.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            max_tokens=8192,
-            temperature=0.9,
+        }
+    ]
+    
+    # Older turns arrive as a rolling summary, so only the latest turn is sent verbatim
+    previous = []
+    if summary:
+        previous.append(f"Summary of earlier conversation: {summary}")
+    if history:
+        previous.append("Previous messages:\n" + "\n".join([
+            f"{'Bot' if msg['is_bot'] else 'User'}: {clip(msg['message'], LATEST_TURN_CHARS)}"
+            for msg in history[-HISTORY_KEEP_MESSAGES:]
+        ]))
+    if previous:
+        messages.insert(0, {"role": "user", "content": "\n\n".join(previous)})
+    
+    return system_message, messages
+
+async def create_answer(system_message, messages, tier='large', max_tokens=None, ledger=None, user_id=None):
+    """Send a prompt to Claude on the given model tier and return the answer text, or None.
+    
+    max_tokens lowers the tier's output cap, e.g. to the conversation stage's.
+    An answer cut off by the cap is continued (it is paginated, not truncated)
+    up to ANSWER_CONTINUATIONS times before it is trimmed to its last sentence.
+    Token usage is charged to user_id in ledger when one is given.
+    Raises ModelUnavailable when retries are exhausted or the circuit breaker is open.
+    """
+    logger.info(f"Sending request to Claude API ({tier} tier)")
+    
+    params = model_router.params(tier)
+    if max_tokens:
+        params['max_tokens'] = min(params['max_tokens'], max_tokens)
+    
+    async def call(messages):
+        started = time.perf_counter()
+        response = await model_caller.call(lambda: model_limiter.run(lambda: claude.messages.create(
             messages=messages,
-            system=system_message
-        )
+            system=system_message,
+            **params
+        ), key=tier), key=tier)
+        usage = getattr(response, 'usage', None)
+        model_router.record(tier, started, usage)
+        if ledger is not None and usage is not None:
+            ledger.record(user_id, usage.input_tokens, usage.output_tokens, model_router.cost(tier, usage))
+        trace_recorder.add_model_time(time.perf_counter() - started)
+        return response
+    
+    response = await call(messages)
+    if not response.content:
+        return None
+    logger.info("Received response from Claude API")
+    text = response.content[0].text
+    for _ in range(ANSWER_CONTINUATIONS):
+        if getattr(response, 'stop_reason', None) != 'max_tokens':
+            return text
+        # Hit the output cap mid-answer; the model picks up where it stopped
+        logger.info(f"Answer reached {params['max_tokens']} tokens, continuing it")
+        # The API rejects a prefill ending in whitespace; restore it unless the continuation brings its own
+        prefill = text.rstrip()
+        gap = text[len(prefill):]
+        response = await call(messages + [{"role": "assistant", "content": prefill}])
+        if not response.content:
+            break
+        continued = response.content[0].text
+        text = prefill + (continued if continued[:1].isspace() else gap + continued)
+    if not response.content or getattr(response, 'stop_reason', None) == 'max_tokens':
+        # Still unfinished; end on the last full sentence rather than mid-thought
+        logger.info(f"Answer still unfinished after {ANSWER_CONTINUATIONS} continuations, trimming to the last sentence")
+        return trim_to_sentence(text)
+    return text
+
+def degraded_answer(query):
+    """Best-effort knowledge base answer used while Claude is unavailable."""
+    hits = kb_index.search(query, k=KB_ANSWER_ENTRIES, min_score=DEGRADED_MIN_SCORE) if kb_index is not None else []
+    if not hits:
+        return DEGRADED_NO_MATCH
+    return DEGRADED_PREFIX + "\n\n".join(entry['text'] for score, entry in hits)
+
+def is_degraded(answer):
+    """Whether an answer came from degraded_answer rather than Claude."""
+    return answer == DEGRADED_NO_MATCH or answer.startswith(DEGRADED_PREFIX)
+
+async def get_claude_response(query, user_id=None, state=None):
+    """Get a response from Claude API."""
+    try:
+        # Get user context if available
+        context = {}
+        if user_id and state:
+            conversation_manager = state.conversation_manager
+            context = conversation_manager.get_user_context(user_id)
+            logger.info(f"Using context for user {user_id}: {context}")
+        
+        # Parse the query once for both KB lookup and context updates
+        signals = parse_message(query)
+        
+        # Frequent questions are answered from the pre-generated set
+        answer = None
+        if canned_answers is not None and signals['amount'] is None:
+            answer = canned_answers.lookup(
+                query, context.get('conversation_stage', 'initial'), context.get('budget')
+            )
+            if answer:
+                logger.info("Serving canned answer")
+        
+        if answer is None:
+            history = summary = None
+            if context:
+                history = conversation_manager.get_conversation_history(user_id, HISTORY_KEEP_MESSAGES)
+                summary = conversation_manager.get_summary(user_id)
+            top_products = state.rollups.top_products() if state else None
+            system_message, messages = build_prompt(query, context, signals, history, summary, top_products)
+            
+            # Route easy questions to the fast tier
+            stage = context.get('conversation_stage', 'initial')
+            hits = kb_index.search(query, k=1) if kb_index is not None else []
+            tier, reason = classify(query, stage, hits[0][0] if hits else 0.0)
+            
+            # Enforce token quotas before paying for the call
+            ledger = state.tokens if user_id and state else None
+            if ledger is not None:
+                estimate = estimate_tokens(system_message, *(str(m['content']) for m in messages))
+                allowed, quota = ledger.check(user_id, estimate)
+                if not allowed:
+                    logger.info(f"User {user_id} is over the {quota} token quota")
+                    return QUOTA_MESSAGES[quota]
+            
+            logger.info(f"Routing query to {tier} tier ({reason})")
+            answer = await create_answer(
+                system_message, messages, tier, stage_engine.max_tokens.get(stage), ledger, user_id
+            )
         
         # Process response
-        if response.content:
-            logger.info("Received response from Claude API")
-            answer = response.content[0].text
+        if answer:
             logger.info(f"Raw response from Claude: {answer[:200]}...")
             
             # Update conversation context based on the response
-            if user_id:
+            if context:
                 conversation_manager.add_to_history(user_id, query, is_bot=False)
                 conversation_manager.add_to_history(user_id, answer, is_bot=True)
                 
                 # Analyze user message for context updates
-                updates = conversation_manager.analyze_message(user_id, query)
+                updates = conversation_manager.analyze_message(user_id, query, signals)
+                new_achievements = []
                 if updates:
                     conversation_manager.update_context(user_id, updates)
+                    # Budget Planner unlocks from a budget mentioned here, not in /update
+                    new_achievements = conversation_manager.update_achievements(user_id, context, updates.keys())
                 
                 # Get follow-up question if needed
                 if not any(char in answer[-1] for char in '?!.'):
                     next_question = conversation_manager.get_next_question(user_id)
                     if next_question:
                         answer += f"\n\n{next_question}"
+                
+                if new_achievements:
+                    answer += "\n\n🏆 Achievement unlocked: " + ", ".join(a.strip() for a in new_achievements)
+                
+                # Fold the previous turn into the user's summary off the request path
+                if not model_caller.breaker.is_open:
+                    summarizer.schedule(claude, state, user_id)
             
-            # Format the response
-            formatted_response = answer
-            
-            # Check if response is too long for Discord
-            if len(formatted_response) > 1950:
-                logger.warning(f"Response too long ({len(formatted_response)} chars), truncating...")
-                formatted_response = formatted_response[:1900] + "..."
-            
-            logger.info(f"Generated response length: {len(formatted_response)}")
-            return formatted_response
+            # Long answers are paginated by the caller, not truncated
+            logger.info(f"Generated response length: {len(answer)}")
+            return answer
             
         logger.warning("No content received from Claude API")
         return "Oops! Something went wrong. Can you try asking that again? 😅"
     
+    except ModelUnavailable as e:
+        logger.warning(f"Claude unavailable, answering from the knowledge base: {str(e)}")
+        return degraded_answer(query)
+    
     except Exception as e:
         logger.error(f"Error in get_claude_response: {str(e)}", exc_info=True)
         return "Sorry, I ran into a problem there! Let's try again? 🔄"
@@ -324,9 +653,8 @@ def format_context(context_data, user_context):
                     if isinstance(product, dict):
                         # Filter products based on budget if available
                         if user_context and user_context.get('budget'):
-                            price_range = product['price_range'].split('-')
-                            min_price = float(price_range[0])
-                            if min_price > user_context['budget']:
+                            min_price = product.get('price_min')
+                            if min_price is not None and min_price > user_context['budget']:
                                 continue
                         
                         context_str += f"- {product['name']}: {product['description']}\n"
@@ -340,48 +668,146 @@ def format_context(context_data, user_context):
             
             # Add other context data as before...
             # [Previous format_context code...]
+        elif isinstance(data, list):
+            for entry in data:
+                context_str += f"- {entry}\n"
     
     return context_str
 
-def format_response(response, stage):
-    """Format response with appropriate styling based on conversation stage."""
-    # Add emoji prefix based on stage
-    stage_emojis = {
-        'initial': '👋',
-        'budget_set': '💰',
-        'interests_set': '🎯',
-        'experience_set': '📚',
-        'follow_up': '💡'
-    }
-    
-    emoji = stage_emojis.get(stage, '💬')
-    
-    # Format the response
-    formatted = f"{emoji} "
-    
-    # Add any highlights or formatting
+def highlight(response):
+    """Bold product names and prices."""
     if "AirPods" in response:
         response = response.replace("AirPods", "**AirPods**")
     if "$" in response:
         # Bold price mentions
         import re
         response = re.sub(r'\$(\d+(?:\.\d{2})?)', r'**$\1**', response)
+    return response
+
+def stage_view(stage):
+    """View with the conversation stage's quick-reply buttons, or None if it has none."""
+    buttons = stage_engine.buttons.get(stage)
+    if not buttons:
+        return None
+    view = discord.ui.View(timeout=300)
+    for label, custom_id, style in buttons:
+        view.add_item(discord.ui.Button(label=label, custom_id=custom_id, style=getattr(discord.ButtonStyle, style)))
+    return view
+
+def render_answer_page(answer, token, number, view=None):
+    """Message kwargs for one page of an answer, or None past the last page.
+    
+    token is None for answers that fit on one page; otherwise page buttons
+    are added, to view if one is given.
+    """
+    body, has_next = answer.page(number)
+    if body is None:
+        return None
+    label = f"Page {number + 1}" if has_next else f"Page {number + 1} of {number + 1}"
+    if answer.kind == 'ai':
+        values = dict(answer.meta, response=body, page=f" | {label}" if token else "")
+        reply = {'embed': render_embed('ai_response', values, timestamp=True)}
+    else:
+        # Highlighting was applied before paging, so only the emoji and label are added here
+        text = f"{stage_engine.emoji(answer.meta['stage'])} {body}"
+        reply = {'content': f"{text}\n\n*{label}*" if token else text}
     
-    formatted += response
-    return formatted
+    if token:
+        if view is None:
+            view = discord.ui.View(timeout=None)
+            # Page buttons are handled in on_interaction; a stopped view isn't kept in memory
+            view.stop()
+        view.add_item(discord.ui.Button(
+            label="◀ Previous", custom_id=page_button_id(token, number - 1),
+            style=discord.ButtonStyle.secondary, disabled=number == 0
+        ))
+        view.add_item(discord.ui.Button(
+            label="Next ▶", custom_id=page_button_id(token, number + 1),
+            style=discord.ButtonStyle.primary, disabled=not has_next
+        ))
+    if view is not None:
+        reply['view'] = view
+    return reply
+
+def paged_reply(text, owner, kind, view=None, **meta):
+    """First page of an answer; longer answers are kept so later pages render on demand.
+    
+    Plain replies are highlighted before they are split, so the markdown
+    counts toward the page size and a page never outgrows Discord's limit.
+    """
+    if kind == 'ai':
+        answer = PagedAnswer(text, owner, EMBED_PAGE_CHARS, kind, meta)
+    else:
+        answer = PagedAnswer(highlight(text), owner, MESSAGE_PAGE_CHARS, kind, meta)
+    _, has_next = answer.page(0)
+    token = answer_pages.add(answer) if has_next else None
+    return render_answer_page(answer, token, 0, view)
+
+async def turn_answer_page(interaction, token, number):
+    """Show another page of a long answer when one of its buttons is pressed."""
+    try:
+        answer = answer_pages.get(token)
+        if answer is None:
+            await interaction.response.send_message(
+                "These pages have expired - ask again to see the full answer.", ephemeral=True
+            )
+            return
+        if str(interaction.user.id) != answer.owner:
+            await interaction.response.send_message("Only the member who asked can turn these pages.", ephemeral=True)
+            return
+        
+        # Editing the message replaces its view, so /start's stage buttons are rebuilt
+        view = stage_view(answer.meta['stage']) if answer.kind == 'start' else None
+        reply = render_answer_page(answer, token, number, view)
+        if reply is None:
+            await interaction.response.defer()
+            return
+        await interaction.response.edit_message(**reply)
+        
+    except Exception as e:
+        logger.error(f"Error turning answer page: {str(e)}", exc_info=True)
+
+startup.mark('imports')
 
 # Set up intents
 intents = discord.Intents.all()  # Enable all intents
 
+if DISCORD_API_BASE:
+    discord.http.Route.BASE = DISCORD_API_BASE
+if DISCORD_GATEWAY_URL:
+    import yarl
+    # Used whenever the shard count is fixed instead of asked from /gateway/bot
+    discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(DISCORD_GATEWAY_URL)
+
 # Create bot instance with required permissions
-bot = commands.Bot(
-    command_prefix='!',
-    intents=intents,
-    default_guild_ids=[1207605096431493140]  # Add your server ID here
-)
+if SHARDED or SHARD_IDS:
+    bot = commands.AutoShardedBot(
+        command_prefix='!',
+        intents=intents,
+        shard_count=SHARD_COUNT,
+        shard_ids=SHARD_IDS,
+        max_messages=MESSAGE_CACHE_SIZE
+    )
+else:
+    bot = commands.Bot(
+        command_prefix='!',
+        intents=intents,
+        max_messages=MESSAGE_CACHE_SIZE
+    )
+
+@bot.event
+async def setup_hook():
+    startup.mark('login')
+    if DEFERRED_STARTUP:
+        # Keep a reference so the task isn't garbage collected mid-run
+        bot.warm_up_task = asyncio.create_task(warm_up())
+    else:
+        await warm_up()
 
 @bot.event
 async def on_ready():
+    startup.mark('gateway_ready')
+    logger.info(startup.report())
     print(f'{bot.user} has connected to Discord!')
     print(f"Role ID to assign: {BASIC_MEMBER_ROLE_ID}")
     
@@ -393,62 +819,68 @@ async def on_ready():
         print(f"Bot roles: {[r.name for r in bot_member.roles]}")
     
     try:
-        synced = await bot.tree.sync()
+        if GUILD_IDS:
+            # Guild commands show up at once; global ones can take an hour
+            synced = []
+            for guild_id in GUILD_IDS:
+                guild = discord.Object(id=guild_id)
+                bot.tree.copy_global_to(guild=guild)
+                synced += await bot.tree.sync(guild=guild)
+        else:
+            synced = await bot.tree.sync()
         print(f"Synced {len(synced)} command(s)")
     except Exception as e:
         print(f"Failed to sync commands: {e}")
 
+@bot.event
+async def on_shard_ready(shard_id):
+    logger.info(f"Shard {shard_id} ready")
+
+@bot.event
+async def on_interaction(interaction):
+    shard_metrics.record(interaction.guild.shard_id if interaction.guild else 0)
+    if interaction.type == discord.InteractionType.component:
+        button = parse_page_button((interaction.data or {}).get('custom_id', ''))
+        if button:
+            await turn_answer_page(interaction, *button)
+
+async def begin_trace(interaction):
+    # Runs in the command's own task, so model time is attributed to it
+    trace_recorder.begin(interaction)
+    return True
+
+bot.tree.interaction_check = begin_trace
+
+@bot.event
+async def on_app_command_completion(interaction, command):
+    trace_recorder.finish(interaction, command.name)
+
+@bot.event
+async def on_message(message):
+    shard_metrics.record(message.guild.shard_id if message.guild else 0)
+    await bot.process_commands(message)
+
+@bot.event
+async def on_guild_remove(guild):
+    if guild_states:
+        guild_states.drop(guild.id)
+
 @bot.event
 async def on_member_join(member):
+    shard_metrics.record(member.guild.shard_id)
     # Get the verify channel
     verify_channel = discord.utils.get(member.guild.channels, name='verify')
     
     if verify_channel:
         # Send verification instructions
-        verify_embed = discord.Embed(
-            title="🔐 Verification Process",
-            description=(
-                f"Hey {member.mention}! Let's get you verified and unlock access to our community!\n"
-                "Follow these simple steps:"
-            ),
-            color=discord.Color.from_rgb(87, 242, 135)  # Nice green color
-        )
-        
-        verify_embed.add_field(
-            name="Step 1️⃣",
-            value="Type `/verify` in this channel",
-            inline=False
-        )
-        
-        verify_embed.add_field(
-            name="Step 2️⃣",
-            value=(
-                "Fill out the quick verification form with:\n"
-                "• Your preferred name 📝\n"
-                "• What brings you to Invex Resell 🎯\n"
-                "• A fun fact about yourself ✨"
-            ),
-            inline=False
-        )
-        
-        verify_embed.add_field(
-            name="Step 3️⃣",
-            value="Get instant access to our community! 🚀",
-            inline=False
-        )
-        
-        verify_embed.set_thumbnail(url=member.guild.icon.url if member.guild.icon else None)
-        verify_embed.set_footer(text="We can't wait to meet you! 🤝")
+        patches = {'thumbnail': {'url': member.guild.icon.url}} if member.guild.icon else {}
+        verify_embed = render_embed('verify', {'mention': member.mention}, **patches)
         
         await verify_channel.send(
             content=f"Hey {member.mention}! Let's get you started! 👋",
             embed=verify_embed
         )
 
-# Store verification attempts and cooldowns
-verification_attempts = {}
-verification_cooldowns = {}
-
 class VerifyModal(discord.ui.Modal, title='Verification Form'):
     def __init__(self):
         super().__init__()
@@ -650,26 +1082,32 @@ async def verify(interaction: discord.Interaction):
         await interaction.response.send_message("You are already verified!", ephemeral=True)
         return
         
+    if not startup.is_ready('guild_states'):
+        await interaction.response.send_message(startup_message('guild_states'), ephemeral=True)
+        return
+    
+    state = guild_states.for_interaction(interaction)
+    store = state.store
+    
     # Check if user is in cooldown
     user_id = str(interaction.user.id)
-    current_time = datetime.now()
+    current_time = time.time()
     
-    if user_id in verification_cooldowns:
-        cooldown_end = verification_cooldowns[user_id]
-        if current_time < cooldown_end:
-            time_left = cooldown_end - current_time
-            await interaction.response.send_message(
-                f"Please wait {time_left.seconds} seconds before trying again.",
-                ephemeral=True
-            )
-            return
+    cooldown_end = store.get_value(state.key('verify_cooldown', user_id))
+    if cooldown_end and current_time < cooldown_end:
+        await interaction.response.send_message(
+            f"Please wait {int(cooldown_end - current_time)} seconds before trying again.",
+            ephemeral=True
+        )
+        return
     
     # Check verification attempts
-    attempts = verification_attempts.get(user_id, 0)
+    attempts_key = state.key('verify_attempts', user_id)
+    attempts = store.get_value(attempts_key) or 0
     if attempts >= 3:
         # Set cooldown for 5 minutes
-        verification_cooldowns[user_id] = current_time + timedelta(minutes=5)
-        verification_attempts[user_id] = 0
+        store.set_value(state.key('verify_cooldown', user_id), current_time + VERIFY_COOLDOWN, ttl=VERIFY_COOLDOWN)
+        store.set_value(attempts_key, 0)
         await interaction.response.send_message(
             "You've reached the maximum verification attempts. Please try again in 5 minutes.",
             ephemeral=True
@@ -677,7 +1115,7 @@ async def verify(interaction: discord.Interaction):
         return
     
     # Increment attempts
-    verification_attempts[user_id] = attempts + 1
+    store.set_value(attempts_key, attempts + 1)
     
     # Send the modal
     await interaction.response.send_modal(VerifyModal())
@@ -686,60 +1124,54 @@ async def verify(interaction: discord.Interaction):
 async def ai_command(interaction: discord.Interaction, question: str):
     """Handle AI command for reselling questions."""
     
+    if not startup.is_ready('guild_states'):
+        await interaction.response.send_message(startup_message('guild_states'), ephemeral=True)
+        return
+    
+    state = guild_states.for_interaction(interaction)
+    
     # Check rate limiting
     user_id = str(interaction.user.id)
-    current_time = datetime.now()
-    
-    if user_id in ai_requests:
-        requests, last_reset = ai_requests[user_id]
-        if current_time - last_reset > timedelta(seconds=AI_COOLDOWN):
-            # Reset if cooldown period has passed
-            ai_requests[user_id] = (1, current_time)
-        elif requests >= MAX_AI_REQUESTS:
-            time_left = AI_COOLDOWN - (current_time - last_reset).seconds
-            await interaction.response.send_message(
-                f"You've reached the maximum number of AI requests. Please wait {time_left} seconds.",
-                ephemeral=True
-            )
-            return
-        else:
-            # Increment request count
-            ai_requests[user_id] = (requests + 1, last_reset)
-    else:
-        # First request from this user
-        ai_requests[user_id] = (1, current_time)
+    allowed, time_left = state.hit_rate_limit('ai', user_id, MAX_AI_REQUESTS, AI_COOLDOWN)
+    if not allowed:
+        await interaction.response.send_message(
+            f"You've reached the maximum number of AI requests. Please wait {time_left} seconds.",
+            ephemeral=True
+        )
+        return
     
     # Create thinking embed
-    thinking_embed = discord.Embed(
-        title="🤔 Thinking...",
-        description="Let me search my knowledge base and consult with Claude...",
-        color=discord.Color.blue()
-    )
+    thinking_embed = render_embed('thinking')
     await interaction.response.send_message(embed=thinking_embed)
     
+    if not await startup.wait_ready('knowledge_base', 'kb_index'):
+        await interaction.edit_original_response(content=startup_message('knowledge_base', 'kb_index'), embed=None)
+        return
+    # A failed Claude client is retried in the background; answer from the KB meanwhile
+    claude_ready = await startup.wait_ready('claude')
+    if not claude_ready and not startup.has_failed('claude'):
+        await interaction.edit_original_response(content=WARMUP_MESSAGE, embed=None)
+        return
+    
     # Search knowledge base first
-    kb_matches = search_knowledge_base(question.lower())
+    kb_matches = search_knowledge_base(question)
     
     if kb_matches:
         # Create response from knowledge base matches
-        response = "\n\n".join(kb_matches[:3])  # Limit to top 3 matches
+        response = "\n\n".join(kb_matches)
         source = "Knowledge Base"
+    elif model_caller.breaker.is_open or not claude_ready:
+        # Claude is down; answer from the knowledge base right away
+        response = degraded_answer(question)
+        source = "Knowledge Base (offline mode)"
     else:
         # If no matches found, query Claude
-        response = await get_claude_response(question, user_id)
-        source = "Claude AI"
-    
-    # Create response embed
-    response_embed = discord.Embed(
-        title="🎯 Reselling Advice",
-        description=f"Here's what I found for: *{question}*\n\n{response}",
-        color=discord.Color.green(),
-        timestamp=datetime.now()
-    )
-    response_embed.set_footer(text=f"Source: {source} | Powered by Invex AI")
+        response = await get_claude_response(question, user_id, state)
+        source = "Knowledge Base (offline mode)" if is_degraded(response) else "Claude AI"
     
-    # Edit the original message with the response
-    await interaction.edit_original_response(embed=response_embed)
+    # Edit the original message with the first page of the response
+    reply = paged_reply(response, user_id, 'ai', question=clip(question, QUESTION_CHARS), source=source)
+    await interaction.edit_original_response(**reply)
 
 @bot.tree.command(name="help", description="Show all available commands and how to use them")
 async def help_command(interaction: discord.Interaction):
@@ -747,47 +1179,7 @@ async def help_command(interaction: discord.Interaction):
     try:
         await interaction.response.defer()
         
-        embed = discord.Embed(
-            title="📚 InvexBot Commands Guide",
-            description="Here are all the commands you can use:",
-            color=discord.Color.blue()
-        )
-        
-        # Main Commands
-        embed.add_field(
-            name="🤝 Getting Started",
-            value="`/start` - Begin your reselling journey with personalized advice\n"
-                  "Example: `/start`",
-            inline=False
-        )
-        
-        # Progress Commands
-        embed.add_field(
-            name="📊 Track Your Progress",
-            value="`/update` - Update your reselling progress\n"
-                  "Options:\n"
-                  "• Add Sale 📈\n"
-                  "• Add Feedback ⭐\n"
-                  "• Update Stats 📊\n"
-                  "• Reset Progress 🔄\n"
-                  "Example: `/update`\n\n"
-                  "`/progress` - View your achievements and stats\n"
-                  "Example: `/progress`",
-            inline=False
-        )
-        
-        # Help Commands
-        embed.add_field(
-            name="❓ Help & Information",
-            value="`/commands` - Show this help message\n"
-                  "Example: `/commands`\n\n"
-                  "`/tips` - Get reselling tips based on your progress\n"
-                  "Example: `/tips`",
-            inline=False
-        )
-        
-        # Add tips footer
-        embed.set_footer(text="💡 Tip: Use /start to begin your reselling journey!")
+        embed = render_embed('help')
         
         await interaction.followup.send(embed=embed)
         
@@ -801,42 +1193,29 @@ async def start_command(interaction: discord.Interaction, query: str = None):
     try:
         await interaction.response.defer()
         
+        if not await startup.wait_ready('guild_states', 'knowledge_base', 'kb_index', 'claude'):
+            await interaction.followup.send(startup_message('guild_states', 'knowledge_base', 'kb_index', 'claude'))
+            return
+        
+        state = guild_states.for_interaction(interaction)
+        conversation_manager = state.conversation_manager
+        
         if not query:
             # Default welcome message
             response = "Hey! Welcome to the reselling world! 👋\n\nThe best way to start is to figure out your budget - that way I can guide you towards the right options.\n\nHow much are you thinking of investing to get started? 💰"
         else:
             # Get response using user's ID for context
-            response = await get_claude_response(query, str(interaction.user.id))
+            response = await get_claude_response(query, str(interaction.user.id), state)
         
         # Create buttons based on context
-        view = None
         context = conversation_manager.get_user_context(str(interaction.user.id))
         stage = context.get('conversation_stage', 'initial')
         
-        if stage == 'budget_set':
-            view = discord.ui.View(timeout=300)
-            view.add_item(discord.ui.Button(label="Tell me more! 👋", custom_id="more_info", style=discord.ButtonStyle.primary))
-            view.add_item(discord.ui.Button(label="How to start? 🚀", custom_id="how_to_start", style=discord.ButtonStyle.secondary))
-        
-        elif stage == 'interests_set':
-            view = discord.ui.View(timeout=300)
-            view.add_item(discord.ui.Button(label="Electronics 📱", custom_id="electronics", style=discord.ButtonStyle.primary))
-            view.add_item(discord.ui.Button(label="Fashion 👕", custom_id="fashion", style=discord.ButtonStyle.secondary))
-            view.add_item(discord.ui.Button(label="Luxury Items ✨", custom_id="luxury", style=discord.ButtonStyle.secondary))
+        view = stage_view(stage)
         
-        elif stage == 'experience_set':
-            view = discord.ui.View(timeout=300)
-            view.add_item(discord.ui.Button(label="First Sale Tips 🎯", custom_id="first_sale", style=discord.ButtonStyle.primary))
-            view.add_item(discord.ui.Button(label="Pro Strategies 📈", custom_id="pro_tips", style=discord.ButtonStyle.secondary))
-        
-        # Format response with emojis and sections
-        formatted_response = format_response(response, stage)
-        
-        # Send response with view if available
-        if view:
-            await interaction.followup.send(formatted_response, view=view)
-        else:
-            await interaction.followup.send(formatted_response)
+        # Send the first page, formatted with emojis, with the view if available
+        reply = paged_reply(response, str(interaction.user.id), 'start', view=view, stage=stage)
+        await interaction.followup.send(**reply)
         
     except Exception as e:
         logger.error(f"Error in start command: {str(e)}", exc_info=True)
@@ -848,44 +1227,16 @@ async def tips_command(interaction: discord.Interaction):
     try:
         await interaction.response.defer()
         
+        if not await startup.wait_ready('guild_states'):
+            await interaction.followup.send(startup_message('guild_states'))
+            return
+        
+        conversation_manager = guild_states.for_interaction(interaction).conversation_manager
+        
         context = conversation_manager.get_user_context(str(interaction.user.id))
         sales_count = context.get('sales_count', 0)
         
-        embed = discord.Embed(
-            title="💡 Personalized Reselling Tips",
-            color=discord.Color.green()
-        )
-        
-        if sales_count == 0:
-            embed.add_field(
-                name="🌟 Getting Started",
-                value="• Start with AirPods - only $10.90 to buy\n"
-                      "• Take clear, well-lit photos\n"
-                      "• Price slightly below retail\n"
-                      "• List on Facebook Marketplace first\n"
-                      "• Respond quickly to messages",
-                inline=False
-            )
-        elif sales_count < 5:
-            embed.add_field(
-                name="📈 Growing Your Business",
-                value="• Try listing on multiple platforms\n"
-                      "• Build a positive feedback score\n"
-                      "• Track your profits carefully\n"
-                      "• Consider buying in bulk\n"
-                      "• Maintain quick shipping times",
-                inline=False
-            )
-        else:
-            embed.add_field(
-                name="🚀 Scaling Up",
-                value="• Diversify your product range\n"
-                      "• Build supplier relationships\n"
-                      "• Consider using InvexPro for tracking\n"
-                      "• Optimize your pricing strategy\n"
-                      "• Focus on customer retention",
-                inline=False
-            )
+        embed = render_embed(f'tips_{sales_tier(sales_count)}')
         
         await interaction.followup.send(embed=embed)
         
@@ -899,38 +1250,18 @@ async def progress_command(interaction: discord.Interaction):
     try:
         await interaction.response.defer()
         
+        if not await startup.wait_ready('guild_states'):
+            await interaction.followup.send(startup_message('guild_states'))
+            return
+        
+        conversation_manager = guild_states.for_interaction(interaction).conversation_manager
+        
         # Get progress summary
         summary = conversation_manager.get_progress_summary(str(interaction.user.id))
         
-        # Create embed
-        embed = discord.Embed(
-            title="🏆 Your Reselling Journey",
-            description=summary,
-            color=discord.Color.gold()
-        )
-        
-        # Add tips based on progress
+        # Create embed with tips based on progress
         context = conversation_manager.get_user_context(str(interaction.user.id))
-        if context.get('sales_count', 0) == 0:
-            embed.add_field(
-                name="💡 Quick Tip",
-                value="Start with AirPods - they're perfect for beginners with high profit margins!",
-                inline=False
-            )
-        elif context.get('sales_count', 0) < 5:
-            embed.add_field(
-                name="💡 Pro Tip",
-                value="Try listing on multiple platforms to increase your sales!",
-                inline=False
-            )
-        
-        # Add InvexPro promotion if relevant
-        if context.get('sales_count', 0) >= 5 and not context.get('uses_invexpro'):
-            embed.add_field(
-                name="📱 Level Up Your Business",
-                value="Ready to scale? Try InvexPro to manage your growing inventory!",
-                inline=False
-            )
+        embed = render_embed(progress_template(context), description=summary)
         
         await interaction.followup.send(embed=embed)
         
@@ -950,8 +1281,16 @@ async def update_command(interaction: discord.Interaction, action: str):
     try:
         await interaction.response.defer()
         
+        if not await startup.wait_ready('guild_states'):
+            await interaction.followup.send(startup_message('guild_states'))
+            return
+        
+        state = guild_states.for_interaction(interaction)
+        conversation_manager = state.conversation_manager
+        
         user_id = str(interaction.user.id)
         context = conversation_manager.get_user_context(user_id)
+        changed_fields = set()  # Context fields this action changed, for achievements
         
         if action == "sale":
             # Create sale entry form
@@ -972,38 +1311,57 @@ async def update_command(interaction: discord.Interaction, action: str):
                 sell_price = float(modal_interaction.data["components"][2]["value"])
                 platform = modal_interaction.data["components"][3]["value"]
                 
-                # Update stats
                 profit = sell_price - buy_price
-                context['sales_count'] = context.get('sales_count', 0) + 1
-                context['total_profit'] = context.get('total_profit', 0) + profit
-                
-                # Track sale history
-                if 'sales_history' not in context:
-                    context['sales_history'] = []
-                context['sales_history'].append({
+                product = catalog_matcher.canonical(item) if catalog_matcher is not None else None
+                sale = {
                     'date': datetime.now().isoformat(),
                     'item': item,
                     'buy_price': buy_price,
                     'sell_price': sell_price,
                     'profit': profit,
                     'platform': platform
-                })
+                }
+                if catalog_matcher is not None:
+                    # Left out otherwise, so the sale is matched once the catalog loads
+                    sale['product'] = product
                 
-                # Calculate success metrics
-                if len(context['sales_history']) >= 2:
-                    dates = [datetime.fromisoformat(s['date']) for s in context['sales_history'][-2:]]
-                    days_between = (dates[1] - dates[0]).days
-                    context['sales_frequency'] = f"{days_between} days between sales"
+                def apply_sale(conversation):
+                    context = conversation['context']
+                    
+                    # Update stats
+                    context['sales_count'] = context.get('sales_count', 0) + 1
+                    context['total_profit'] = context.get('total_profit', 0) + profit
                     
-                    profits = [s['profit'] for s in context['sales_history'][-5:]]
-                    context['avg_profit'] = sum(profits) / len(profits)
+                    # Track sale history and its pre-bucketed aggregates
+                    if 'sales_history' not in context:
+                        context['sales_history'] = []
+                    sales_stats = ensure_sales_stats(context, product_matcher())
+                    context['sales_history'].append(sale)
+                    record_sale(sales_stats, sale)
+                    
+                    # Calculate success metrics
+                    if len(context['sales_history']) >= 2:
+                        dates = [datetime.fromisoformat(s['date']) for s in context['sales_history'][-2:]]
+                        days_between = (dates[1] - dates[0]).days
+                        context['sales_frequency'] = f"{days_between} days between sales"
+                    
+                        profits = [s['profit'] for s in context['sales_history'][-5:]]
+                        context['avg_profit'] = sum(profits) / len(profits)
+                
+                # Applied to the latest copy of the profile, and re-applied if
+                # another worker saves it first, so concurrent sales all count
+                conversation_manager.mutate(user_id, apply_sale)
+                context = conversation_manager.get_user_context(user_id)
+                changed_fields.update(('sales_count', 'total_profit'))
+                state.leaderboard.update_user(user_id, context)
+                state.rollups.record_sale(user_id, item, profit, product)
                 
                 # Create success embed
                 embed = discord.Embed(
                     title="🎉 Sale Added Successfully!",
                     color=discord.Color.green()
                 )
-                embed.add_field(name="Item", value=item, inline=True)
+                embed.add_field(name="Item", value=f"{item} ({product})" if product and product != item else item, inline=True)
                 embed.add_field(name="Profit", value=f"${profit:,.2f}", inline=True)
                 embed.add_field(name="Platform", value=platform, inline=True)
                 
@@ -1036,22 +1394,33 @@ async def update_command(interaction: discord.Interaction, action: str):
                 rating = int(modal_interaction.data["components"][0]["value"])
                 comment = modal_interaction.data["components"][1]["value"]
                 
-                # Update stats
-                context['positive_feedback'] = context.get('positive_feedback', 0) + (1 if rating >= 4 else 0)
-                
-                # Track feedback history
-                if 'feedback_history' not in context:
-                    context['feedback_history'] = []
-                context['feedback_history'].append({
+                feedback = {
                     'date': datetime.now().isoformat(),
                     'rating': rating,
                     'comment': comment
-                })
+                }
+                
+                def apply_feedback(conversation):
+                    context = conversation['context']
+                    
+                    # Update stats
+                    context['positive_feedback'] = context.get('positive_feedback', 0) + (1 if rating >= 4 else 0)
+                    
+                    # Track feedback history
+                    if 'feedback_history' not in context:
+                        context['feedback_history'] = []
+                    context['feedback_history'].append(feedback)
+                    
+                    # Calculate feedback stats
+                    ratings = [f['rating'] for f in context['feedback_history']]
+                    context['avg_rating'] = sum(ratings) / len(ratings)
                 
-                # Calculate feedback stats
-                ratings = [f['rating'] for f in context['feedback_history']]
-                avg_rating = sum(ratings) / len(ratings)
-                context['avg_rating'] = avg_rating
+                conversation_manager.mutate(user_id, apply_feedback)
+                context = conversation_manager.get_user_context(user_id)
+                avg_rating = context['avg_rating']
+                changed_fields.add('positive_feedback')
+                state.leaderboard.update_user(user_id, context)
+                state.rollups.record_feedback(user_id)
                 
                 embed = discord.Embed(
                     title="⭐ Feedback Added!",
@@ -1132,6 +1501,8 @@ async def update_command(interaction: discord.Interaction, action: str):
                 
                 # Reset user context
                 conversation_manager.reset_user_context(user_id)
+                state.leaderboard.update_user(user_id, conversation_manager.get_user_context(user_id))
+                changed_fields = None
                 await button_interaction.response.send_message("Progress reset successfully! Start fresh with /help")
                 
             except asyncio.TimeoutError:
@@ -1139,7 +1510,8 @@ async def update_command(interaction: discord.Interaction, action: str):
                 return
         
         # Check for new achievements
-        new_achievements = conversation_manager.update_achievements(user_id, context)
+        context = conversation_manager.get_user_context(user_id)
+        new_achievements = conversation_manager.update_achievements(user_id, context, changed_fields)
         if new_achievements:
             achievement_embed = discord.Embed(
                 title="🏆 New Achievements Unlocked!",
@@ -1152,6 +1524,360 @@ async def update_command(interaction: discord.Interaction, action: str):
         logger.error(f"Error in update command: {str(e)}", exc_info=True)
         await interaction.followup.send("Oops! Something went wrong. Try again? 🔄")
 
+@bot.tree.command(name="leaderboard", description="See the top resellers in this server")
+@discord.app_commands.choices(metric=[
+    discord.app_commands.Choice(name="Total Profit 💰", value="total_profit"),
+    discord.app_commands.Choice(name="Sales 📈", value="sales_count"),
+    discord.app_commands.Choice(name="Positive Feedback ⭐", value="positive_feedback")
+])
+async def leaderboard_command(interaction: discord.Interaction, metric: str = "total_profit", page: int = 1):
+    """Show a page of the guild leaderboard plus the caller's own rank."""
+    try:
+        await interaction.response.defer()
+        
+        if not await startup.wait_ready('guild_states'):
+            await interaction.followup.send(startup_message('guild_states'))
+            return
+        
+        leaderboard = guild_states.for_interaction(interaction).leaderboard
+        page = max(page, 1)
+        
+        embed = discord.Embed(
+            title=f"🏆 Leaderboard - {LEADERBOARD_METRICS[metric]}",
+            description=leaderboard.render_page(metric, page - 1) or "Nobody on this page yet - log a sale with /update!",
+            color=discord.Color.gold()
+        )
+        
+        rank, total = leaderboard.rank_of(metric, str(interaction.user.id))
+        embed.set_footer(text=f"Page {page} | Your rank: #{rank} of {total}" if rank else f"Page {page} | You're not ranked yet")
+        
+        await interaction.followup.send(embed=embed)
+        
+    except Exception as e:
+        logger.error(f"Error in leaderboard command: {str(e)}", exc_info=True)
+        await interaction.followup.send("Oops! Something went wrong. Try again? 🔄")
+
+@bot.tree.command(name="stats", description="See your weekly, monthly, platform and item sales breakdown")
+async def stats_command(interaction: discord.Interaction):
+    """Show time- and platform-bucketed sales analytics."""
+    try:
+        await interaction.response.defer()
+        
+        if not await startup.wait_ready('guild_states'):
+            await interaction.followup.send(startup_message('guild_states'))
+            return
+        
+        state = guild_states.for_interaction(interaction)
+        user_id = str(interaction.user.id)
+        context = state.conversation_manager.get_user_context(user_id)
+        had_stats = 'sales_stats' in context
+        had_products = had_stats and 'products' in context['sales_stats']
+        stats = ensure_sales_stats(context, product_matcher())
+        if not had_stats or ('products' in stats and not had_products):
+            state.conversation_manager.save(user_id)
+        
+        embed = discord.Embed(
+            title="📊 Your Sales Breakdown",
+            color=discord.Color.blue()
+        )
+        
+        if not stats['weekly']:
+            embed.description = "No sales logged yet - add one with `/update` 📈"
+            await interaction.followup.send(embed=embed)
+            return
+        
+        now = datetime.now()
+        embed.add_field(
+            name="📅 Weekly Profit",
+            value="\n".join(f"{label}: ${profit:,.2f} ({count} sales)" for label, count, profit in recent_weeks(stats, now)),
+            inline=True
+        )
+        embed.add_field(
+            name="🗓️ Monthly Profit",
+            value="\n".join(f"{label}: ${profit:,.2f} ({count} sales)" for label, count, profit in recent_months(stats, now)),
+            inline=True
+        )
+        embed.add_field(
+            name="🛒 By Platform",
+            value="\n".join(f"{name}: ${profit:,.2f} ({count} sales)" for name, count, profit in top_buckets(stats['platforms'])),
+            inline=False
+        )
+        embed.add_field(
+            name="🏅 Best Items",
+            value="\n".join(
+                f"{stats['item_names'].get(key, key)}: ${profit:,.2f} ({count} sold)"
+                for key, count, profit in top_buckets(stats['items'])
+            ),
+            inline=False
+        )
+        if stats.get('products'):
+            embed.add_field(
+                name="🛍️ By Catalog Product",
+                value="\n".join(
+                    f"{name}: ${profit:,.2f} ({count} sold, ${profit / count:,.2f} avg)"
+                    for name, count, profit in top_buckets(stats['products'])
+                ),
+                inline=False
+            )
+        
+        await interaction.followup.send(embed=embed)
+        
+    except Exception as e:
+        logger.error(f"Error in stats command: {str(e)}", exc_info=True)
+        await interaction.followup.send("Oops! Something went wrong. Try again? 🔄")
+
+@bot.tree.command(name="community", description="Community-wide sales numbers (admin only)")
+@app_commands.default_permissions(administrator=True)
+async def community_command(interaction: discord.Interaction):
+    """Show the guild's incrementally maintained sales rollups."""
+    if not startup.is_ready('guild_states'):
+        await interaction.response.send_message(startup_message('guild_states'), ephemeral=True)
+        return
+    
+    summary = guild_states.for_interaction(interaction).rollups.summary()
+    
+    embed = discord.Embed(
+        title="🌍 Community Stats",
+        color=discord.Color.blue()
+    )
+    embed.add_field(
+        name="💰 Totals",
+        value=f"Profit logged: ${summary['total_profit']:,.2f}\n"
+              f"Sales: {summary['total_sales']}\n"
+              f"Feedback entries: {summary['total_feedback']}",
+        inline=True
+    )
+    embed.add_field(
+        name="📅 Activity",
+        value=f"Sales today: {summary['sales_today']}\n"
+              f"Avg sales/day: {summary['avg_sales_per_day']:.1f}\n"
+              f"Active today: {summary['active_today']}\n"
+              f"Members tracked: {summary['tracked_users']}",
+        inline=True
+    )
+    if summary['top_items']:
+        embed.add_field(
+            name="🏅 Most Sold",
+            value="\n".join(f"{item}: {count} sold (${profit:,.2f})" for item, count, profit in summary['top_items']),
+            inline=False
+        )
+    if summary['top_products']:
+        embed.add_field(
+            name="🛍️ Top Catalog Products",
+            value="\n".join(
+                f"{name}: {count} sold (${profit:,.2f}, ${profit / count:,.2f} avg)"
+                for name, count, profit in summary['top_products']
+            ),
+            inline=False
+        )
+    embed.set_footer(text=f"Top items as of {summary['snapshot_at'] or 'next snapshot'}")
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="shards", description="Show per-shard latency and event rates (admin only)")
+@app_commands.default_permissions(administrator=True)
+async def shards_command(interaction: discord.Interaction):
+    """Show latency, event rate and state partition size for every shard."""
+    rows = shard_metrics.snapshot(
+        bot.latencies if isinstance(bot, commands.AutoShardedBot) else [(0, bot.latency)],
+        guild_states or GuildStateRegistry()
+    )
+    lines = [
+        f"Shard {r['shard_id']}: {r['latency_ms']}ms | {r['events_per_sec']} events/s "
+        f"({r['total_events']} total) | {r['guilds']} guilds, {r['tracked_users']} users | "
+        f"{r['save_conflicts']} profile save conflicts"
+        for r in rows
+    ]
+    await interaction.response.send_message("\n".join(lines) or "No shards connected", ephemeral=True)
+
+@bot.tree.command(name="models", description="Show model tier latency, token usage and spend (admin only)")
+@app_commands.default_permissions(administrator=True)
+async def models_command(interaction: discord.Interaction):
+    """Show per-tier call counts, latency percentiles, tokens and estimated cost."""
+    embed = discord.Embed(
+        title="🧠 Model Tiers",
+        color=discord.Color.blue()
+    )
+    for tier, stats in model_router.stats().items():
+        embed.add_field(
+            name=f"{tier.title()} ({stats['model']})",
+            value=f"Calls: {stats['calls']}\n"
+                  f"Latency p50/p95: {stats['p50_ms']}ms / {stats['p95_ms']}ms\n"
+                  f"Tokens in/out: {stats['input_tokens']:,} / {stats['output_tokens']:,}\n"
+                  f"Spend: ${stats['cost']:.4f} (${stats['cost_per_call']:.5f}/call)",
+            inline=True
+        )
+    resilience = model_caller.stats()
+    embed.add_field(
+        name="🛡️ Resilience",
+        value=f"Breaker: {resilience['breaker']} ({resilience['trips']} trips)\n"
+              f"Retried: {resilience['retried']} | Failed: {resilience['failed']} | "
+              f"Rejected: {resilience['rejected']}\n"
+              f"Hedges: {resilience['hedges']} ({resilience['hedge_wins']} won) | After: "
+              f"{', '.join(f'{tier} {ms}ms' for tier, ms in resilience['hedge_after_ms'].items()) or '-'}",
+        inline=False
+    )
+    limiter = model_limiter.stats()
+    embed.add_field(
+        name="🚦 Concurrency",
+        value=f"Limit: {limiter['limit']} | In flight: {limiter['inflight']} | Queued: {limiter['queued']}\n"
+              f"Queue delay p50/p95: {limiter['queue_p50_ms']}ms / {limiter['queue_p95_ms']}ms\n"
+              f"Baseline latency: {', '.join(f'{tier} {ms}ms' for tier, ms in limiter['baselines_ms'].items()) or '-'} | "
+              f"+{limiter['increases']} / -{limiter['decreases']} adjustments",
+        inline=False
+    )
+    if model_transport:
+        pool = model_transport.metrics()
+        embed.add_field(
+            name="🔌 Connection Pool",
+            value=f"Requests: {pool['requests']} ({pool['pings']} pings) | "
+                  f"New connections: {pool['new_connections']}\n"
+                  f"Reuse rate: {pool['reuse_rate']:.0%} | "
+                  f"Handshake p50/p99: {pool['handshake_p50_ms']}ms / {pool['handshake_p99_ms']}ms\n"
+                  f"Handshake time saved: {pool['handshake_saved_ms']}ms",
+            inline=False
+        )
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="tokens", description="Show token usage, top consumers and cost trends (admin only)")
+@app_commands.default_permissions(administrator=True)
+async def tokens_command(interaction: discord.Interaction):
+    """Show the guild's token ledger against its quotas."""
+    if not startup.is_ready('guild_states'):
+        await interaction.response.send_message(startup_message('guild_states'), ephemeral=True)
+        return
+    
+    ledger = guild_states.for_interaction(interaction).tokens
+    usage = ledger.usage(str(interaction.user.id))
+    
+    def quota(name):
+        return f"{ledger.quotas[name]:,}" if ledger.quotas.get(name) else "no limit"
+    
+    embed = discord.Embed(
+        title="🪙 Token Usage",
+        color=discord.Color.blue()
+    )
+    embed.add_field(
+        name="📊 Server Totals",
+        value=f"Today: {usage['guild_daily']:,} of {quota('guild_daily')} tokens\n"
+              f"This month: {usage['guild_monthly']:,} of {quota('guild_monthly')} tokens\n"
+              f"Spend this month: ${ledger.month_cost:.4f}\n"
+              f"Member quotas: {quota('user_daily')}/day, {quota('user_monthly')}/month",
+        inline=False
+    )
+    top = ledger.top_users()
+    embed.add_field(
+        name="🔝 Top Consumers This Month",
+        value="\n".join(f"<@{user_id}>: {tokens:,} tokens (${cost:.4f})" for user_id, tokens, cost in top)
+              or "No usage yet",
+        inline=False
+    )
+    trend = ledger.trend()
+    this_week = sum(cost for _, _, cost, _ in trend[7:])
+    last_week = sum(cost for _, _, cost, _ in trend[:7])
+    change = f"{(this_week - last_week) / last_week * 100:+.0f}%" if last_week else "n/a"
+    embed.add_field(
+        name="📈 Last 14 Days",
+        value="\n".join(f"{day[5:]}: {tokens:,} tokens, ${cost:.4f}, {calls} calls" for day, tokens, cost, calls in trend),
+        inline=False
+    )
+    embed.set_footer(text=f"Spend last 7 days: ${this_week:.4f} ({change} vs the week before)")
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="memory", description="Show memory use and pressure responses (admin only)")
+@app_commands.default_permissions(administrator=True)
+async def memory_command(interaction: discord.Interaction):
+    """Show RSS against the container limit and the size of our own structures."""
+    memory_governor.check()
+    report = memory_governor.report()
+    
+    embed = discord.Embed(
+        title="🧮 Memory",
+        description=f"RSS {report['rss_mb']}MB of {report['limit_mb']}MB "
+                    f"(peak {report['peak_mb']}MB) | Pressure: {report['stage']}",
+        color=discord.Color.blue()
+    )
+    embed.add_field(
+        name="📦 Structures",
+        value="\n".join(f"{name}: {size}" for name, size in report['sizes'].items()) or "Nothing tracked yet",
+        inline=True
+    )
+    embed.add_field(
+        name="🧹 Pressure Responses Run",
+        value="\n".join(f"{stage}: {count}" for stage, count in report['runs'].items()),
+        inline=True
+    )
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="profile", description="Profile the live bot for a few seconds (admin only)")
+@app_commands.default_permissions(administrator=True)
+@discord.app_commands.choices(mode=[
+    discord.app_commands.Choice(name="Sampling (low overhead)", value="sample"),
+    discord.app_commands.Choice(name="cProfile (exact, max 10s)", value="cprofile")
+])
+async def profile_command(interaction: discord.Interaction, seconds: int = 10, mode: str = "sample"):
+    """Profile the event loop and attach the report as a file."""
+    try:
+        await interaction.response.defer()
+        from profiling import profiler
+        
+        if profiler.busy:
+            await interaction.followup.send("A profile is already running, try again when it finishes.", ephemeral=True)
+            return
+        
+        filename, report = await profiler.profile(seconds, mode)
+        await interaction.followup.send(
+            f"🔬 {mode} profile of the event loop",
+            file=discord.File(io.BytesIO(report.encode()), filename=filename)
+        )
+    
+    except Exception as e:
+        logger.error(f"Error in profile command: {str(e)}", exc_info=True)
+        await interaction.followup.send("Oops! Something went wrong. Try again? 🔄")
+
+@bot.tree.command(name="memtrace", description="Trace allocations and diff snapshots (admin only)")
+@app_commands.default_permissions(administrator=True)
+@discord.app_commands.choices(action=[
+    discord.app_commands.Choice(name="Start tracing", value="start"),
+    discord.app_commands.Choice(name="Snapshot and diff", value="diff"),
+    discord.app_commands.Choice(name="Stop tracing", value="stop")
+])
+async def memtrace_command(interaction: discord.Interaction, action: str):
+    """Control tracemalloc; diffs are attached as files."""
+    try:
+        await interaction.response.defer()
+        from profiling import profiler
+        
+        if action == "start":
+            if memory_governor.stage in ('high', 'critical'):
+                # Tracing costs memory of its own; don't push us over the limit
+                await interaction.followup.send(f"Memory pressure is {memory_governor.stage}, not starting tracing.")
+                return
+            await interaction.followup.send(profiler.trace_start())
+        elif action == "stop":
+            await interaction.followup.send(profiler.trace_stop())
+        else:
+            if not profiler.tracing:
+                await interaction.followup.send("Allocation tracing isn't running; use `/memtrace start` first.")
+                return
+            try:
+                filename, report = await asyncio.to_thread(profiler.trace_diff)
+            except RuntimeError:
+                # Stopped by its time limit or memory pressure while we were diffing
+                await interaction.followup.send("Allocation tracing stopped before the snapshot was taken.")
+                return
+            await interaction.followup.send(
+                "🧮 Allocation snapshot diff",
+                file=discord.File(io.BytesIO(report.encode()), filename=filename)
+            )
+    
+    except Exception as e:
+        logger.error(f"Error in memtrace command: {str(e)}", exc_info=True)
+        await interaction.followup.send("Oops! Something went wrong. Try again? 🔄")
+
 class SaleEntryModal(discord.ui.Modal):
     def __init__(self, user_id: str, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -1214,4 +1940,9 @@ class FeedbackEntryModal(discord.ui.Modal):
             )
         )
 
-bot.run(TOKEN)
\ No newline at end of file
+if __name__ == '__main__':
+    if WORKERS > 1 and SHARD_IDS is None:
+        from workers import run_workers
+        sys.exit(run_workers(WORKERS, SHARD_COUNT or WORKERS))
+    else:
+        bot.run(TOKEN)
\ No newline at end of file
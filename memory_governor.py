@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger('InvexBot')
+
+MEMORY_LIMIT_MB = float(os.getenv('MEMORY_LIMIT_MB', '100'))  # discloud.config RAM
+MEMORY_CHECK_INTERVAL = float(os.getenv('MEMORY_CHECK_INTERVAL', '15'))
+# Fraction of the limit at which each pressure stage starts, mildest first
+PRESSURE_STAGES = [
+    ('elevated', 0.70),
+    ('high', 0.80),
+    ('critical', 0.90)
+]
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+def current_rss() -> int:
+    """Resident set size in bytes (peak RSS where /proc isn't available)."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        try:
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        except ImportError:
+            return 0
+
+class MemoryGovernor:
+    """Samples RSS and applies staged pressure responses before the container limit.
+
+    Structures register a sizer for reporting; pressure responses register
+    per stage and return a short description of what they freed (or None).
+    When a stage is reached, its responses and those of every milder stage run.
+    """
+
+    def __init__(self, limit_mb: float = MEMORY_LIMIT_MB, stages=PRESSURE_STAGES):
+        self.limit = int(limit_mb * 1024 * 1024)
+        self.stages = stages
+        self.sizers = {}
+        self.responses = {name: [] for name, _ in stages}
+        self.stage = None
+        self.last_rss = 0
+        self.peak_rss = 0
+        self.runs = {name: 0 for name, _ in stages}
+
+    def track(self, name: str, sizer):
+        """Report sizer() (an item count or byte size) in memory reports."""
+        self.sizers[name] = sizer
+
+    def on_pressure(self, stage: str, name: str, response):
+        self.responses[stage].append((name, response))
+
+    def stage_for(self, rss: int):
+        current = None
+        for name, fraction in self.stages:
+            if rss >= self.limit * fraction:
+                current = name
+        return current
+
+    def sizes(self) -> dict:
+        result = {}
+        for name, sizer in self.sizers.items():
+            try:
+                result[name] = sizer()
+            except Exception as e:
+                result[name] = f"error: {str(e)}"
+        return result
+
+    def check(self):
+        """Sample RSS once and run the responses for the current pressure stage."""
+        rss = current_rss()
+        self.last_rss = rss
+        self.peak_rss = max(self.peak_rss, rss)
+        stage = self.stage_for(rss)
+        if stage != self.stage:
+            logger.info(
+                f"Memory pressure {self.stage or 'normal'} -> {stage or 'normal'} "
+                f"at {rss / 1048576:.1f}MB of {self.limit / 1048576:.0f}MB; sizes: {self.sizes()}"
+            )
+            self.stage = stage
+        if stage is None:
+            return []
+
+        freed = []
+        for name, _ in self.stages:
+            for label, response in self.responses[name]:
+                try:
+                    result = response()
+                except Exception as e:
+                    logger.error(f"Memory pressure response {label} failed: {str(e)}")
+                    continue
+                if result:
+                    freed.append(f"{label}: {result}")
+            self.runs[name] += 1
+            if name == stage:
+                break
+        if freed:
+            logger.warning(f"Memory pressure {stage} ({rss / 1048576:.1f}MB): " + "; ".join(freed))
+        return freed
+
+    async def run(self, interval: float = MEMORY_CHECK_INTERVAL):
+        while True:
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Error in memory governor: {str(e)}")
+            await asyncio.sleep(interval)
+
+    def report(self) -> dict:
+        return {
+            'rss_mb': round(self.last_rss / 1048576, 1),
+            'peak_mb': round(self.peak_rss / 1048576, 1),
+            'limit_mb': round(self.limit / 1048576),
+            'stage': self.stage or 'normal',
+            'runs': dict(self.runs),
+            'sizes': self.sizes()
+        }
+
+memory_governor = MemoryGovernor()
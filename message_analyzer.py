@@ -0,0 +1,86 @@
+import re
+
+# Keyword tables used to pull signals out of user messages. Matching is
+# substring based, same as the original `word in message_lower` checks.
+PROMOTION_TRIGGERS = {
+    'inventory': 'track your inventory and manage stock levels',
+    'tracking': 'track packages, sales, and customer data',
+    'supplier': 'access exclusive suppliers with 2-day delivery',
+    'scaling': 'scale your business with automated tools',
+    'profit': 'calculate profits and track expenses',
+    'customer': 'manage customer relationships',
+    'shipping': 'track shipments and manage deliveries'
+}
+
+BUDGET_TRIGGERS = ['budget', 'spend', 'invest', '$']
+
+PRODUCT_KEYWORDS = {
+    'electronics': ['electronics', 'airpods', 'phones', 'gadgets', 'tech'],
+    'fashion': ['clothes', 'fashion', 'shoes', 'apparel', 'wear'],
+    'accessories': ['accessories', 'watches', 'jewelry', 'bags']
+}
+
+EXPERIENCE_KEYWORDS = {
+    'beginner': ['new', 'beginner', 'starting', 'never', 'first time'],
+    'intermediate': ['some', 'few months', 'year'],
+    'advanced': ['experienced', 'professional', 'years']
+}
+
+def _build_keyword_index():
+    """Map every keyword to the signals it raises."""
+    index = {}
+    for trigger in PROMOTION_TRIGGERS:
+        index.setdefault(trigger, []).append(('promotion', trigger))
+    for trigger in BUDGET_TRIGGERS:
+        index.setdefault(trigger, []).append(('budget', trigger))
+    for category, keywords in PRODUCT_KEYWORDS.items():
+        for keyword in keywords:
+            index.setdefault(keyword, []).append(('interest', category))
+    for level, keywords in EXPERIENCE_KEYWORDS.items():
+        for keyword in keywords:
+            index.setdefault(keyword, []).append(('experience', level))
+    return index
+
+_KEYWORD_INDEX = _build_keyword_index()
+
+# One alternation for all keywords plus the dollar amount. It sits inside a
+# lookahead so overlapping keywords ("year" inside "years") are still seen.
+_MESSAGE_PATTERN = re.compile(
+    r'(?=(?P<amount>\$?\d+(?:\.\d{2})?)|(?P<keyword>'
+    + '|'.join(re.escape(k) for k in sorted(_KEYWORD_INDEX, key=len, reverse=True))
+    + '))'
+)
+
+def parse_message(message: str) -> dict:
+    """Extract budget, interest, experience and promotion signals in one pass."""
+    amount = None
+    found = {'promotion': set(), 'budget': set(), 'interest': set(), 'experience': set()}
+    for match in _MESSAGE_PATTERN.finditer(message.lower()):
+        value = match.group('amount')
+        if value is not None:
+            if amount is None:
+                amount = float(value.lstrip('$'))
+            if value.startswith('$'):
+                found['budget'].add('$')
+            continue
+        for kind, signal in _KEYWORD_INDEX[match.group('keyword')]:
+            found[kind].add(signal)
+
+    # Later table entries win, matching the order the old loops applied them
+    promotion_context = None
+    for trigger, context in PROMOTION_TRIGGERS.items():
+        if trigger in found['promotion']:
+            promotion_context = context
+
+    experience_level = None
+    for level in EXPERIENCE_KEYWORDS:
+        if level in found['experience']:
+            experience_level = level
+
+    return {
+        'amount': amount,
+        'budget': amount if found['budget'] else None,
+        'interests': [c for c in PRODUCT_KEYWORDS if c in found['interest']],
+        'experience_level': experience_level,
+        'promotion_context': promotion_context
+    }
@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+
+logger = logging.getLogger('InvexBot')
+
+MODEL_RETRIES = int(os.getenv('MODEL_RETRIES', '2'))
+RETRY_BASE_DELAY = 0.5  # Seconds; full jitter up to base * 2^attempt
+RETRY_MAX_DELAY = 4.0
+MODEL_HEDGING = os.getenv('MODEL_HEDGING', '0') == '1'  # Duplicate calls that run past the p95
+HEDGE_MIN_SAMPLES = 20  # Calls observed before the p95 is trusted
+HEDGE_MIN_DELAY = 2.0  # Never hedge sooner than this many seconds
+BREAKER_WINDOW = 60  # Seconds of call outcomes the breaker looks at
+BREAKER_MIN_FAILURES = 5
+BREAKER_FAILURE_RATIO = 0.5
+BREAKER_COOLDOWN = 30  # Seconds the breaker stays open before a trial call
+
+# 408/409 and 5xx are transient upstream problems; 529 is "overloaded"
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+RETRYABLE_ERRORS = {'APIConnectionError', 'APITimeoutError', 'TimeoutError', 'ConnectError', 'ReadTimeout'}
+
+class ModelUnavailable(Exception):
+    """The model can't be reached right now; callers should degrade."""
+
+def is_retryable(error: Exception) -> bool:
+    if getattr(error, 'status_code', None) in RETRYABLE_STATUS:
+        return True
+    return any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__)
+
+class CircuitBreaker:
+    """Opens after sustained failures so calls fail fast during an outage."""
+
+    def __init__(self, window=BREAKER_WINDOW, min_failures=BREAKER_MIN_FAILURES,
+                 failure_ratio=BREAKER_FAILURE_RATIO, cooldown=BREAKER_COOLDOWN, name='Model'):
+        self.name = name
+        self.window = window
+        self.min_failures = min_failures
+        self.failure_ratio = failure_ratio
+        self.cooldown = cooldown
+        self.outcomes = deque()  # (monotonic time, ok)
+        self.opened_at = None
+        self.trial_running = False
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return 'half_open'
+        return 'open'
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls should skip the model entirely."""
+        state = self.state
+        return state == 'open' or (state == 'half_open' and self.trial_running)
+
+    def allow(self) -> bool:
+        """Whether a call may go out; half-open lets a single trial through."""
+        state = self.state
+        if state == 'closed':
+            return True
+        if state == 'half_open' and not self.trial_running:
+            self.trial_running = True
+            return True
+        return False
+
+    def _trim(self, now: float):
+        while self.outcomes and now - self.outcomes[0][0] > self.window:
+            self.outcomes.popleft()
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info(f"{self.name} circuit breaker closed")
+        self.opened_at = None
+        self.trial_running = False
+        now = time.monotonic()
+        self.outcomes.append((now, True))
+        self._trim(now)
+
+    def record_failure(self):
+        now = time.monotonic()
+        if self.opened_at is not None:
+            # Failed trial call: stay open for another cooldown
+            self.opened_at = now
+            self.trial_running = False
+            return
+        self.outcomes.append((now, False))
+        self._trim(now)
+        failures = sum(1 for _, ok in self.outcomes if not ok)
+        if failures >= self.min_failures and failures / len(self.outcomes) >= self.failure_ratio:
+            self.opened_at = now
+            self.trips += 1
+            self.outcomes.clear()
+            logger.warning(f"{self.name} circuit breaker opened after {failures} failures in {self.window}s")
+
+class ResilientCaller:
+    """Jittered retries, optional hedging and a circuit breaker around model calls.
+
+    Latencies are kept per key (the model tier), so a fast-tier call isn't
+    hedged against the large tier's p95 or the other way round.
+    """
+
+    def __init__(self, retries=MODEL_RETRIES, hedging=MODEL_HEDGING, breaker=None):
+        self.retries = retries
+        self.hedging = hedging
+        self.breaker = breaker or CircuitBreaker()
+        self.latencies = {}  # key -> deque of recent successful call latencies
+        self.calls = 0
+        self.retried = 0
+        self.failed = 0
+        self.rejected = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def hedge_delay(self, key: str = 'default'):
+        """Seconds to wait before hedging a key's call, or None when hedging is off or untrained."""
+        latencies = self.latencies.get(key, ())
+        if not self.hedging or len(latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(latencies)
+        return max(ordered[int(len(ordered) * 0.95) - 1], HEDGE_MIN_DELAY)
+
+    async def call(self, make_call, key: str = 'default'):
+        """Run make_call() (a coroutine factory) with retries; raises ModelUnavailable.
+
+        key picks the latency history the hedge delay comes from.
+        """
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise ModelUnavailable("circuit breaker open")
+        self.calls += 1
+        for attempt in range(self.retries + 1):
+            started = time.perf_counter()
+            try:
+                result = await self._attempt(make_call, key)
+            except asyncio.CancelledError:
+                self.breaker.trial_running = False
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    # Our own bad request; the upstream is fine
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                logger.warning(f"Model call failed (attempt {attempt + 1}): {type(e).__name__}: {str(e)}")
+                if attempt == self.retries or not self.breaker.allow():
+                    self.failed += 1
+                    raise ModelUnavailable(str(e)) from e
+                self.retried += 1
+                await asyncio.sleep(random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)))
+                continue
+            self.latencies.setdefault(key, deque(maxlen=500)).append(time.perf_counter() - started)
+            self.breaker.record_success()
+            return result
+
+    async def _attempt(self, make_call, key: str):
+        delay = self.hedge_delay(key)
+        first = asyncio.ensure_future(make_call())
+        if delay is None:
+            return await first
+        pending = {first}
+        error = None
+        try:
+            # asyncio.wait doesn't cancel first when we are cancelled, so finally does
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            if done:
+                return first.result()
+
+            # The call is slower than 95% of recent ones; race a duplicate against it
+            self.hedges += 1
+            second = asyncio.ensure_future(make_call())
+            pending = {first, second}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        delays = {key: self.hedge_delay(key) for key in sorted(self.latencies)}
+        return {
+            'breaker': self.breaker.state,
+            'trips': self.breaker.trips,
+            'calls': self.calls,
+            'retried': self.retried,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'hedge_after_ms': {key: round(delay * 1000) for key, delay in delays.items() if delay}
+        }
+
+model_caller = ResilientCaller()
@@ -0,0 +1,104 @@
+import os
+import re
+import time
+from collections import deque
+
+# Each tier is the model and sampling settings used for a class of query.
+# Costs are USD per million input/output tokens, for the spend estimate.
+MODEL_TIERS = {
+    'fast': {
+        'model': os.getenv('FAST_MODEL', 'claude-3-5-haiku-20241022'),
+        'max_tokens': 600,
+        'temperature': 0.7,
+        'input_cost': 0.8,
+        'output_cost': 4.0
+    },
+    'large': {
+        'model': os.getenv('LARGE_MODEL', 'claude-3-5-sonnet-20241022'),
+        'max_tokens': 8192,
+        'temperature': 0.9,
+        'input_cost': 3.0,
+        'output_cost': 15.0
+    }
+}
+
+# Stages whose system prompt asks for a quick, narrow answer
+SIMPLE_STAGES = {'initial', 'budget_set', 'interests_set'}
+SHORT_QUERY_WORDS = 12
+LONG_QUERY_WORDS = 30
+KB_CONFIDENT_SCORE = 0.25  # Retrieval score above which the KB grounds the answer
+STRATEGY_RE = re.compile(
+    r"\b(strategy|strategies|scale|scaling|grow|growing|plan|compare|versus|vs|why|"
+    r"long[- ]term|business model|diversify|negotiate|supplier|pros and cons)\b"
+)
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def classify(query: str, stage: str, kb_score: float = 0.0):
+    """Pick a tier for a query; returns (tier, reason)."""
+    words = len(query.split())
+    if words > LONG_QUERY_WORDS:
+        return 'large', 'long query'
+    if STRATEGY_RE.search(query.lower()):
+        return 'large', 'open-ended'
+    if stage in SIMPLE_STAGES and words <= SHORT_QUERY_WORDS:
+        return 'fast', f'simple stage {stage}'
+    if kb_score >= KB_CONFIDENT_SCORE:
+        return 'fast', 'kb grounded'
+    if words <= SHORT_QUERY_WORDS:
+        return 'fast', 'short query'
+    return 'large', 'default'
+
+class ModelRouter:
+    """Routes queries to model tiers and tracks latency, tokens and cost per tier."""
+
+    def __init__(self, tiers=MODEL_TIERS):
+        self.tiers = tiers
+        self.metrics = {
+            name: {'calls': 0, 'input_tokens': 0, 'output_tokens': 0, 'cost': 0.0,
+                   'latencies': deque(maxlen=500)}
+            for name in tiers
+        }
+
+    def params(self, tier: str) -> dict:
+        config = self.tiers[tier]
+        return {'model': config['model'], 'max_tokens': config['max_tokens'], 'temperature': config['temperature']}
+
+    def record(self, tier: str, started: float, usage=None):
+        """Record one finished call; usage is the response's token usage."""
+        metrics = self.metrics[tier]
+        metrics['calls'] += 1
+        metrics['latencies'].append(time.perf_counter() - started)
+        if usage is not None:
+            metrics['input_tokens'] += usage.input_tokens
+            metrics['output_tokens'] += usage.output_tokens
+            metrics['cost'] += self.cost(tier, usage)
+
+    def cost(self, tier: str, usage) -> float:
+        """Estimated USD cost of a response's token usage on a tier."""
+        config = self.tiers[tier]
+        return (usage.input_tokens * config['input_cost'] + usage.output_tokens * config['output_cost']) / 1_000_000
+
+    def stats(self) -> dict:
+        """Per-tier call counts, latency percentiles, tokens and spend."""
+        result = {}
+        for name, metrics in self.metrics.items():
+            latencies = list(metrics['latencies'])
+            calls = metrics['calls']
+            result[name] = {
+                'model': self.tiers[name]['model'],
+                'calls': calls,
+                'p50_ms': round(_percentile(latencies, 50) * 1000),
+                'p95_ms': round(_percentile(latencies, 95) * 1000),
+                'input_tokens': metrics['input_tokens'],
+                'output_tokens': metrics['output_tokens'],
+                'cost': round(metrics['cost'], 4),
+                'cost_per_call': round(metrics['cost'] / calls, 5) if calls else 0.0
+            }
+        return result
+
+model_router = ModelRouter()
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+
+import httpx
+
+logger = logging.getLogger('InvexBot')
+
+MODEL_BASE_URL = os.getenv('ANTHROPIC_BASE_URL', 'https://api.anthropic.com')
+MODEL_POOL_SIZE = int(os.getenv('MODEL_POOL_SIZE', '10'))
+MODEL_WARM_CONNECTIONS = int(os.getenv('MODEL_WARM_CONNECTIONS', '4'))  # Opened at startup and kept alive
+MODEL_KEEPALIVE_SECONDS = float(os.getenv('MODEL_KEEPALIVE_SECONDS', '90'))
+MODEL_PING_INTERVAL = float(os.getenv('MODEL_PING_INTERVAL', '60'))  # Keep below the keep-alive expiry
+MODEL_TIMEOUT = float(os.getenv('MODEL_TIMEOUT', '60'))
+METRICS_LOG_INTERVAL = 600  # Log reuse metrics every 10 minutes
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+class ModelTransport:
+    """Shared HTTP connection pool for every Claude call, with reuse metrics."""
+
+    def __init__(self, base_url=MODEL_BASE_URL, pool_size=MODEL_POOL_SIZE,
+                 keepalive=MODEL_KEEPALIVE_SECONDS, ping_interval=MODEL_PING_INTERVAL):
+        self.base_url = base_url
+        self.ping_interval = ping_interval
+        self.warm_connections = max(1, min(pool_size, MODEL_WARM_CONNECTIONS))
+        self.http_client = httpx.AsyncClient(
+            base_url=base_url,
+            limits=httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size,
+                keepalive_expiry=keepalive
+            ),
+            timeout=httpx.Timeout(MODEL_TIMEOUT, connect=10.0),
+            event_hooks={'request': [self._on_request]}
+        )
+        self.last_request = 0.0
+        self.requests = 0
+        self.new_connections = 0
+        self.pings = 0
+        self.handshake_times = deque(maxlen=500)  # seconds, TCP connect through TLS
+
+    def build_client(self, api_key):
+        """Create the async Claude client on top of the shared pool.
+
+        SDK retries are off because model_resilience retries with its own backoff.
+        """
+        import anthropic
+        return anthropic.AsyncAnthropic(api_key=api_key, http_client=self.http_client, max_retries=0)
+
+    async def _on_request(self, request):
+        """Attach an httpcore trace to count new connections and handshakes."""
+        self.requests += 1
+        self.last_request = time.monotonic()
+        started = {}
+
+        async def trace(event_name, info):
+            if event_name == 'connection.connect_tcp.started':
+                started['at'] = time.perf_counter()
+                self.new_connections += 1
+            elif event_name == 'connection.start_tls.complete' and 'at' in started:
+                self.handshake_times.append(time.perf_counter() - started.pop('at'))
+
+        request.extensions['trace'] = trace
+
+    async def ping(self):
+        """Cheap request that opens or refreshes a pooled connection."""
+        self.pings += 1
+        try:
+            await self.http_client.head('/')
+        except httpx.HTTPError as e:
+            logger.warning(f"Model API keep-alive ping failed: {str(e)}")
+
+    async def warm(self):
+        """Open warm_connections pooled connections before any user needs them.
+
+        The pings run concurrently, so none of them finds an idle connection
+        to reuse and each opens its own.
+        """
+        await asyncio.gather(*(self.ping() for _ in range(self.warm_connections)))
+
+    async def keep_alive_loop(self):
+        """Ping during quiet periods so the warm connections never expire."""
+        last_log = time.monotonic()
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            if time.monotonic() - self.last_request >= self.ping_interval:
+                await self.warm()
+            if time.monotonic() - last_log >= METRICS_LOG_INTERVAL:
+                logger.info(f"Model connection pool: {self.metrics()}")
+                last_log = time.monotonic()
+
+    def metrics(self) -> dict:
+        """Connection reuse counters and handshake latency."""
+        reused = max(self.requests - self.new_connections, 0)
+        handshakes = list(self.handshake_times)
+        p50 = _percentile(handshakes, 50)
+        return {
+            'requests': self.requests,
+            'pings': self.pings,
+            'new_connections': self.new_connections,
+            'reused_connections': reused,
+            'reuse_rate': round(reused / self.requests, 3) if self.requests else 0.0,
+            'handshake_p50_ms': round(p50 * 1000, 1),
+            'handshake_p99_ms': round(_percentile(handshakes, 99) * 1000, 1),
+            'handshake_saved_ms': round(reused * p50 * 1000, 1)
+        }
+
+    async def close(self):
+        await self.http_client.aclose()
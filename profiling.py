@@ -0,0 +1,227 @@
+import asyncio
+import cProfile
+import io
+import linecache
+import logging
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+logger = logging.getLogger('InvexBot')
+
+# Hard limits so a profiling request can't hurt the live bot
+PROFILE_MAX_SECONDS = 30
+CPROFILE_MAX_SECONDS = 10  # Deterministic profiling slows every call; keep it short
+SAMPLE_INTERVAL = 0.005  # Seconds between stack samples of the event loop thread
+LAG_TICK = 0.05  # Seconds between event loop lag probes
+TRACEMALLOC_FRAMES = 10
+TRACEMALLOC_MAX_SECONDS = 300  # Tracing is stopped automatically after this long
+REPORT_ROWS = 40
+IDLE_FUNCTIONS = {'select', 'poll', 'epoll', 'kqueue'}  # Loop waiting for I/O
+CO_COROUTINE = 0x80
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}:{frame.f_lineno}"
+
+def _function_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}"
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer, like py-spy but in-process."""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()  # Collapsed stack -> samples
+        self.self_time = Counter()
+        self.inclusive = Counter()
+        self.coroutines = Counter()
+        self.samples = 0
+        self.idle = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            if frame.f_code.co_name in IDLE_FUNCTIONS:
+                self.idle += 1
+                continue
+            stack = []
+            seen = set()
+            while frame is not None:
+                function = _function_label(frame)
+                stack.append(function)
+                if function not in seen:
+                    seen.add(function)
+                    self.inclusive[function] += 1
+                    if frame.f_code.co_flags & CO_COROUTINE:
+                        self.coroutines[function] += 1
+                frame = frame.f_back
+            self.self_time[stack[0]] += 1
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def report(self, seconds: float, lag: list) -> str:
+        busy = self.samples - self.idle
+        lines = [
+            f"Sampled event loop for {seconds:.1f}s: {self.samples} samples every {self.interval * 1000:.0f}ms, "
+            f"{busy} busy ({busy / self.samples * 100 if self.samples else 0:.1f}%)",
+            _lag_line(lag),
+            "",
+            "== Hottest functions (self samples) ==",
+        ]
+        lines += [f"{count:6d}  {name}" for name, count in self.self_time.most_common(REPORT_ROWS)]
+        lines += ["", "== Hottest functions (inclusive samples) =="]
+        lines += [f"{count:6d}  {name}" for name, count in self.inclusive.most_common(REPORT_ROWS)]
+        lines += ["", "== Slowest coroutines (on-CPU samples while running) =="]
+        lines += [f"{count:6d}  {name}" for name, count in self.coroutines.most_common(REPORT_ROWS)]
+        lines += ["", "== Collapsed stacks (flamegraph.pl / speedscope format) =="]
+        lines += [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+        return "\n".join(lines)
+
+def _lag_line(lag: list) -> str:
+    if not lag:
+        return "Event loop lag: no samples"
+    ordered = sorted(lag)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"Event loop lag: p95 {p95 * 1000:.1f}ms, max {ordered[-1] * 1000:.1f}ms over {len(lag)} probes"
+
+async def _probe_lag(stop: asyncio.Event, lag: list):
+    """Measure how late the loop wakes us, i.e. how long callbacks block it."""
+    while not stop.is_set():
+        expected = time.perf_counter() + LAG_TICK
+        await asyncio.sleep(LAG_TICK)
+        lag.append(max(0.0, time.perf_counter() - expected))
+
+def _pending_tasks() -> str:
+    """Where every pending task is currently suspended."""
+    lines = ["", "== Pending tasks =="]
+    for task in asyncio.all_tasks():
+        coro = task.get_coro()
+        frames = task.get_stack(limit=1)
+        where = _frame_label(frames[-1]) if frames else 'not started'
+        lines.append(f"{getattr(coro, '__qualname__', repr(coro))}  @ {where}")
+    return "\n".join(lines)
+
+class Profiler:
+    """Admin-triggered profiling of the live bot, one session at a time."""
+
+    def __init__(self):
+        self.busy = False
+        self.baseline = None  # Previous tracemalloc snapshot to diff against
+        self.trace_started = None
+        self._trace_stopper = None
+
+    async def profile(self, seconds: float, mode: str = 'sample'):
+        """Profile the event loop thread; returns (filename, report text)."""
+        if self.busy:
+            raise RuntimeError("A profile is already running")
+        limit = CPROFILE_MAX_SECONDS if mode == 'cprofile' else PROFILE_MAX_SECONDS
+        seconds = max(1.0, min(float(seconds), limit))
+        self.busy = True
+        lag, stop = [], asyncio.Event()
+        probe = asyncio.create_task(_probe_lag(stop, lag))
+        started = time.perf_counter()
+        try:
+            if mode == 'cprofile':
+                profile = cProfile.Profile()
+                profile.enable()
+                try:
+                    await asyncio.sleep(seconds)
+                finally:
+                    profile.disable()
+                out = io.StringIO()
+                stats = pstats.Stats(profile, stream=out)
+                out.write(_lag_line(lag) + "\n\n")
+                stats.sort_stats('cumulative').print_stats(REPORT_ROWS)
+                stats.sort_stats('tottime').print_stats(REPORT_ROWS)
+                report = out.getvalue()
+            else:
+                sampler = StackSampler(threading.get_ident())
+                sampler.start()
+                try:
+                    await asyncio.sleep(seconds)
+                finally:
+                    sampler.stop()
+                report = sampler.report(time.perf_counter() - started, lag)
+            report += "\n" + _pending_tasks()
+        finally:
+            stop.set()
+            await probe
+            self.busy = False
+        logger.info(f"Profiled event loop for {seconds:.0f}s ({mode})")
+        return f"profile-{mode}-{int(time.time())}.txt", report
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def trace_start(self) -> str:
+        if tracemalloc.is_tracing():
+            return "Allocation tracing is already running"
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        self.trace_started = time.monotonic()
+        self.baseline = tracemalloc.take_snapshot()
+        self._trace_stopper = asyncio.get_running_loop().call_later(TRACEMALLOC_MAX_SECONDS, self.trace_stop)
+        logger.info("Started tracemalloc")
+        return f"Allocation tracing started; it stops by itself after {TRACEMALLOC_MAX_SECONDS}s"
+
+    def trace_stop(self) -> str:
+        if not tracemalloc.is_tracing():
+            return "Allocation tracing isn't running"
+        if self._trace_stopper:
+            self._trace_stopper.cancel()
+            self._trace_stopper = None
+        tracemalloc.stop()
+        self.baseline = None
+        logger.info("Stopped tracemalloc")
+        return "Allocation tracing stopped"
+
+    def trace_diff(self):
+        """Diff a new snapshot against the previous one; returns (filename, report text).
+
+        Runs in a worker thread while trace_stop may run on the event loop, so
+        it works from its own references and take_snapshot raises if tracing
+        stops first.
+        """
+        baseline, started = self.baseline, self.trace_started
+        if baseline is None or not tracemalloc.is_tracing():
+            raise RuntimeError("Allocation tracing isn't running; start it first")
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, linecache.__file__)
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [
+            f"Traced memory: {current / 1048576:.1f}MB now, {peak / 1048576:.1f}MB peak, "
+            f"tracing for {time.monotonic() - started:.0f}s",
+            "",
+            "== Growth since previous snapshot =="
+        ]
+        lines += [str(stat) for stat in snapshot.compare_to(baseline, 'lineno')[:REPORT_ROWS]]
+        lines += ["", "== Top allocating sites =="]
+        lines += [str(stat) for stat in snapshot.statistics('lineno')[:REPORT_ROWS]]
+        lines += ["", "== Largest allocation tracebacks =="]
+        for stat in snapshot.statistics('traceback')[:5]:
+            lines.append(f"{stat.count} blocks, {stat.size / 1024:.1f} KiB")
+            lines += [f"    {line}" for line in stat.traceback.format()]
+        if self.baseline is baseline:
+            self.baseline = snapshot  # Unless tracing was stopped or restarted meanwhile
+        return f"tracemalloc-{int(time.time())}.txt", "\n".join(lines)
+
+profiler = Profiler()
@@ -0,0 +1,302 @@
+import argparse
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+
+from traffic_trace import read_traces
+
+logger = logging.getLogger('InvexBot')
+
+DEFAULT_MODEL_MS = 1500.0  # Stub latency for model calls in traces recorded without timings
+ERROR_TEXT = "Something went wrong"
+# Traces only hold command options; the forms and confirmation some /update
+# actions wait for are answered with these synthetic submissions
+MODAL_REPLIES = {
+    'sale_modal_': ["Sauvage EDT 100ml", "45", "80", "eBay"],
+    'feedback_modal_': ["5", "Smooth sale, fast shipping"]
+}
+CONFIRM_BUTTONS = {'confirm_reset'}
+
+_replaying = contextvars.ContextVar('replaying_trace', default=None)
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+class FakeMessages:
+    """Stands in for client.messages; sleeps for the latency recorded for the trace."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, messages, system=None, max_tokens=600, **kwargs):
+        self.calls += 1
+        result = _replaying.get()
+        model_ms = DEFAULT_MODEL_MS
+        if result is not None and result['trace'].get('model_calls'):
+            model_ms = result['trace']['model_ms'] / result['trace']['model_calls']
+        await asyncio.sleep(model_ms / 1000)
+        prompt_chars = len(system or '') + sum(len(str(m.get('content', ''))) for m in messages)
+        text = "Replayed answer. Start with small, proven sellers and reinvest your profit."
+        return SimpleNamespace(
+            content=[SimpleNamespace(type='text', text=text)],
+            usage=SimpleNamespace(input_tokens=prompt_chars // 4, output_tokens=min(max_tokens, len(text) // 4))
+        )
+
+class FakeClaude:
+    def __init__(self):
+        self.messages = FakeMessages()
+
+class FakeUser:
+    def __init__(self, user_id: int):
+        self.id = user_id
+        self.name = f"user{user_id % 100000}"
+        self.display_name = self.name
+        self.mention = f"<@{user_id}>"
+        self.display_avatar = None
+        self.roles = []
+        self.bot = False
+
+    async def add_roles(self, *roles, reason=None):
+        self.roles.extend(roles)
+
+class FakeGuild:
+    def __init__(self, guild_id: int):
+        self.id = guild_id
+        self.shard_id = 0
+        self.name = "Replay Guild"
+        self.icon = None
+        self.members = []
+        self.roles = []
+        self.channels = []
+
+    def get_member(self, member_id):
+        return None
+
+    def get_role(self, role_id):
+        return None
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self.done = False
+
+    def is_done(self) -> bool:
+        return self.done
+
+    async def defer(self, *args, **kwargs):
+        self.done = True
+
+    async def send_message(self, content=None, **kwargs):
+        self.done = True
+        self.interaction.sent(content, kwargs)
+
+    async def send_modal(self, modal):
+        self.done = True
+        self.interaction.modals += 1
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    async def send(self, content=None, **kwargs):
+        self.interaction.sent(content, kwargs)
+        view = kwargs.get('view')
+        for item in getattr(view, 'children', []):
+            if getattr(item, 'custom_id', None) in CONFIRM_BUTTONS:
+                self.interaction.reply_later('button_click', item.custom_id)
+
+    async def send_modal(self, modal):
+        self.interaction.modals += 1
+        self.interaction.reply_later('modal_submit', modal.custom_id)
+
+class FakeInteraction:
+    """Just enough of discord.Interaction for the command handlers."""
+
+    def __init__(self, bot, user, guild, custom_id=None, data=None):
+        self.bot = bot
+        self.user = user
+        self.guild = guild
+        self.guild_id = guild.id if guild else None
+        self.custom_id = custom_id
+        self.data = data or {}
+        self.extras = {}
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+        self.messages = 0
+        self.errors = 0
+        self.modals = 0
+
+    def sent(self, content, kwargs):
+        self.messages += 1
+        if content and ERROR_TEXT in content:
+            self.errors += 1
+
+    async def edit_original_response(self, content=None, **kwargs):
+        self.sent(content, kwargs)
+
+    def reply_later(self, event: str, custom_id: str):
+        """Dispatch a synthetic submission once the handler is waiting for it."""
+        values = next((v for prefix, v in MODAL_REPLIES.items() if custom_id.startswith(prefix)), [])
+        reply = FakeInteraction(self.bot, self.user, self.guild, custom_id=custom_id,
+                                data={'components': [{'value': value} for value in values]})
+        asyncio.get_running_loop().call_soon(self.bot.dispatch, event, reply)
+
+class ErrorCounter(logging.Handler):
+    """Counts logged errors against the trace being replayed."""
+
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+
+    def emit(self, record):
+        result = _replaying.get()
+        if result is not None:
+            result['logged_errors'] += 1
+
+async def replay_one(bot_main, trace: dict, results: list):
+    user = FakeUser(int(trace['user'], 16))
+    guild = FakeGuild(int(trace['guild'], 16)) if trace.get('guild') else None
+    interaction = FakeInteraction(bot_main.bot, user, guild)
+    result = {'trace': trace, 'logged_errors': 0}
+    _replaying.set(result)
+    command = bot_main.bot.tree.get_command(trace['cmd'])
+    started = time.perf_counter()
+    error = None
+    try:
+        if command is None:
+            raise LookupError(f"unknown command /{trace['cmd']}")
+        await command.callback(interaction, **trace.get('opts', {}))
+    except Exception as e:
+        error = f"{type(e).__name__}: {str(e)}"
+    results.append({
+        'cmd': trace['cmd'],
+        'ms': (time.perf_counter() - started) * 1000,
+        'recorded_ms': trace.get('ms'),
+        'error': error is not None or interaction.errors > 0 or result['logged_errors'] > 0
+    })
+    if error:
+        logger.warning(f"Replay of /{trace['cmd']} raised {error}")
+
+def schedule(traces: list, speed: float, max_gap: float) -> list:
+    """(offset in seconds, trace) pairs: recorded gaps capped at max_gap, then sped up."""
+    traces = sorted(traces, key=lambda t: t['ts'])
+    offsets = []
+    offset = 0.0
+    previous = traces[0]['ts'] if traces else 0.0
+    for trace in traces:
+        offset += min(trace['ts'] - previous, max_gap)
+        previous = trace['ts']
+        offsets.append((offset / speed, trace))
+    return offsets
+
+async def setup(args):
+    """Import the bot and warm it up against the stubbed model backend."""
+    import main as bot_main
+
+    bot_main.bot.loop = asyncio.get_running_loop()  # wait_for() needs it; we never log in
+    startup = bot_main.startup
+    await startup.run_phase('guild_states', bot_main.init_guild_states)
+    await startup.run_phase('knowledge_base', bot_main.init_knowledge_base, blocking=True)
+    await startup.run_phase('kb_index', bot_main.init_kb_index, blocking=True)
+    await startup.run_phase('canned_answers', bot_main.init_canned_answers, blocking=True)
+    bot_main.claude = FakeClaude()
+    await startup.run_phase('claude', lambda: None)
+    if args.speed > 1 and not args.keep_rate_limits:
+        # A user's requests land closer together than they really did
+        bot_main.MAX_AI_REQUESTS = 10 ** 9
+    logging.getLogger('InvexBot').setLevel(logging.WARNING)
+    logging.getLogger('InvexBot').addHandler(ErrorCounter())
+    return bot_main
+
+def summarize(results: list, wall: float) -> dict:
+    by_command = defaultdict(list)
+    for result in results:
+        by_command[result['cmd']].append(result)
+    report = {'requests': len(results), 'seconds': round(wall, 2),
+              'throughput_rps': round(len(results) / wall, 2) if wall else 0.0, 'commands': {}}
+    for cmd, rows in sorted(by_command.items()):
+        latencies = [row['ms'] for row in rows]
+        recorded = [row['recorded_ms'] for row in rows if row['recorded_ms'] is not None]
+        report['commands'][cmd] = {
+            'count': len(rows),
+            'errors': sum(1 for row in rows if row['error']),
+            'p50_ms': round(percentile(latencies, 50), 1),
+            'p95_ms': round(percentile(latencies, 95), 1),
+            'p99_ms': round(percentile(latencies, 99), 1),
+            'max_ms': round(max(latencies), 1),
+            'recorded_p50_ms': round(percentile(recorded, 50), 1),
+            'recorded_p95_ms': round(percentile(recorded, 95), 1)
+        }
+    return report
+
+def format_report(report: dict, previous: dict = None) -> str:
+    lines = [f"Replayed {report['requests']} interactions in {report['seconds']}s "
+             f"({report['throughput_rps']} req/s)"]
+    if previous:
+        lines[0] += f", previously {previous['throughput_rps']} req/s"
+    lines.append(f"{'command':<12}{'count':>7}{'errors':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+                 f"{'rec p50':>9}{'rec p95':>9}")
+    for cmd, row in report['commands'].items():
+        lines.append(f"{cmd:<12}{row['count']:>7}{row['errors']:>8}{row['p50_ms']:>9}{row['p95_ms']:>9}"
+                     f"{row['p99_ms']:>9}{row['max_ms']:>9}{row['recorded_p50_ms']:>9}{row['recorded_p95_ms']:>9}")
+        before = (previous or {}).get('commands', {}).get(cmd)
+        if before:
+            lines.append(f"{'  vs before':<27}{row['p50_ms'] - before['p50_ms']:>+9.1f}"
+                         f"{row['p95_ms'] - before['p95_ms']:>+9.1f}{row['p99_ms'] - before['p99_ms']:>+9.1f}")
+    return "\n".join(lines)
+
+async def run(args):
+    traces = read_traces(args.traces)
+    if args.command:
+        traces = [t for t in traces if t['cmd'] in args.command]
+    if not traces:
+        print(f"No traces to replay in {args.traces}")
+        return
+    bot_main = await setup(args)
+
+    results = []
+    tasks = []
+    start = time.perf_counter()
+    for offset, trace in schedule(traces, args.speed, args.max_gap):
+        delay = start + offset - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(replay_one(bot_main, trace, results)))
+    await asyncio.gather(*tasks)
+    wall = time.perf_counter() - start
+
+    report = summarize(results, wall)
+    report['speed'] = args.speed
+    report['model_calls'] = bot_main.claude.messages.calls
+    previous = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            previous = json.load(f)
+    print(format_report(report, previous))
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay recorded interaction traces against stubbed Discord and model backends")
+    parser.add_argument('traces', help="JSONL trace file written with TRACE_RECORD_PATH")
+    parser.add_argument('--speed', type=float, default=1.0, help="Replay speed, e.g. 1, 10 or 100")
+    parser.add_argument('--max-gap', type=float, default=60.0, help="Cap on idle seconds between recorded interactions")
+    parser.add_argument('--command', action='append', help="Only replay this command (repeatable)")
+    parser.add_argument('--keep-rate-limits', action='store_true', help="Keep per-user rate limits when speeding up")
+    parser.add_argument('--out', help="Write the results as JSON")
+    parser.add_argument('--compare', help="Results JSON from an earlier run to compare against")
+    args = parser.parse_args()
+    # Replay state is throwaway: keep it in memory and spill to a scratch file
+    os.environ['STATE_BACKEND'] = 'memory'
+    os.environ['SPILL_DB_PATH'] = os.path.join(tempfile.mkdtemp(prefix='replay-'), 'spill.db')
+    os.environ.pop('TRACE_RECORD_PATH', None)
+    asyncio.run(run(args))
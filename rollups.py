@@ -0,0 +1,89 @@
+from datetime import datetime
+
+ROLLUP_DAYS = 30  # Days of per-day counters to keep
+
+class GuildRollups:
+    """Community-wide counters bumped wherever /update changes a user."""
+
+    def __init__(self, saved: dict = None):
+        saved = saved or {}
+        self.total_profit = saved.get('total_profit', 0.0)
+        self.total_sales = saved.get('total_sales', 0)
+        self.total_feedback = saved.get('total_feedback', 0)
+        self.sales_per_day = saved.get('sales_per_day', {})
+        self.items = saved.get('items', {})
+        self.products = saved.get('products', {})  # Catalog product -> [count, profit]
+        self.users = set(saved.get('users', []))
+        self.active_day = saved.get('active_day')
+        self.active_today = set(saved.get('active_today', []))
+        self.top_items = saved.get('top_items', [])
+        self.snapshot_at = saved.get('snapshot_at')
+
+    def _touch(self, user_id: str, day: str):
+        if day != self.active_day:
+            self.active_day = day
+            self.active_today = set()
+        self.active_today.add(user_id)
+        self.users.add(user_id)
+
+    def record_sale(self, user_id: str, item: str, profit: float, product: str = None):
+        day = datetime.now().date().isoformat()
+        self._touch(user_id, day)
+        self.total_sales += 1
+        self.total_profit += profit
+        self.sales_per_day[day] = self.sales_per_day.get(day, 0) + 1
+        key = ' '.join(item.lower().split())
+        bucket = self.items.setdefault(key, [0, 0.0])
+        bucket[0] += 1
+        bucket[1] += profit
+        if product:
+            bucket = self.products.setdefault(product, [0, 0.0])
+            bucket[0] += 1
+            bucket[1] += profit
+
+    def top_products(self, n: int = 5) -> list:
+        """Highest-profit (product, count, profit) catalog products, ranked live."""
+        ranked = sorted(self.products.items(), key=lambda kv: kv[1][1], reverse=True)[:n]
+        return [(product, count, profit) for product, (count, profit) in ranked]
+
+    def record_feedback(self, user_id: str):
+        self._touch(user_id, datetime.now().date().isoformat())
+        self.total_feedback += 1
+
+    def snapshot(self) -> dict:
+        """Trim old days, refresh the top items and return a saveable copy."""
+        for day in sorted(self.sales_per_day)[:-ROLLUP_DAYS]:
+            del self.sales_per_day[day]
+        ranked = sorted(self.items.items(), key=lambda kv: kv[1][0], reverse=True)[:5]
+        self.top_items = [(key, count, profit) for key, (count, profit) in ranked]
+        self.snapshot_at = datetime.now().isoformat()
+        return {
+            'total_profit': self.total_profit,
+            'total_sales': self.total_sales,
+            'total_feedback': self.total_feedback,
+            'sales_per_day': self.sales_per_day,
+            'items': self.items,
+            'products': self.products,
+            'users': list(self.users),
+            'active_day': self.active_day,
+            'active_today': list(self.active_today),
+            'top_items': self.top_items,
+            'snapshot_at': self.snapshot_at
+        }
+
+    def summary(self) -> dict:
+        """Current totals; top items come from the last snapshot."""
+        today = datetime.now().date().isoformat()
+        days = len(self.sales_per_day) or 1
+        return {
+            'total_profit': self.total_profit,
+            'total_sales': self.total_sales,
+            'total_feedback': self.total_feedback,
+            'sales_today': self.sales_per_day.get(today, 0),
+            'avg_sales_per_day': sum(self.sales_per_day.values()) / days,  # At most ROLLUP_DAYS entries
+            'active_today': len(self.active_today) if self.active_day == today else 0,
+            'tracked_users': len(self.users),
+            'top_items': self.top_items,
+            'top_products': self.top_products(),
+            'snapshot_at': self.snapshot_at
+        }
@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+
+# Aggregates kept in context['sales_stats'] and bumped on every logged sale,
+# so /stats never rescans sales_history. Buckets are [count, profit] pairs
+# so the whole structure stays JSON-serializable for the state store.
+
+PLATFORM_ALIASES = {
+    'ebay': 'eBay',
+    'facebook': 'Facebook',
+    'facebook marketplace': 'Facebook',
+    'fb': 'Facebook',
+    'fb marketplace': 'Facebook',
+    'marketplace': 'Facebook',
+    'depop': 'Depop',
+    'mercari': 'Mercari',
+    'poshmark': 'Poshmark',
+    'grailed': 'Grailed',
+    'stockx': 'StockX',
+    'offerup': 'OfferUp'
+}
+
+def normalize_platform(platform: str) -> str:
+    key = ' '.join(platform.lower().split())
+    return PLATFORM_ALIASES.get(key, platform.strip().title() or 'Other')
+
+def week_key(date: datetime) -> str:
+    year, week, _ = date.isocalendar()
+    return f"{year}-W{week:02d}"
+
+def month_key(date: datetime) -> str:
+    return f"{date.year}-{date.month:02d}"
+
+def _bump(buckets: dict, key: str, profit: float):
+    bucket = buckets.setdefault(key, [0, 0.0])
+    bucket[0] += 1
+    bucket[1] += profit
+
+def record_sale(stats: dict, sale: dict):
+    """Add one sales_history entry to the aggregates."""
+    date = datetime.fromisoformat(sale['date'])
+    profit = sale['profit']
+    _bump(stats['weekly'], week_key(date), profit)
+    _bump(stats['monthly'], month_key(date), profit)
+    _bump(stats['platforms'], normalize_platform(sale.get('platform', '')), profit)
+    item_key = ' '.join(sale.get('item', '').lower().split())
+    _bump(stats['items'], item_key, profit)
+    stats['item_names'].setdefault(item_key, sale.get('item', '').strip())
+    if sale.get('product') and 'products' in stats:
+        _bump(stats['products'], sale['product'], profit)
+
+def ensure_sales_stats(context: dict, match_product=None) -> dict:
+    """Get the user's aggregates, building them once from older history.
+
+    match_product maps a logged item to its catalog product name (or None);
+    per-product buckets are built, and older sales matched, once it is given.
+    """
+    stats = context.get('sales_stats')
+    history = context.get('sales_history', [])
+    if stats is None:
+        stats = {'weekly': {}, 'monthly': {}, 'platforms': {}, 'items': {}, 'item_names': {}}
+        if match_product is not None:
+            stats['products'] = {}
+            _match_history(history, match_product)
+        for sale in history:
+            record_sale(stats, sale)
+        context['sales_stats'] = stats
+    elif 'products' not in stats and match_product is not None:
+        stats['products'] = {}
+        _match_history(history, match_product)
+        for sale in history:
+            if sale['product']:
+                _bump(stats['products'], sale['product'], sale['profit'])
+    return stats
+
+def _match_history(history: list, match_product):
+    # Runs once, when the product buckets are created; any None stored before
+    # then was logged without a catalog to match against
+    for sale in history:
+        if sale.get('product') is None:
+            sale['product'] = match_product(sale.get('item', ''))
+
+def recent_weeks(stats: dict, now: datetime, weeks: int = 4) -> list:
+    """(label, count, profit) for the last few ISO weeks, newest first."""
+    rows = []
+    for i in range(weeks):
+        key = week_key(now - timedelta(weeks=i))
+        count, profit = stats['weekly'].get(key, (0, 0.0))
+        rows.append((key, count, profit))
+    return rows
+
+def recent_months(stats: dict, now: datetime, months: int = 3) -> list:
+    """(label, count, profit) for the last few calendar months, newest first."""
+    rows = []
+    year, month = now.year, now.month
+    for _ in range(months):
+        key = f"{year}-{month:02d}"
+        count, profit = stats['monthly'].get(key, (0, 0.0))
+        rows.append((key, count, profit))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return rows
+
+def top_buckets(buckets: dict, n: int = 5) -> list:
+    """Highest-profit (key, count, profit) buckets."""
+    ranked = sorted(buckets.items(), key=lambda kv: kv[1][1], reverse=True)[:n]
+    return [(key, count, profit) for key, (count, profit) in ranked]
@@ -0,0 +1,184 @@
+# Declarative conversation stages. Each stage lists its question templates,
+# how to pick a template from the user context, whether InvexPro promotions
+# may replace the question, the buttons shown by /start, the system prompt
+# hint sent to Claude, the output token cap for its answers and the emoji
+# used when formatting replies. Long answers are paginated rather than
+# truncated, and one cut off by its cap is continued, so the caps bound
+# the cost of a single call without hiding any of the answer.
+STAGES = {
+    'initial': {
+        'questions': {
+            'default': "Hey! What's your budget for starting out? "
+        },
+        'variant_field': None,
+        'promote': False,
+        'buttons': [],
+        'prompt': " Focus on understanding their budget in a friendly way.",
+        'max_tokens': 800,
+        'emoji': '👋'
+    },
+    'budget_set': {
+        'questions': {
+            'low': "Perfect! With ${budget}, I recommend starting with AirPods - they're only $10.90 to buy and you can sell them for $60-80! Want me to explain how? ",
+            'medium': "Nice! ${budget} is a good start. Are you interested in electronics like AirPods, or fashion items like designer clothes? ",
+            'high': "Awesome! ${budget} gives you lots of options. What catches your interest more: electronics, fashion, or luxury items? "
+        },
+        'variant_field': 'budget',
+        'promote': False,
+        'buttons': [
+            ("Tell me more! 👋", "more_info", 'primary'),
+            ("How to start? 🚀", "how_to_start", 'secondary')
+        ],
+        'prompt': " Suggest specific products they can start with.",
+        'max_tokens': 1000,
+        'emoji': '💰'
+    },
+    'interests_set': {
+        'questions': {
+            'default': "Have you sold anything like this before? "
+        },
+        'variant_field': None,
+        'promote': False,
+        'buttons': [
+            ("Electronics 📱", "electronics", 'primary'),
+            ("Fashion 👕", "fashion", 'secondary'),
+            ("Luxury Items ✨", "luxury", 'secondary')
+        ],
+        'prompt': " Share quick tips about their chosen products.",
+        'max_tokens': 1000,
+        'emoji': '🎯'
+    },
+    'experience_set': {
+        'questions': {
+            'beginner': "No worries! Everyone starts somewhere. Want some tips on how to get your first sale? ",
+            'intermediate': "Great experience! Ready to learn some pro strategies to boost your profits? ",
+            'advanced': "Impressive! Would you like to explore some advanced scaling techniques? "
+        },
+        'variant_field': 'experience_level',
+        'default_variant': 'beginner',
+        'promote': True,
+        'buttons': [
+            ("First Sale Tips 🎯", "first_sale", 'primary'),
+            ("Pro Strategies 📈", "pro_tips", 'secondary')
+        ],
+        'prompt': " Offer relevant advice for their experience level.",
+        'max_tokens': 1200,
+        'emoji': '📚'
+    },
+    'follow_up': {
+        'questions': {
+            'default': "What specific part would you like to know more about? ",
+            'product': "Want to see the current best-selling items in this category? ",
+            'pricing': "Would you like some pricing strategies for maximum profit? ",
+            'supplier': "Should I tell you about our exclusive supplier network? "
+        },
+        'variant_field': 'last_topic',
+        'promote': True,
+        'buttons': [],
+        'prompt': " Answer their specific question clearly and concisely.",
+        'max_tokens': 1500,
+        'emoji': '💡'
+    }
+}
+
+# Fallback stage for unknown stage names
+DEFAULT_STAGE = 'follow_up'
+
+# Context fields that move the conversation forward, lowest priority first.
+# When one message sets several fields the last matching entry wins.
+TRANSITIONS = [
+    ('budget', 'budget_set'),
+    ('interests', 'interests_set'),
+    ('experience_level', 'experience_set')
+]
+
+# Budget tiers for the budget_set templates
+LOW_BUDGET_MAX = 20  # More specific low budget handling
+MEDIUM_BUDGET_LIMIT = 200
+
+# InvexPro pitches keyed by a phrase that appears in the promotion context
+PROMOTIONS = {
+    'track your inventory': "BTW, our InvexPro app makes tracking inventory super easy! Want to check it out? ",
+    'track packages': "Quick tip: our InvexPro app can handle all your tracking needs! Interested? ",
+    'access exclusive suppliers': "Hey, want access to our exclusive supplier network through InvexPro? ",
+    'scale your business': "Ready to scale up? Our InvexPro app can help with that! Want to learn more? ",
+    'calculate profits': "BTW, InvexPro can auto-calculate all your profits! Interested? ",
+    'manage customer': "Pro tip: InvexPro makes customer management a breeze! Want to see how? "
+}
+
+def budget_tier(budget) -> str:
+    """Bucket a budget into the low/medium/high tiers used by budget_set."""
+    budget = budget or 0
+    if budget <= LOW_BUDGET_MAX:
+        return 'low'
+    if budget < MEDIUM_BUDGET_LIMIT:
+        return 'medium'
+    return 'high'
+
+BASE_PROMPT = "You are a friendly reselling advisor. Keep responses short, casual, and focused on one topic at a time. Use emojis naturally. Avoid overwhelming the user with too much information at once."
+
+class StageEngine:
+    """Compiled view of the stage tables; every lookup is a dict access."""
+
+    def __init__(self, stages=STAGES, transitions=TRANSITIONS, promotions=PROMOTIONS):
+        self.stages = stages
+        self.default = stages[DEFAULT_STAGE]
+        self.transitions = list(reversed(transitions))
+        self.promotions = promotions
+        self.prompts = {name: BASE_PROMPT + stage['prompt'] for name, stage in stages.items()}
+        self.buttons = {name: tuple(stage['buttons']) for name, stage in stages.items()}
+        self.max_tokens = {name: stage['max_tokens'] for name, stage in stages.items()}
+        self._promotion_cache = {}
+
+    def transition(self, updates: dict):
+        """Return the stage a set of context updates moves to, or None."""
+        for field, stage in self.transitions:
+            if field in updates:
+                return stage
+        return None
+
+    def next_question(self, context: dict) -> str:
+        """Get the follow-up question for the user's current stage."""
+        stage_name = context.get('conversation_stage', 'initial')
+        stage = self.stages.get(stage_name)
+        if stage is None:
+            return self.default['questions']['default']
+        questions = stage['questions']
+        field = stage['variant_field']
+
+        if field == 'budget':
+            budget = context.get('budget') or 0
+            question = questions[budget_tier(budget)].replace('${budget}', f'${budget}')
+        elif field:
+            fallback = stage.get('default_variant', 'default')
+            question = questions.get(context.get(field) or fallback, questions[fallback])
+        else:
+            question = questions['default']
+
+        # Add InvexPro promotion if appropriate
+        if stage['promote'] and context.get('should_promote_invexpro'):
+            promo = self.promotion_for(context.get('promotion_context', ''))
+            if promo:
+                return promo
+
+        return question
+
+    def promotion_for(self, promotion_context: str):
+        """Look up the InvexPro pitch for a promotion context."""
+        if promotion_context not in self._promotion_cache:
+            self._promotion_cache[promotion_context] = next(
+                (promo for key, promo in self.promotions.items() if key in promotion_context),
+                None
+            )
+        return self._promotion_cache[promotion_context]
+
+    def system_prompt(self, stage_name: str) -> str:
+        """Get the Claude system prompt for a stage."""
+        return self.prompts.get(stage_name, BASE_PROMPT)
+
+    def emoji(self, stage_name: str) -> str:
+        """Get the reply prefix emoji for a stage."""
+        stage = self.stages.get(stage_name)
+        return stage['emoji'] if stage else '💬'
+
+stage_engine = StageEngine()
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger('InvexBot')
+
+# Imported first by main.py, so this is as close to process start as we get
+PROCESS_START = time.perf_counter()
+PHASE_RETRY_DELAYS = (5, 15, 60, 300)  # Seconds before each retry of a failed phase; the last repeats
+
+class StartupTracker:
+    """Track startup phases, their timings and which resources are ready."""
+
+    def __init__(self):
+        self.phases = []  # (name, started at, duration, error) relative to process start
+        self.milestones = {}
+        self._ready = {}
+        self.failed = set()  # Phases that raised; their resources aren't usable
+        self.retry_tasks = {}  # Phase name -> task retrying it
+
+    def _event(self, name: str) -> asyncio.Event:
+        if name not in self._ready:
+            self._ready[name] = asyncio.Event()
+        return self._ready[name]
+
+    def mark(self, name: str):
+        """Record a point in time such as 'imports' or 'gateway_ready'."""
+        self.milestones[name] = time.perf_counter() - PROCESS_START
+        logger.info(f"Startup milestone {name} at {self.milestones[name] * 1000:.0f}ms")
+
+    async def run_phase(self, name: str, func, blocking: bool = False, retry: bool = False):
+        """Run one warm-up phase and flag its resource as ready when done.
+
+        With retry, a failed phase is run again in the background with
+        backoff until it succeeds.
+        """
+        start = time.perf_counter()
+        error = None
+        try:
+            if blocking:
+                result = await asyncio.to_thread(func)
+            else:
+                result = func()
+                if asyncio.iscoroutine(result):
+                    result = await result
+        except Exception as e:
+            logger.error(f"Startup phase {name} failed: {str(e)}", exc_info=True)
+            result = None
+            error = str(e)
+        duration = time.perf_counter() - start
+        self.phases.append((name, start - PROCESS_START, duration, error))
+        if error:
+            self.failed.add(name)
+            if retry and name not in self.retry_tasks:
+                self.retry_tasks[name] = asyncio.create_task(self._retry(name, func, blocking))
+        else:
+            self.failed.discard(name)
+        # Commands gated on this phase should stop waiting even on failure
+        self._event(name).set()
+        return result
+
+    async def _retry(self, name: str, func, blocking: bool):
+        try:
+            attempt = 0
+            while name in self.failed:
+                delay = PHASE_RETRY_DELAYS[min(attempt, len(PHASE_RETRY_DELAYS) - 1)]
+                attempt += 1
+                await asyncio.sleep(delay)
+                logger.info(f"Retrying startup phase {name} (attempt {attempt})")
+                await self.run_phase(name, func, blocking)
+            logger.info(f"Startup phase {name} recovered after {attempt} retries")
+        finally:
+            self.retry_tasks.pop(name, None)
+
+    def has_failed(self, *names) -> bool:
+        """True if any named phase's last run failed."""
+        return any(name in self.failed for name in names)
+
+    def is_ready(self, *names) -> bool:
+        """True once every named phase has finished successfully."""
+        return all(self._event(name).is_set() and name not in self.failed for name in names)
+
+    async def wait_ready(self, *names, timeout: float = 15.0) -> bool:
+        """Wait until the named phases finish; False if that takes too long or one failed."""
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(self._event(name).wait() for name in names)),
+                timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            return False
+        return not any(name in self.failed for name in names)
+
+    def report(self) -> str:
+        """Startup timing report, one line per milestone and phase."""
+        lines = ["Startup timing report:"]
+        for name, offset in sorted(self.milestones.items(), key=lambda m: m[1]):
+            lines.append(f"  {name}: at {offset * 1000:.0f}ms")
+        for name, started, duration, error in self.phases:
+            status = f" FAILED ({error})" if error else ""
+            lines.append(f"  {name}: {duration * 1000:.1f}ms (started at {started * 1000:.0f}ms){status}")
+        return "\n".join(lines)
+
+startup = StartupTracker()
@@ -0,0 +1,255 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+logger = logging.getLogger('InvexBot')
+
+# 'memory' keeps state in this process; 'sqlite' shares it between workers
+STATE_BACKEND = os.getenv('STATE_BACKEND', 'memory')
+STATE_DB_PATH = os.getenv('STATE_DB_PATH', 'bot_state.db')
+SPILL_DB_PATH = os.getenv('SPILL_DB_PATH', 'profile_spill.db')  # Profiles evicted under memory pressure
+TOUCH_FLUSH_SECONDS = 30  # Profile touches are written in one batch at most this often
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def encode_profile(profile: dict) -> str:
+    return json.dumps(profile, default=_encode)
+
+def decode_profile(data: str) -> dict:
+    profile = json.loads(data)
+    profile['last_updated'] = datetime.fromisoformat(profile['last_updated'])
+    for entry in profile.get('history', []):
+        entry['timestamp'] = datetime.fromisoformat(entry['timestamp'])
+    return profile
+
+class MemoryStateStore:
+    """Process-local counters and values. Profiles stay in ConversationManager."""
+
+    shared = False
+
+    def __init__(self):
+        self.windows = {}
+        self.values = {}
+
+    def hit_window(self, key: str, limit: int, window: float):
+        """Count a hit in a fixed window; returns (allowed, seconds until reset)."""
+        now = time.time()
+        count, started = self.windows.get(key, (0, now))
+        if count and now - started > window:
+            count, started = 0, now
+        if count >= limit:
+            return False, int(window - (now - started))
+        self.windows[key] = (count + 1, started)
+        return True, 0
+
+    def get_value(self, key: str):
+        entry = self.values.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self.values[key]
+            return None
+        return value
+
+    def set_value(self, key: str, value, ttl: float = None):
+        self.values[key] = (value, time.time() + ttl if ttl else None)
+
+    def delete_value(self, key: str):
+        self.values.pop(key, None)
+
+    def purge_expired(self, max_window: float) -> int:
+        """Drop rate-limit windows older than max_window and expired values."""
+        now = time.time()
+        stale = [key for key, (_, started) in self.windows.items() if now - started > max_window]
+        for key in stale:
+            del self.windows[key]
+        expired = [key for key, (_, expires_at) in self.values.items() if expires_at is not None and expires_at <= now]
+        for key in expired:
+            del self.values[key]
+        return len(stale) + len(expired)
+
+class SQLiteStateStore:
+    """State shared by every worker process through one SQLite file.
+
+    Profiles carry a version that bumps on each save, so workers can tell
+    when their cached copy is stale with a single indexed lookup, and
+    replace_profile only writes over the version the caller read. Touches
+    only keep idle profiles alive, so they are batched instead of written
+    on every request.
+    """
+
+    shared = True
+
+    def __init__(self, path: str = STATE_DB_PATH):
+        self.path = path
+        self.touched = {}  # (namespace, user_id) -> last use
+        self.touches_flushed = time.monotonic()
+        self.db = sqlite3.connect(path, timeout=5.0, isolation_level=None)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.executescript('''
+            CREATE TABLE IF NOT EXISTS profiles (
+                namespace INTEGER NOT NULL,
+                user_id TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (namespace, user_id)
+            );
+            CREATE TABLE IF NOT EXISTS windows (
+                key TEXT PRIMARY KEY,
+                count INTEGER NOT NULL,
+                started REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS kv (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL
+            );
+        ''')
+        logger.info(f"Using SQLite state store at {path}")
+
+    def profile_version(self, namespace: int, user_id: str):
+        row = self.db.execute(
+            'SELECT version FROM profiles WHERE namespace = ? AND user_id = ?',
+            (namespace, user_id)
+        ).fetchone()
+        return row[0] if row else None
+
+    def load_profile(self, namespace: int, user_id: str):
+        """Return (version, profile) or None."""
+        row = self.db.execute(
+            'SELECT version, data FROM profiles WHERE namespace = ? AND user_id = ?',
+            (namespace, user_id)
+        ).fetchone()
+        return (row[0], decode_profile(row[1])) if row else None
+
+    def save_profile(self, namespace: int, user_id: str, profile: dict) -> int:
+        data = encode_profile(profile)
+        row = self.db.execute(
+            '''INSERT INTO profiles (namespace, user_id, version, updated_at, data)
+               VALUES (?, ?, 1, ?, ?)
+               ON CONFLICT (namespace, user_id) DO UPDATE SET
+                   version = version + 1, updated_at = excluded.updated_at, data = excluded.data
+               RETURNING version''',
+            (namespace, user_id, time.time(), data)
+        ).fetchone()
+        return row[0]
+
+    def replace_profile(self, namespace: int, user_id: str, profile: dict, expected_version):
+        """Save over expected_version (None: the profile must not exist yet).
+
+        Returns the new version, or None when another worker saved first.
+        """
+        data = encode_profile(profile)
+        if expected_version is None:
+            row = self.db.execute(
+                '''INSERT INTO profiles (namespace, user_id, version, updated_at, data)
+                   VALUES (?, ?, 1, ?, ?)
+                   ON CONFLICT (namespace, user_id) DO NOTHING
+                   RETURNING version''',
+                (namespace, user_id, time.time(), data)
+            ).fetchone()
+        else:
+            row = self.db.execute(
+                '''UPDATE profiles SET version = version + 1, updated_at = ?, data = ?
+                   WHERE namespace = ? AND user_id = ? AND version = ?
+                   RETURNING version''',
+                (time.time(), data, namespace, user_id, expected_version)
+            ).fetchone()
+        return row[0] if row else None
+
+    def touch_profile(self, namespace: int, user_id: str):
+        self.touched[(namespace, user_id)] = time.time()
+        if time.monotonic() - self.touches_flushed >= TOUCH_FLUSH_SECONDS:
+            self.flush_touches()
+
+    def flush_touches(self) -> int:
+        """Write pending touches in one transaction; returns how many."""
+        self.touches_flushed = time.monotonic()
+        if not self.touched:
+            return 0
+        rows = [(used, namespace, user_id) for (namespace, user_id), used in self.touched.items()]
+        self.touched.clear()
+        self.db.execute('BEGIN')
+        try:
+            self.db.executemany(
+                'UPDATE profiles SET updated_at = MAX(updated_at, ?) WHERE namespace = ? AND user_id = ?',
+                rows
+            )
+        finally:
+            self.db.execute('COMMIT')
+        return len(rows)
+
+    def delete_idle_profile(self, namespace: int, user_id: str, idle_seconds: float):
+        """Delete a profile unless another worker used it recently."""
+        self.flush_touches()
+        self.db.execute(
+            'DELETE FROM profiles WHERE namespace = ? AND user_id = ? AND updated_at < ?',
+            (namespace, user_id, time.time() - idle_seconds)
+        )
+
+    def delete_profile(self, namespace: int, user_id: str):
+        self.db.execute('DELETE FROM profiles WHERE namespace = ? AND user_id = ?', (namespace, user_id))
+
+    def delete_stale_profiles(self, idle_seconds: float) -> int:
+        """Delete every profile nobody has used for idle_seconds; returns how many."""
+        self.flush_touches()
+        return self.db.execute(
+            'DELETE FROM profiles WHERE updated_at < ?', (time.time() - idle_seconds,)
+        ).rowcount
+
+    def hit_window(self, key: str, limit: int, window: float):
+        """Count a hit in a fixed window; returns (allowed, seconds until reset)."""
+        now = time.time()
+        self.db.execute('BEGIN IMMEDIATE')
+        try:
+            row = self.db.execute('SELECT count, started FROM windows WHERE key = ?', (key,)).fetchone()
+            count, started = row if row else (0, now)
+            if count and now - started > window:
+                count, started = 0, now
+            if count >= limit:
+                return False, int(window - (now - started))
+            self.db.execute(
+                'INSERT OR REPLACE INTO windows (key, count, started) VALUES (?, ?, ?)',
+                (key, count + 1, started)
+            )
+            return True, 0
+        finally:
+            self.db.execute('COMMIT')
+
+    def get_value(self, key: str):
+        row = self.db.execute(
+            'SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)',
+            (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_value(self, key: str, value, ttl: float = None):
+        self.db.execute(
+            'INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)',
+            (key, json.dumps(value), time.time() + ttl if ttl else None)
+        )
+
+    def delete_value(self, key: str):
+        self.db.execute('DELETE FROM kv WHERE key = ?', (key,))
+
+    def purge_expired(self, max_window: float) -> int:
+        """Drop rate-limit windows older than max_window and expired values."""
+        now = time.time()
+        purged = self.db.execute('DELETE FROM windows WHERE started < ?', (now - max_window,)).rowcount
+        purged += self.db.execute('DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?', (now,)).rowcount
+        return purged
+
+def create_state_store():
+    """Build the store selected by STATE_BACKEND."""
+    if STATE_BACKEND == 'sqlite':
+        return SQLiteStateStore()
+    return MemoryStateStore()
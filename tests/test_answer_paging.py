@@ -0,0 +1,54 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('discord')
+import main  # noqa: E402
+
+class ScriptedMessages:
+    """Returns the given (text, stop_reason) replies in order and records each request."""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.requests = []
+
+    async def create(self, messages, **kwargs):
+        self.requests.append(messages)
+        text, stop_reason = self.replies.pop(0)
+        return SimpleNamespace(content=[SimpleNamespace(text=text)], stop_reason=stop_reason, usage=None)
+
+def answer(monkeypatch, *replies):
+    messages = ScriptedMessages(*replies)
+    monkeypatch.setattr(main, 'claude', SimpleNamespace(messages=messages))
+    text = asyncio.run(main.create_answer("system", [{'role': 'user', 'content': "q"}], 'fast'))
+    return text, messages.requests
+
+def test_plain_pages_fit_discord_after_highlighting_and_labels():
+    # Every price and AirPods mention gains four characters of markdown
+    text = " ".join(f"Flip AirPods at $4{n % 10}.00 for $9{n % 10}.00." for n in range(300))
+    reply = main.paged_reply(text, '1', 'start', stage='initial')
+    token = reply['view'].children[0].custom_id.split(':')[1]
+    paged = main.answer_pages.get(token)
+    number = 0
+    while (page := main.render_answer_page(paged, token, number)) is not None:
+        assert len(page['content']) <= main.DISCORD_MESSAGE_CHARS
+        assert page['content'].startswith('👋 ') and '*Page' in page['content']
+        number += 1
+    assert number > 1
+
+def test_answers_cut_off_by_max_tokens_are_continued(monkeypatch):
+    text, requests = answer(monkeypatch, ("Start with ", 'max_tokens'), ("AirPods", 'max_tokens'), (" and sell.", 'end_turn'))
+    assert text == "Start with AirPods and sell."
+    assert requests[1][-1] == {'role': 'assistant', 'content': "Start with"}
+    assert requests[2][-1] == {'role': 'assistant', 'content': "Start with AirPods"}
+
+def test_still_unfinished_answers_end_on_a_sentence(monkeypatch):
+    monkeypatch.setattr(main, 'ANSWER_CONTINUATIONS', 2)
+    text, requests = answer(monkeypatch, ("Buy low. Sell", 'max_tokens'), (" high. Then", 'max_tokens'), (" repeat", 'max_tokens'))
+    assert len(requests) == 3
+    assert text == "Buy low. Sell high."
+
+def test_finished_answers_take_one_call(monkeypatch):
+    text, requests = answer(monkeypatch, ("All done.", 'end_turn'))
+    assert text == "All done." and len(requests) == 1
@@ -0,0 +1,67 @@
+import asyncio
+import json
+
+import pytest
+
+from canned_answers import CannedAnswers, budget_bucket, generate, normalize, read_questions
+
+@pytest.fixture
+def canned():
+    canned = CannedAnswers()
+    canned.add("What's the best platform to sell sneakers?", 'initial', 'none', "Try StockX.")
+    canned.add("What's the best platform to sell sneakers?", 'budget_set', 'low', "Start on eBay.")
+    canned.add("How should I price used AirPods?", 'initial', 'none', "Check sold listings.")
+    return canned
+
+def test_normalize_ignores_case_punctuation_and_apostrophes():
+    assert normalize("What’s the BEST platform?!") == ('whats', 'the', 'best', 'platform')
+
+@pytest.mark.parametrize('budget, bucket', [(None, 'none'), (0, 'none'), (15, 'low'), (100, 'medium'), (500, 'high')])
+def test_budget_bucket(budget, bucket):
+    assert budget_bucket(budget) == bucket
+
+def test_lookup_is_keyed_by_stage_and_budget_bucket(canned):
+    question = "whats the best platform to sell sneakers"
+    assert canned.lookup(question, 'initial') == "Try StockX."
+    assert canned.lookup(question, 'budget_set', 10) == "Start on eBay."
+    assert canned.lookup(question, 'budget_set', 150) is None  # No medium-budget answer yet
+
+def test_close_rewordings_match_but_different_questions_do_not(canned):
+    assert canned.match("so whats the best platform to sell sneakers") == 0
+    assert canned.match("what's the best platform to sell watches?") is None
+    assert canned.match("???") is None
+
+def test_save_stores_shared_answer_texts_once(canned, tmp_path):
+    canned.add("How should I price used AirPods?", 'budget_set', 'low', "Check sold listings.")
+    path = tmp_path / 'canned.json'
+    canned.save(str(path))
+    data = json.loads(path.read_text())
+    assert data['texts'].count("Check sold listings.") == 1
+    loaded = CannedAnswers.load(str(path))
+    assert len(loaded) == len(canned) == 4
+    assert loaded.lookup("how should i price used airpods", 'budget_set', 5) == "Check sold listings."
+
+def test_generate_only_fills_missing_answers(canned):
+    asked = []
+
+    async def answer_fn(question, context):
+        asked.append((question, context['conversation_stage'], context['budget']))
+        return f"{context['conversation_stage']} answer"
+
+    questions = ["What's the best platform to sell sneakers?", "Is it worth reselling perfume?"]
+    done = asyncio.run(generate(canned, questions, answer_fn, stages=['initial', 'budget_set'], buckets=['none', 'low']))
+    assert done == len(asked) == 6  # 2 of the 8 combinations were already there
+    assert ("What's the best platform to sell sneakers?", 'initial', None) not in asked
+    assert canned.lookup("is it worth reselling perfume", 'budget_set', 15) == "budget_set answer"
+
+def test_generate_skips_failed_answers(canned):
+    async def answer_fn(question, context):
+        raise RuntimeError("model down")
+
+    assert asyncio.run(generate(canned, ["Brand new question here"], answer_fn, stages=['initial'], buckets=['none'])) == 0
+    assert canned.match("brand new question here") is None
+
+def test_read_questions_skips_blanks_and_duplicates(tmp_path):
+    path = tmp_path / 'questions.txt'
+    path.write_text("How do I start?\n\nhow do i start\nWhere do I buy?\n")
+    assert read_questions(str(path)) == ["How do I start?", "Where do I buy?"]
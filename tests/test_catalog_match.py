@@ -0,0 +1,47 @@
+import json
+import os
+
+import pytest
+
+from catalog_match import CatalogMatcher
+from sales_stats import ensure_sales_stats
+
+KB_PATH = os.path.join(os.path.dirname(__file__), '..', 'knowledge_base.json')
+
+@pytest.fixture(scope='module')
+def matcher():
+    with open(KB_PATH) as f:
+        return CatalogMatcher.from_kb(json.load(f))
+
+@pytest.mark.parametrize('item, product', [
+    ('AirPods Pro ANC', 'AirPods Pro (ANC)'),
+    ('airpods pro no anc', 'AirPods Pro (No ANC)'),
+    ('airpods pro 2 no anc', 'AirPods Pro 2 (No ANC)'),
+    ('AP2', 'AirPods 2'),
+    ('airpods max', 'AirPods Max'),
+    ('lv slim wallet', 'LV Slim'),
+    ('dyson airwrap', 'Dyson Airwrap HS05 Long'),
+    ('jordan 4', 'Jordan 4s')
+])
+def test_matches_catalog_product(matcher, item, product):
+    assert matcher.canonical(item) == product
+
+@pytest.mark.parametrize('item', [
+    'airpods pro',        # ANC or no ANC?
+    'AirPods Pro 2 ANC',  # The catalog only has the Pro 2 without ANC
+    'airpods',
+    'lv',
+    'dyson',
+    'Sauvage EDT 100ml'
+])
+def test_ambiguous_or_unknown_items_stay_unmatched(matcher, item):
+    assert matcher.canonical(item) is None
+
+def test_sales_logged_before_the_catalog_loaded_are_matched_later(matcher):
+    context = {'sales_history': [
+        {'date': '2024-05-01T12:00:00', 'item': 'AP2', 'profit': 20.0, 'platform': 'eBay'},
+        {'date': '2024-05-02T12:00:00', 'item': 'jordan 4', 'product': None, 'profit': 50.0, 'platform': 'eBay'}
+    ]}
+    ensure_sales_stats(context)
+    stats = ensure_sales_stats(context, matcher.canonical)
+    assert stats['products'] == {'AirPods 2': [1, 20.0], 'Jordan 4s': [1, 50.0]}
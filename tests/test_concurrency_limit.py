@@ -0,0 +1,34 @@
+import asyncio
+
+from concurrency_limit import DECREASE_FACTOR, AdaptiveLimiter
+
+def test_idle_calls_do_not_raise_the_limit():
+    limiter = AdaptiveLimiter(initial=4, max_limit=10)
+
+    async def answer():
+        return "ok"
+
+    async def one_at_a_time():
+        for _ in range(20):
+            await limiter.run(answer)
+
+    asyncio.run(one_at_a_time())
+    assert limiter.limit == 4 and limiter.increases == 0
+
+def test_calls_at_the_limit_raise_it():
+    limiter = AdaptiveLimiter(initial=2, max_limit=10)
+
+    async def answer():
+        await asyncio.sleep(0)
+        return "ok"
+
+    async def saturate():
+        await asyncio.gather(*(limiter.run(answer) for _ in range(6)))
+
+    asyncio.run(saturate())
+    assert limiter.limit > 2 and limiter.increases > 0
+
+def test_overload_cuts_the_limit():
+    limiter = AdaptiveLimiter(initial=4)
+    limiter._adjust('overload', 0.1)
+    assert limiter.limit == 4 * DECREASE_FACTOR and limiter.decreases == 1
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from conversation_summary import ConversationSummarizer
+from guild_state import GuildState
+from model_resilience import BREAKER_MIN_FAILURES, ModelUnavailable, model_caller
+
+class Overloaded(Exception):
+    status_code = 529
+
+class FailingClient:
+    class messages:
+        @staticmethod
+        async def create(**kwargs):
+            raise Overloaded("overloaded")
+
+def test_summary_failures_open_their_own_breaker_only():
+    summarizer = ConversationSummarizer()
+    summarizer.caller.retries = 0
+    messages = [{'is_bot': False, 'message': "I have $50"}]
+
+    async def fail_repeatedly():
+        for _ in range(BREAKER_MIN_FAILURES):
+            with pytest.raises(ModelUnavailable):
+                await summarizer.summarize(FailingClient, '', messages)
+
+    asyncio.run(fail_repeatedly())
+    assert summarizer.stats()['breaker'] == 'open'
+    assert model_caller.breaker.state == 'closed'
+
+class Response:
+    def __init__(self, text):
+        self.content = [type('Block', (), {'text': text})]
+        self.usage = None
+
+class SummarizingClient:
+    class messages:
+        @staticmethod
+        async def create(**kwargs):
+            return Response("Member has $50 and likes sneakers.")
+
+def test_older_turns_are_only_dropped_once_summarized():
+    state = GuildState(1)
+    manager = state.conversation_manager
+    manager.get_user_context('u')
+    for n in range(6):
+        manager.add_to_history('u', f"message {n}", is_bot=n % 2 == 1)
+    assert manager.users_pending_summary() == ['u']
+
+    async def fold():
+        summarizer = ConversationSummarizer()
+        assert summarizer.schedule(SummarizingClient, state, 'u')
+        assert not summarizer.schedule(SummarizingClient, state, 'u')  # Already running
+        await asyncio.gather(*summarizer.tasks)
+
+    asyncio.run(fold())
+    assert [m['message'] for m in manager.get_conversation_history('u', 10)] == ["message 4", "message 5"]
+    assert manager.get_summary('u') == "Member has $50 and likes sneakers."
+    assert manager.users_pending_summary() == []
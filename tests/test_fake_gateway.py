@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+aiohttp = pytest.importorskip('aiohttp')
+from aiohttp.test_utils import TestServer  # noqa: E402
+
+from fake_gateway import API_PREFIX, FakeDiscord, shard_for  # noqa: E402
+
+async def _identify(session, server, shard):
+    ws = await session.ws_connect(server.make_url('/gateway'))
+    hello = await ws.receive_json()
+    assert hello['op'] == 10
+    await ws.send_json({'op': 2, 'd': {'token': 'x', 'intents': 0, 'properties': {}, 'shard': shard}})
+    return ws
+
+def test_each_shard_gets_only_its_guilds():
+    async def scenario():
+        fake = FakeDiscord(guilds=6, shard_count=2)
+        async with TestServer(fake.app) as server, aiohttp.ClientSession() as session:
+            async with session.get(server.make_url(f'{API_PREFIX}/gateway/bot')) as response:
+                assert (await response.json())['shards'] == 2
+
+            ws = await _identify(session, server, [1, 2])
+            ready = await ws.receive_json()
+            assert ready['t'] == 'READY' and ready['d']['shard'] == [1, 2]
+            expected = {str(g) for g in fake.guild_ids if shard_for(g, 2) == 1}
+            assert {g['id'] for g in ready['d']['guilds']} == expected
+            created = [await ws.receive_json() for _ in expected]
+            assert {event['d']['id'] for event in created} == expected
+            assert all(event['t'] == 'GUILD_CREATE' for event in created)
+
+            await ws.send_json({'op': 1, 'd': ready['s']})
+            assert (await ws.receive_json())['op'] == 11
+
+            # Events for a guild reach the shard that owns it
+            guild_id = int(next(iter(expected)))
+            assert await fake.send_message(guild_id, "hi")
+            message = await ws.receive_json()
+            assert message['t'] == 'MESSAGE_CREATE' and message['d']['guild_id'] == str(guild_id)
+            other = next(g for g in fake.guild_ids if shard_for(g, 2) == 0)
+            assert not await fake.send_message(other, "nobody on shard 0")
+            await ws.close()
+
+    asyncio.run(scenario())
+
+def test_guild_command_sync_is_recorded():
+    async def scenario():
+        fake = FakeDiscord(guilds=1)
+        async with TestServer(fake.app) as server, aiohttp.ClientSession() as session:
+            url = server.make_url(f'{API_PREFIX}/applications/1000/guilds/42/commands')
+            async with session.put(url, json=[{'name': 'ai', 'description': 'Ask'}]) as response:
+                synced = await response.json()
+        assert synced[0]['guild_id'] == '42' and synced[0]['id']
+        assert [c['name'] for c in fake.commands[42]] == ['ai']
+
+    asyncio.run(scenario())
@@ -0,0 +1,44 @@
+import pytest
+
+pytest.importorskip('numpy')
+from kb_retrieval import KnowledgeIndex, flatten_entries  # noqa: E402
+
+KB = {
+    'platform_tips': {
+        'ebay': ["Top eBay tips for resellers:", "List sneakers on eBay with authenticity guarantee for buyer trust"],
+        'depop': {'fees': "Depop charges ten percent selling fees on vintage clothing"}
+    },
+    'electronics': {
+        'products': [
+            {'name': "AirPods Pro", 'description': "Noise cancelling earbuds", 'selling_points': ["Apple resale demand"]},
+            {'name': "Dyson Airwrap", 'description': "Hair styler with strong resale value"}
+        ]
+    }
+}
+
+def test_entries_skip_list_headers_and_keep_products_whole():
+    paths = [e['path'] for e in flatten_entries(KB)]
+    assert paths == [
+        'platform_tips.ebay[1]', 'platform_tips.depop.fees',
+        'electronics.products[0]', 'electronics.products[1]'
+    ]
+    product = flatten_entries(KB)[2]
+    assert product['text'] == "AirPods Pro - Noise cancelling earbuds"
+    assert 'Apple' in product['search_text'] and product['product']['name'] == "AirPods Pro"
+
+def test_search_ranks_the_matching_entry_first():
+    index = KnowledgeIndex(KB)
+    assert index.search("depop fees")[0][1]['path'] == 'platform_tips.depop.fees'
+    assert index.search("noise cancelling airpods")[0][1]['path'] == 'electronics.products[0]'
+    scores = [score for score, _ in index.search("resale value airwrap", k=4, min_score=0)]
+    assert scores == sorted(scores, reverse=True)
+
+def test_search_without_known_terms_is_empty():
+    index = KnowledgeIndex(KB)
+    assert index.search("what is the best") == []
+    assert index.search("quantum chromodynamics") == []
+
+def test_from_parts_matches_the_built_index():
+    index = KnowledgeIndex(KB)
+    copy = KnowledgeIndex.from_parts(index.entries, index.vocab, index.idf, index.matrix)
+    assert copy.search("ebay sneakers") == index.search("ebay sneakers")
@@ -0,0 +1,38 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip('numpy')
+from kb_snapshot import build_snapshot, load_snapshot  # noqa: E402
+
+KB = {
+    'platform_tips': {'ebay': ["List sneakers on eBay with authenticity guarantee for buyer trust"]},
+    'electronics': {'products': [{'name': "AirPods Pro", 'description': "Noise cancelling earbuds", 'price_range': "35-40"}]}
+}
+
+@pytest.fixture
+def paths(tmp_path):
+    json_path = tmp_path / 'kb.json'
+    json_path.write_text(json.dumps(KB))
+    return str(json_path), str(tmp_path / 'kb.snapshot')
+
+def test_snapshot_round_trip(paths):
+    build_snapshot(*paths)
+    knowledge_base, index = load_snapshot(*paths)
+    assert knowledge_base['electronics']['products'][0]['price_max'] == 40.0
+    assert index.search("noise cancelling airpods")[0][1]['path'] == 'electronics.products[0]'
+
+def test_concurrent_builds_do_not_collide(paths):
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: build_snapshot(*paths), range(8)))
+    assert len({r['entries'] for r in results}) == 1
+    assert load_snapshot(*paths) is not None
+    assert not [name for name in os.listdir(os.path.dirname(paths[1])) if name.endswith('.tmp')]
+
+def test_edited_source_makes_the_snapshot_stale(paths):
+    build_snapshot(*paths)
+    with open(paths[0], 'w') as f:
+        json.dump(dict(KB, extra={'tip': "Bundle colognes for higher average order value"}), f)
+    assert load_snapshot(*paths) is None
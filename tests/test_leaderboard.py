@@ -0,0 +1,53 @@
+import random
+
+import leaderboard
+from leaderboard import PAGE_SIZE, Leaderboard, RankedIndex
+
+def test_ranks_follow_value_then_user_id():
+    index = RankedIndex()
+    index.update('b', 10)
+    index.update('a', 10)
+    index.update('c', 30)
+    assert [index.rank(u) for u in 'cab'] == [0, 1, 2]
+    assert index.update('a', 50) == (1, 0)
+    assert index.update('c', 0) == (1, None)  # Zero drops off the board
+    assert index.rank('c') is None and len(index) == 2
+    assert index.page(0) == [('a', 50), ('b', 10)]
+
+def test_chunked_index_matches_a_sorted_list(monkeypatch):
+    monkeypatch.setattr(leaderboard, 'CHUNK_SIZE', 4)
+    rng = random.Random(7)
+    index = RankedIndex({f"u{n}": n for n in range(1, 20)})
+    for _ in range(500):
+        index.update(f"u{rng.randrange(40)}", rng.choice([0, rng.randrange(1, 100)]))
+    expected = sorted((-value, user_id) for user_id, value in index.values.items())
+    assert all(len(chunk) <= 8 for chunk in index.chunks)
+    assert [index.rank(user_id) for _, user_id in expected] == list(range(len(expected)))
+    assert index.page(1, 5) == [(user_id, -neg) for neg, user_id in expected[5:10]]
+
+def test_only_pages_the_move_touches_are_invalidated():
+    board = Leaderboard()
+    for n in range(3 * PAGE_SIZE):
+        board.update_user(f"u{n:02}", {'sales_count': 100 - n})
+    for page in range(3):
+        board.render_page('sales_count', page)
+
+    # Rank 25 -> 15 only reshuffles the second and third pages
+    board.update_user('u25', {'sales_count': 86})
+    assert ('sales_count', 0) in board.pages
+    assert ('sales_count', 1) not in board.pages and ('sales_count', 2) not in board.pages
+    assert "**#16** <@u25>" in board.render_page('sales_count', 1)
+
+    # A newcomer at the top shifts everyone after them
+    board.render_page('sales_count', 2)
+    board.update_user('new', {'sales_count': 500})
+    assert not any(metric == 'sales_count' for metric, _ in board.pages)
+
+def test_snapshot_round_trip():
+    board = Leaderboard()
+    board.update_user('a', {'total_profit': 12.5, 'sales_count': 2})
+    board.update_user('b', {'total_profit': 40.0, 'sales_count': 1})
+    restored = Leaderboard(board.snapshot())
+    assert restored.rank_of('total_profit', 'a') == (2, 2)
+    assert restored.rank_of('sales_count', 'a') == (1, 2)
+    assert restored.rank_of('positive_feedback', 'a') == (None, 0)
@@ -0,0 +1,21 @@
+import asyncio
+
+from model_resilience import HEDGE_MIN_DELAY, HEDGE_MIN_SAMPLES, ResilientCaller
+
+def test_hedge_delay_is_kept_per_key():
+    caller = ResilientCaller(hedging=True)
+    caller.latencies['fast'] = [0.5] * HEDGE_MIN_SAMPLES
+    caller.latencies['large'] = [8.0] * HEDGE_MIN_SAMPLES
+    assert caller.hedge_delay('fast') == HEDGE_MIN_DELAY
+    assert caller.hedge_delay('large') == 8.0
+    assert caller.hedge_delay('summary') is None  # Not enough samples yet
+    assert caller.stats()['hedge_after_ms'] == {'fast': HEDGE_MIN_DELAY * 1000, 'large': 8000}
+
+def test_calls_record_latency_under_their_key():
+    caller = ResilientCaller()
+
+    async def answer():
+        return "ok"
+
+    assert asyncio.run(caller.call(answer, key='fast')) == "ok"
+    assert list(caller.latencies) == ['fast'] and len(caller.latencies['fast']) == 1
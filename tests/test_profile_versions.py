@@ -0,0 +1,53 @@
+from conversation_manager import ConversationManager
+from state_store import SQLiteStateStore
+
+def add_sale(conversation):
+    conversation['context']['sales_count'] += 1
+
+def _workers(tmp_path):
+    path = str(tmp_path / 'state.db')
+    return ConversationManager(SQLiteStateStore(path)), ConversationManager(SQLiteStateStore(path))
+
+def test_replace_profile_only_writes_over_the_version_read(tmp_path):
+    store = SQLiteStateStore(str(tmp_path / 'state.db'))
+    profile = {'last_updated': '2024-01-01T00:00:00', 'context': {}, 'history': []}
+    assert store.replace_profile(1, 'u', profile, None) == 1
+    assert store.replace_profile(1, 'u', profile, None) is None  # Someone created it first
+    assert store.replace_profile(1, 'u', profile, 1) == 2
+    assert store.replace_profile(1, 'u', profile, 1) is None  # Stale version
+
+def test_concurrent_sales_from_two_workers_both_count(tmp_path):
+    first, second = _workers(tmp_path)
+    first.get_user_context('u')
+    second.get_user_context('u')
+
+    # Both workers hold version 1; the first one to save wins the race
+    first.mutate('u', add_sale)
+    second.versions['u'] = 1
+    second.conversations['u']['context']['sales_count'] = 0
+    assert not second.save('u')
+    assert second.conflicts == 1
+    assert second.conversations['u']['context']['sales_count'] == 1  # Reloaded the winner's copy
+
+    second.mutate('u', add_sale)
+    assert first.get_user_context('u')['sales_count'] == 2
+
+def test_mutate_reapplies_after_a_conflict(tmp_path):
+    first, second = _workers(tmp_path)
+    first.get_user_context('u')
+    second.get_user_context('u')
+
+    def sale_racing_the_other_worker(conversation):
+        if not second.conflicts:
+            first.mutate('u', add_sale)  # Saved between our read and our write
+        add_sale(conversation)
+
+    assert second.mutate('u', sale_racing_the_other_worker)
+    assert second.conflicts == 1
+    assert first.get_user_context('u')['sales_count'] == 2
+
+def test_without_a_store_saves_always_succeed():
+    manager = ConversationManager()
+    manager.get_user_context('u')
+    assert manager.mutate('u', add_sale)
+    assert manager.get_user_context('u')['sales_count'] == 1 and manager.conflicts == 0
@@ -0,0 +1,69 @@
+import asyncio
+from types import SimpleNamespace
+
+from replay import FakeMessages, _replaying, format_report, percentile, schedule, summarize
+from traffic_trace import TrafficRecorder, read_traces, scrub
+
+def test_percentile():
+    assert percentile([], 95) == 0.0
+    assert percentile([5, 1, 3, 2, 4], 50) == 3
+    assert percentile(range(1, 101), 95) == 96
+    assert percentile([7], 99) == 7
+
+def test_schedule_caps_idle_gaps_then_speeds_up():
+    traces = [{'ts': 100.0}, {'ts': 10.0}, {'ts': 12.0}, {'ts': 500.0}]
+    offsets = [offset for offset, _ in schedule(traces, speed=2, max_gap=60)]
+    assert offsets == [0.0, 1.0, 31.0, 61.0]
+    assert [trace['ts'] for _, trace in schedule(traces, 1, 60)] == [10.0, 12.0, 100.0, 500.0]
+    assert schedule([], 1, 60) == []
+
+def test_summarize_and_report():
+    results = [
+        {'cmd': 'ai', 'ms': 100.0, 'recorded_ms': 900.0, 'error': False},
+        {'cmd': 'ai', 'ms': 300.0, 'recorded_ms': None, 'error': True},
+        {'cmd': 'stats', 'ms': 5.0, 'recorded_ms': 8.0, 'error': False}
+    ]
+    report = summarize(results, 2.0)
+    assert report['requests'] == 3 and report['throughput_rps'] == 1.5
+    assert report['commands']['ai'] == {
+        'count': 2, 'errors': 1, 'p50_ms': 300.0, 'p95_ms': 300.0, 'p99_ms': 300.0, 'max_ms': 300.0,
+        'recorded_p50_ms': 900.0, 'recorded_p95_ms': 900.0
+    }
+
+    previous = {'throughput_rps': 1.0, 'commands': {'ai': dict(report['commands']['ai'], p50_ms=250.0)}}
+    lines = format_report(report, previous).splitlines()
+    assert lines[0] == "Replayed 3 interactions in 2.0s (1.5 req/s), previously 1.0 req/s"
+    assert lines[2].split()[:3] == ['ai', '2', '1']
+    assert lines[3].split()[2] == '+50.0'  # p50 regressed by 50ms
+    assert len(lines) == 5  # No comparison row for /stats
+
+def test_fake_model_sleeps_for_the_recorded_model_time():
+    messages = FakeMessages()
+
+    async def call():
+        _replaying.set({'trace': {'model_ms': 30.0, 'model_calls': 3}})
+        started = asyncio.get_running_loop().time()
+        response = await messages.create([{'role': 'user', 'content': "hi"}], system="be brief", max_tokens=5)
+        return asyncio.get_running_loop().time() - started, response
+
+    elapsed, response = asyncio.run(call())
+    assert 0.01 <= elapsed < 0.5
+    assert response.usage.output_tokens == 5 and messages.calls == 1
+
+def test_recorded_traces_read_back_anonymized(tmp_path):
+    path = str(tmp_path / 'traces.jsonl')
+    recorder = TrafficRecorder(path)
+    interaction = SimpleNamespace(
+        extras={}, user=SimpleNamespace(id=123456789012345678), guild_id=987654321098765432,
+        data={'options': [{'name': 'question', 'value': "hey <@123456789012345678> order 12345678"}]}
+    )
+    recorder.begin(interaction)
+    recorder.add_model_time(0.25)
+    recorder.finish(interaction, 'ai')
+    recorder.file.close()
+
+    [trace] = read_traces(path)
+    assert trace['cmd'] == 'ai' and trace['model_calls'] == 1 and trace['model_ms'] == 250.0
+    assert trace['opts'] == {'question': "hey @someone order #"}
+    assert '123456789012345678' not in trace['user'] and len(trace['guild']) == 12
+    assert scrub(42) == 42
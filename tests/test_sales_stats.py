@@ -0,0 +1,64 @@
+from datetime import datetime
+
+import pytest
+
+from sales_stats import (
+    ensure_sales_stats, month_key, normalize_platform, recent_months, recent_weeks, record_sale, top_buckets, week_key
+)
+
+def sale(date, item, profit, platform='ebay', **extra):
+    return dict({'date': date, 'item': item, 'profit': profit, 'platform': platform}, **extra)
+
+HISTORY = [
+    sale('2024-12-30T10:00:00', 'AirPods Pro', 20.0),            # ISO week 1 of 2025
+    sale('2025-01-02T10:00:00', ' airpods  pro ', 30.0, 'FB'),
+    sale('2025-01-15T10:00:00', 'Jordan 4', 80.0, 'stockx'),
+    sale('2025-02-01T10:00:00', 'Jordan 4', -10.0, 'Vinted')
+]
+
+@pytest.mark.parametrize('platform, name', [
+    ('eBay', 'eBay'), (' fb  marketplace ', 'Facebook'), ('StockX', 'StockX'), ('vinted', 'Vinted'), ('  ', 'Other')
+])
+def test_normalize_platform(platform, name):
+    assert normalize_platform(platform) == name
+
+def test_keys_use_iso_weeks_and_calendar_months():
+    assert week_key(datetime(2024, 12, 30)) == '2025-W01'
+    assert month_key(datetime(2024, 12, 30)) == '2024-12'
+
+def test_history_is_bucketed_once():
+    context = {'sales_history': [dict(s) for s in HISTORY]}
+    stats = ensure_sales_stats(context)
+    assert stats['weekly']['2025-W01'] == [2, 50.0]
+    assert stats['monthly'] == {'2024-12': [1, 20.0], '2025-01': [2, 110.0], '2025-02': [1, -10.0]}
+    assert stats['platforms']['Facebook'] == [1, 30.0]
+    assert stats['items']['airpods pro'] == [2, 50.0]
+    assert stats['item_names']['airpods pro'] == 'AirPods Pro'  # First spelling wins
+    assert 'products' not in stats
+    assert ensure_sales_stats(context) is stats
+
+def test_new_sales_bump_the_existing_buckets():
+    context = {'sales_history': [dict(s) for s in HISTORY[:1]]}
+    stats = ensure_sales_stats(context)
+    record_sale(stats, sale('2024-12-31T09:00:00', 'AirPods Pro', 5.0))
+    assert stats['weekly']['2025-W01'] == [2, 25.0]
+    assert stats['platforms']['eBay'] == [2, 25.0]
+
+def test_product_buckets_are_added_when_a_matcher_arrives():
+    context = {'sales_history': [dict(s) for s in HISTORY]}
+    ensure_sales_stats(context)
+    stats = ensure_sales_stats(context, lambda item: 'Jordan 4s' if 'jordan' in item.lower() else None)
+    assert stats['products'] == {'Jordan 4s': [2, 70.0]}
+    assert [s['product'] for s in context['sales_history']] == [None, None, 'Jordan 4s', 'Jordan 4s']
+
+def test_recent_windows_fill_gaps_with_zeros():
+    stats = ensure_sales_stats({'sales_history': [dict(s) for s in HISTORY]})
+    now = datetime(2025, 2, 3)
+    assert [row[0] for row in recent_weeks(stats, now)] == ['2025-W06', '2025-W05', '2025-W04', '2025-W03']
+    assert recent_weeks(stats, now)[1] == ('2025-W05', 1, -10.0)
+    assert recent_months(stats, now) == [('2025-02', 1, -10.0), ('2025-01', 2, 110.0), ('2024-12', 1, 20.0)]
+    assert recent_months(stats, datetime(2025, 1, 1), 2)[1] == ('2024-12', 1, 20.0)
+
+def test_top_buckets_rank_by_profit():
+    stats = ensure_sales_stats({'sales_history': [dict(s) for s in HISTORY]})
+    assert top_buckets(stats['items'], 1) == [('jordan 4', 2, 70.0)]
@@ -0,0 +1,47 @@
+import pytest
+
+from stage_engine import BASE_PROMPT, STAGES, StageEngine, budget_tier, stage_engine
+
+@pytest.mark.parametrize('updates, stage', [
+    ({'budget': 50}, 'budget_set'),
+    ({'interests': ['electronics']}, 'interests_set'),
+    ({'experience_level': 'beginner'}, 'experience_set'),
+    ({'budget': 50, 'experience_level': 'advanced'}, 'experience_set'),  # Last transition wins
+    ({'last_topic': 'pricing'}, None)
+])
+def test_transition(updates, stage):
+    assert stage_engine.transition(updates) == stage
+
+@pytest.mark.parametrize('budget, tier', [(None, 'low'), (20, 'low'), (21, 'medium'), (199, 'medium'), (200, 'high')])
+def test_budget_tier(budget, tier):
+    assert budget_tier(budget) == tier
+
+def test_budget_question_fills_in_the_budget():
+    question = stage_engine.next_question({'conversation_stage': 'budget_set', 'budget': 150})
+    assert question.startswith("Nice! $150 is a good start.")
+
+def test_variant_falls_back_to_the_stage_default():
+    assert stage_engine.next_question({'conversation_stage': 'experience_set'}) == \
+        STAGES['experience_set']['questions']['beginner']
+    assert stage_engine.next_question({'conversation_stage': 'follow_up', 'last_topic': 'shipping'}) == \
+        STAGES['follow_up']['questions']['default']
+
+def test_unknown_stage_asks_the_default_question():
+    assert stage_engine.next_question({'conversation_stage': 'gone'}) == STAGES['follow_up']['questions']['default']
+
+def test_promotion_only_replaces_questions_in_promoting_stages():
+    context = {'should_promote_invexpro': True, 'promotion_context': 'you could scale your business'}
+    assert 'scale up' in stage_engine.next_question(dict(context, conversation_stage='follow_up'))
+    assert stage_engine.next_question(dict(context, conversation_stage='initial')) == \
+        STAGES['initial']['questions']['default']
+
+def test_promotion_lookup_is_cached():
+    engine = StageEngine()
+    assert engine.promotion_for('nothing relevant') is None
+    assert engine._promotion_cache == {'nothing relevant': None}
+
+def test_prompts_and_emoji():
+    assert stage_engine.system_prompt('initial') == BASE_PROMPT + STAGES['initial']['prompt']
+    assert stage_engine.system_prompt('gone') == BASE_PROMPT
+    assert stage_engine.emoji('budget_set') == '💰'
+    assert stage_engine.emoji('gone') == '💬'
@@ -0,0 +1,121 @@
+import os
+from datetime import datetime, timedelta
+
+LEDGER_DAYS = 62  # Days of per-day guild totals kept for cost trends
+# Token quotas (input + output); 0 turns a quota off
+USER_DAILY_TOKENS = int(os.getenv('USER_DAILY_TOKENS', '40000'))
+USER_MONTHLY_TOKENS = int(os.getenv('USER_MONTHLY_TOKENS', '400000'))
+GUILD_DAILY_TOKENS = int(os.getenv('GUILD_DAILY_TOKENS', '2000000'))
+GUILD_MONTHLY_TOKENS = int(os.getenv('GUILD_MONTHLY_TOKENS', '30000000'))
+CHARS_PER_TOKEN = 4  # Rough size of a prompt that hasn't been sent yet
+
+def estimate_tokens(*texts) -> int:
+    return sum(len(text) for text in texts) // CHARS_PER_TOKEN
+
+class TokenLedger:
+    """Per-guild token usage: per-day totals plus each member's day and month counters.
+
+    Every quota check reads a handful of counters, which roll over lazily
+    when a new day or month starts.
+    """
+
+    def __init__(self, saved: dict = None, quotas: dict = None):
+        saved = saved or {}
+        self.days = saved.get('days', {})  # day -> [input tokens, output tokens, cost, calls]
+        self.users = saved.get('users', {})  # user_id -> [day, day tokens, month, month tokens, month cost]
+        self.month = saved.get('month')
+        self.month_tokens = saved.get('month_tokens', 0)
+        self.month_cost = saved.get('month_cost', 0.0)
+        self.quotas = quotas or {
+            'user_daily': USER_DAILY_TOKENS,
+            'user_monthly': USER_MONTHLY_TOKENS,
+            'guild_daily': GUILD_DAILY_TOKENS,
+            'guild_monthly': GUILD_MONTHLY_TOKENS
+        }
+
+    @staticmethod
+    def _today():
+        day = datetime.now().date().isoformat()
+        return day, day[:7]
+
+    def _user(self, user_id: str, day: str, month: str) -> list:
+        entry = self.users.get(user_id)
+        if entry is None:
+            entry = self.users[user_id] = [day, 0, month, 0, 0.0]
+        if entry[0] != day:
+            entry[0], entry[1] = day, 0
+        if entry[2] != month:
+            entry[2], entry[3], entry[4] = month, 0, 0.0
+        return entry
+
+    def _roll_month(self, month: str):
+        if self.month != month:
+            self.month, self.month_tokens, self.month_cost = month, 0, 0.0
+
+    def usage(self, user_id: str) -> dict:
+        """Tokens used today and this month by a member and by the whole guild."""
+        day, month = self._today()
+        self._roll_month(month)
+        entry = self.users.get(user_id)
+        totals = self.days.get(day)
+        return {
+            'user_daily': entry[1] if entry and entry[0] == day else 0,
+            'user_monthly': entry[3] if entry and entry[2] == month else 0,
+            'guild_daily': totals[0] + totals[1] if totals else 0,
+            'guild_monthly': self.month_tokens
+        }
+
+    def check(self, user_id: str, estimate: int = 0):
+        """Whether a call of about estimate tokens fits every quota; returns (allowed, exceeded quota)."""
+        for quota, used in self.usage(user_id).items():
+            limit = self.quotas.get(quota)
+            if limit and used + estimate > limit:
+                return False, quota
+        return True, None
+
+    def record(self, user_id: str, input_tokens: int, output_tokens: int, cost: float):
+        day, month = self._today()
+        tokens = input_tokens + output_tokens
+        entry = self._user(user_id, day, month)
+        entry[1] += tokens
+        entry[3] += tokens
+        entry[4] += cost
+        totals = self.days.setdefault(day, [0, 0, 0.0, 0])
+        totals[0] += input_tokens
+        totals[1] += output_tokens
+        totals[2] += cost
+        totals[3] += 1
+        self._roll_month(month)
+        self.month_tokens += tokens
+        self.month_cost += cost
+
+    def top_users(self, count: int = 10) -> list:
+        """(user_id, tokens, cost) for this month's heaviest members."""
+        month = self._today()[1]
+        rows = [(user_id, entry[3], entry[4]) for user_id, entry in self.users.items() if entry[2] == month]
+        return sorted(rows, key=lambda row: row[1], reverse=True)[:count]
+
+    def trend(self, days: int = 14) -> list:
+        """(day, tokens, cost, calls) for each of the last days, oldest first."""
+        today = datetime.now().date()
+        rows = []
+        for offset in range(days - 1, -1, -1):
+            day = (today - timedelta(days=offset)).isoformat()
+            input_tokens, output_tokens, cost, calls = self.days.get(day, (0, 0, 0.0, 0))
+            rows.append((day, input_tokens + output_tokens, cost, calls))
+        return rows
+
+    def snapshot(self) -> dict:
+        """Drop old days and last month's members, then return a saveable copy."""
+        for day in sorted(self.days)[:-LEDGER_DAYS]:
+            del self.days[day]
+        month = self._today()[1]
+        for user_id in [user_id for user_id, entry in self.users.items() if entry[2] != month]:
+            del self.users[user_id]
+        return {
+            'days': self.days,
+            'users': self.users,
+            'month': self.month,
+            'month_tokens': self.month_tokens,
+            'month_cost': self.month_cost
+        }
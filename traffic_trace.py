@@ -0,0 +1,96 @@
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+
+logger = logging.getLogger('InvexBot')
+
+# Opt-in: set TRACE_RECORD_PATH to append anonymized interaction traces
+TRACE_RECORD_PATH = os.getenv('TRACE_RECORD_PATH')
+# Without a fixed salt, user hashes can't be linked across restarts
+TRACE_SALT = os.getenv('TRACE_SALT') or os.urandom(16).hex()
+MENTION_RE = re.compile(r"<[@#][!&]?\d+>")
+LONG_NUMBER_RE = re.compile(r"\d{7,}")  # Discord IDs, phone and order numbers
+
+_current = contextvars.ContextVar('trace_record', default=None)
+
+def anonymize_id(value) -> str:
+    return hashlib.sha256(f"{TRACE_SALT}:{value}".encode()).hexdigest()[:12]
+
+def scrub(value):
+    """Drop mentions and long numbers from free-text options."""
+    if isinstance(value, str):
+        return LONG_NUMBER_RE.sub('#', MENTION_RE.sub('@someone', value))
+    return value
+
+class TrafficRecorder:
+    """Appends one compact JSON line per finished slash command.
+
+    Each line holds the wall-clock start time, the command, its scrubbed
+    options, hashed user and guild, the handler duration and the model time
+    spent inside it, e.g.
+    {"ts":1760890000.12,"cmd":"ai","opts":{"question":"..."},"user":"3fa1..","guild":"9c0e..","ms":1840.2,"model_ms":1795.0,"model_calls":1}
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.file = open(path, 'a', buffering=1) if path else None  # Line buffered
+        self.recorded = 0
+        if path:
+            logger.info(f"Recording interaction traces to {path}")
+
+    @property
+    def enabled(self) -> bool:
+        return self.file is not None
+
+    def begin(self, interaction):
+        """Start timing a command; runs in the command's own task."""
+        if not self.enabled:
+            return
+        record = {'ts': time.time(), 'start': time.monotonic(), 'model_ms': 0.0, 'model_calls': 0}
+        interaction.extras['trace'] = record
+        _current.set(record)
+
+    def add_model_time(self, seconds: float):
+        """Attribute a model call to the command running in this task, if any."""
+        record = _current.get()
+        if record is not None:
+            record['model_ms'] += seconds * 1000
+            record['model_calls'] += 1
+
+    def finish(self, interaction, command_name: str):
+        record = interaction.extras.get('trace')
+        if record is None or not self.enabled:
+            return
+        options = {}
+        for option in (interaction.data or {}).get('options', []):
+            options[option['name']] = scrub(option.get('value'))
+        line = {
+            'ts': round(record['ts'], 3),
+            'cmd': command_name,
+            'opts': options,
+            'user': anonymize_id(interaction.user.id),
+            'guild': anonymize_id(interaction.guild_id) if interaction.guild_id else None,
+            'ms': round((time.monotonic() - record['start']) * 1000, 1),
+            'model_ms': round(record['model_ms'], 1),
+            'model_calls': record['model_calls']
+        }
+        try:
+            self.file.write(json.dumps(line, separators=(',', ':'), ensure_ascii=False) + "\n")
+            self.recorded += 1
+        except OSError as e:
+            logger.error(f"Error writing interaction trace: {str(e)}")
+
+def read_traces(path: str) -> list:
+    traces = []
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                traces.append(json.loads(line))
+    return traces
+
+trace_recorder = TrafficRecorder(TRACE_RECORD_PATH)
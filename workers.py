@@ -0,0 +1,40 @@
+import logging
+import os
+import subprocess
+import sys
+import time
+
+logger = logging.getLogger('InvexBot')
+
+RESTART_DELAY = 5  # Seconds before restarting a crashed worker
+
+def assign_shards(workers: int, shard_count: int) -> list:
+    """Split shard IDs round-robin across worker processes."""
+    return [list(range(i, shard_count, workers)) for i in range(min(workers, shard_count))]
+
+def run_workers(workers: int, shard_count: int) -> int:
+    """Run one bot process per shard group against the shared SQLite store."""
+    groups = assign_shards(workers, shard_count)
+    env = dict(os.environ, STATE_BACKEND='sqlite', SHARD_COUNT=str(shard_count))
+
+    def spawn(shard_ids):
+        worker_env = dict(env, SHARD_IDS=','.join(map(str, shard_ids)))
+        logger.info(f"Starting worker for shards {shard_ids}")
+        return subprocess.Popen([sys.executable, os.path.abspath(sys.argv[0])], env=worker_env)
+
+    procs = {tuple(group): spawn(group) for group in groups}
+    try:
+        while True:
+            time.sleep(1)
+            for group, proc in procs.items():
+                code = proc.poll()
+                if code is not None:
+                    logger.warning(f"Worker for shards {list(group)} exited with {code}, restarting")
+                    time.sleep(RESTART_DELAY)
+                    procs[group] = spawn(list(group))
+    except KeyboardInterrupt:
+        for proc in procs.values():
+            proc.terminate()
+        for proc in procs.values():
+            proc.wait()
+        return 0